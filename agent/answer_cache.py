@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from config import settings
+
+# Which knowledge-base partitions each route's answer depends on
+ROUTE_PARTITIONS = {
+    "resume": {"resume"},
+    "video": {"video"},
+    "web": {"web"},
+    "planner": {"resume", "video", "web"},  # map-reduce steps retrieve from any partition
+}
+
+class SemanticAnswerCache:
+    """
+    Caches final graph results keyed by query embedding. A new query whose
+    cosine similarity to a cached query is at least `threshold` gets the
+    stored generation, decision, documents and sources back without running
+    the graph. Entries expire after `ttl` seconds, the least recently used entries are
+    evicted beyond `max_entries`, and entries are dropped when a partition
+    they were answered from is re-ingested.
+    """
+    def __init__(self, embeddings=None, threshold: float = None, ttl: float = None, max_entries: int = None):
+        self._embeddings = embeddings
+        self.threshold = threshold if threshold is not None else settings.ANSWER_CACHE_THRESHOLD
+        self.ttl = ttl if ttl is not None else settings.ANSWER_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or settings.ANSWER_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        # Falls back to the shared registry client, resolved per call so a new API key takes effect
+        if self._embeddings is not None:
+            return self._embeddings
+        from config.resources import get_embeddings
+        return get_embeddings()
+
+    def _embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, now: float):
+        expired = [key for key, entry in self._entries.items() if now - entry["created_at"] > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def lookup(self, query: str, vector: np.ndarray = None) -> Optional[dict]:
+        """
+        Returns a copy of the closest cached result, or None on a miss.
+        """
+        vector = vector if vector is not None else self._embed(query)
+        with self._lock:
+            self._expire(time.time())
+            if not self._entries:
+                self.misses += 1
+                return None
+            keys = list(self._entries)
+            scores = np.stack([self._entries[key]["vector"] for key in keys]) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(keys[best])
+            entry = self._entries[keys[best]]
+            self.hits += 1
+            return dict(entry["result"], cache_hit=True, cache_similarity=float(scores[best]),
+                        cached_query=entry["query"])
+
+    def store(self, query: str, result: dict, vector: np.ndarray = None):
+        decision = result.get("decision")
+        if not result.get("generation") or decision not in ROUTE_PARTITIONS:
+            return
+        vector = vector if vector is not None else self._embed(query)
+        entry = {
+            "query": query,
+            "vector": vector,
+            "result": {key: result.get(key) for key in ("generation", "decision", "documents", "sources", "context_stats")},
+            "partitions": ROUTE_PARTITIONS[decision],
+            "created_at": time.time(),
+        }
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, source_type: str = None):
+        """
+        Drops entries answered from `source_type`, or everything if None.
+        """
+        with self._lock:
+            if source_type is None:
+                self._entries.clear()
+                return
+            stale = [key for key, entry in self._entries.items() if source_type in entry["partitions"]]
+            for key in stale:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
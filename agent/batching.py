@@ -0,0 +1,121 @@
+import asyncio
+import inspect
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Embeds several queries in one request. Gemini embeds queries with a
+    different task type than documents, so it is passed explicitly.
+    """
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    if "task_type" in inspect.signature(embeddings.embed_documents).parameters:
+        task_type = getattr(embeddings, "task_type", None) or "RETRIEVAL_QUERY"
+        return embeddings.embed_documents(texts, task_type=task_type)
+    # Models without task types embed queries and documents alike
+    return embeddings.embed_documents(texts)
+
+class QueryBatcher(Embeddings):
+    """
+    Collects embed_query calls from concurrent requests for up to `max_wait_ms`
+    (or until `max_batch` are waiting) and embeds them with one batched call.
+    Up to `concurrency` batches are in flight while the next one fills.
+    Documents pass straight through.
+    """
+    def __init__(self, underlying: Embeddings, max_batch: int = None, max_wait_ms: float = None, concurrency: int = None):
+        self.underlying = underlying
+        self.max_batch = max_batch or settings.QUERY_BATCH_SIZE
+        self.max_wait_ms = max_wait_ms if max_wait_ms is not None else settings.QUERY_BATCH_WAIT_MS
+        self.batches = 0
+        self.queries = 0
+        self.largest = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=concurrency or settings.QUERY_BATCH_CONCURRENCY,
+                                        thread_name_prefix="query-batch")
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._collect, name="query-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._pool.submit(self._flush, batch)
+
+    def _flush(self, batch: list):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = dict(zip(texts, embed_queries(self.underlying, texts)))
+        except BaseException as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        with self._lock:
+            self.batches += 1
+            self.queries += len(batch)
+            self.largest = max(self.largest, len(batch))
+        for text, future in batch:
+            future.set_result(vectors[text])
+
+    def submit(self, text: str) -> Future:
+        self._start()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.underlying.aembed_documents(texts)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"batches": self.batches, "queries": self.queries, "largest_batch": self.largest,
+                    "mean_batch": round(self.queries / self.batches, 2) if self.batches else 0.0,
+                    "waiting": self._queue.qsize()}
+
+    def __getattr__(self, name):
+        return getattr(self.underlying, name)
+
+_batchers: List[QueryBatcher] = []
+
+def batch_queries(embeddings: Embeddings) -> Embeddings:
+    """
+    Wraps `embeddings` in a QueryBatcher when QUERY_BATCHING_ENABLED is on (the query server turns it on).
+    """
+    if not settings.QUERY_BATCHING_ENABLED:
+        return embeddings
+    batcher = QueryBatcher(embeddings)
+    _batchers.append(batcher)
+    return batcher
+
+def batcher_stats() -> List[dict]:
+    return [batcher.stats() for batcher in _batchers]
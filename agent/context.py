@@ -0,0 +1,129 @@
+import re
+from typing import List, Tuple
+
+from langchain_core.documents import Document
+
+from config import settings
+
+_WORD = re.compile(r"\w+")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (~4 characters per token for Gemini on English text).
+    """
+    return (len(text) + 3) // 4
+
+def _overlap(left: str, right: str, limit: int) -> int:
+    """
+    Length of the longest suffix of `left` that is also a prefix of `right`.
+    """
+    for size in range(min(len(left), len(right), limit), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+def _shingles(text: str, size: int = 5) -> set:
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def _similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def _format(passage: dict) -> str:
+    if passage.get("link"):
+        # Video passages point at the moment they start
+        return f"Source: {passage['source']} ({passage['link']})\nContent: {passage['text']}"
+    return f"Source: {passage['source']}\nContent: {passage['text']}"
+
+def merge_passages(results: List[Document]) -> List[dict]:
+    """
+    Merges retrieved chunks that are adjacent in the same source into single
+    passages, removing the text they share through chunk overlap. Each
+    passage keeps the best (lowest) retrieval rank of its chunks.
+    """
+    limit = settings.CHUNK_OVERLAP * 2
+    passages = []
+    by_source = {}
+    for rank, doc in enumerate(results):
+        # Chunk indexes restart for each video of a playlist, so videos are merged separately
+        key = (doc.metadata.get("source", "Unknown"), doc.metadata.get("video_id"))
+        by_source.setdefault(key, []).append((rank, doc))
+
+    for (source, _), items in by_source.items():
+        indexed = sorted((item for item in items if item[1].metadata.get("chunk_index") is not None),
+                         key=lambda item: item[1].metadata["chunk_index"])
+        loose = [item for item in items if item[1].metadata.get("chunk_index") is None]
+
+        current = None
+        for rank, doc in indexed:
+            index = doc.metadata["chunk_index"]
+            if current is not None and index == current["last_index"]:
+                continue # same chunk returned twice
+            if current is not None and index == current["last_index"] + 1:
+                cut = _overlap(current["text"], doc.page_content, limit)
+                joiner = "" if cut else "\n"
+                current["text"] += joiner + doc.page_content[cut:]
+                current["last_index"] = index
+                current["rank"] = min(current["rank"], rank)
+                current["chunks"] += 1
+                continue
+            if current is not None:
+                passages.append(current)
+            current = {"source": source, "text": doc.page_content, "rank": rank, "last_index": index, "chunks": 1,
+                       "link": doc.metadata.get("timestamp_url")}
+        if current is not None:
+            passages.append(current)
+
+        for rank, doc in loose:
+            passages.append({"source": source, "text": doc.page_content, "rank": rank, "last_index": None, "chunks": 1,
+                             "link": doc.metadata.get("timestamp_url")})
+
+    passages.sort(key=lambda passage: passage["rank"])
+    return passages
+
+def pack_context(results: List[Document], budget_tokens: int = None) -> Tuple[str, dict]:
+    """
+    Builds the prompt context from retrieved chunks: merges adjacent and
+    overlapping chunks, drops near-duplicates, then adds passages in
+    relevance order until `budget_tokens` is reached.
+    Returns (context, stats) where stats reports the tokens saved.
+    """
+    budget_tokens = budget_tokens or settings.CONTEXT_TOKEN_BUDGET
+    raw = "\n\n".join(f"Source: {doc.metadata.get('source', 'Unknown')}\nContent: {doc.page_content}" for doc in results)
+    raw_tokens = estimate_tokens(raw)
+
+    passages = merge_passages(results)
+    selected, selected_shingles = [], []
+    dropped_duplicates = dropped_budget = 0
+    used = 0
+    for passage in passages:
+        shingles = _shingles(passage["text"])
+        if any(_similarity(shingles, other) >= settings.CONTEXT_DEDUP_THRESHOLD for other in selected_shingles):
+            dropped_duplicates += 1
+            continue
+        cost = estimate_tokens(_format(passage)) + 1
+        if used + cost > budget_tokens:
+            dropped_budget += 1
+            continue
+        selected.append(passage)
+        selected_shingles.append(shingles)
+        used += cost
+
+    context = "\n\n".join(_format(passage) for passage in selected)
+    packed_tokens = estimate_tokens(context)
+    stats = {
+        "chunks": len(results),
+        "passages": len(selected),
+        "merged_chunks": sum(passage["chunks"] - 1 for passage in passages),
+        "dropped_duplicates": dropped_duplicates,
+        "dropped_over_budget": dropped_budget,
+        "budget_tokens": budget_tokens,
+        "raw_tokens": raw_tokens,
+        "packed_tokens": packed_tokens,
+        "saved_tokens": max(0, raw_tokens - packed_tokens),
+    }
+    return context, stats
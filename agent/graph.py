@@ -1,19 +1,35 @@
+import asyncio
+from typing import List
+
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
+from config import settings
 from agent.state import AgentState
-from agent.nodes import router_node, resume_node, video_node, web_node, planner_node
+from agent.nodes import (
+    condense_node, router_node, resume_node, video_node, web_node, planner_node,
+    acondense_node, arouter_node, aresume_node, avideo_node, aweb_node, aplanner_node,
+    chunk_text
+)
+from agent.context import estimate_tokens
+from agent.memory import get_memory
+from agent.tracing import traced_node, atraced_node, collect, span, export_trace
+from config.resources import get_answer_cache
 
 # Define initialization
 graph = StateGraph(AgentState)
 
-# Add Nodes
-graph.add_node("router", router_node)
-graph.add_node("resume", resume_node)
-graph.add_node("video", video_node)
-graph.add_node("web", web_node)
-graph.add_node("planner", planner_node)
+# Add Nodes (each with a sync and an async implementation, so both invoke and ainvoke work).
+# Every node returns its timed spans in state["trace"].
+graph.add_node("condense", RunnableLambda(traced_node("condense", condense_node), afunc=atraced_node("condense", acondense_node), name="condense"))
+graph.add_node("router", RunnableLambda(traced_node("router", router_node), afunc=atraced_node("router", arouter_node), name="router"))
+graph.add_node("resume", RunnableLambda(traced_node("resume", resume_node), afunc=atraced_node("resume", aresume_node), name="resume"))
+graph.add_node("video", RunnableLambda(traced_node("video", video_node), afunc=atraced_node("video", avideo_node), name="video"))
+graph.add_node("web", RunnableLambda(traced_node("web", web_node), afunc=atraced_node("web", aweb_node), name="web"))
+graph.add_node("planner", RunnableLambda(traced_node("planner", planner_node), afunc=atraced_node("planner", aplanner_node), name="planner"))
 
-# Set Entry Point
-graph.set_entry_point("router")
+# Set Entry Point: follow-ups are made standalone before routing
+graph.set_entry_point("condense")
+graph.add_edge("condense", "router")
 
 # Define Conditional Edges
 def route_decision(state: AgentState):
@@ -39,3 +55,170 @@ graph.add_edge("planner", END)
 
 # Compile Graph
 app_graph = graph.compile()
+
+def load_memory(initial_state: dict) -> dict:
+    """
+    Fills state["messages"] with the session's conversation memory (rolling
+    summary + recent turns) when a session_id is given. The load span starts the trace.
+    """
+    memory = get_memory()
+    session_id = initial_state.get("session_id")
+    if memory is None or not session_id or initial_state.get("messages"):
+        return initial_state
+    with collect() as spans:
+        messages = memory.messages(session_id)
+    stats = {"messages": len(messages), "tokens": sum(estimate_tokens(m.content) for m in messages),
+             "summary": bool(messages) and messages[0].type == "system"}
+    return {**initial_state, "messages": messages, "memory_stats": stats,
+            "trace": list(initial_state.get("trace") or []) + list(spans)}
+
+def save_memory(initial_state: dict, result: dict):
+    """
+    Checkpoints the exchange to the session (as the user typed it), summarizing
+    turns that no longer fit the memory window.
+    """
+    memory = get_memory()
+    session_id = initial_state.get("session_id")
+    if memory is None or not session_id or not result.get("generation"):
+        return
+    try:
+        memory.record(session_id, initial_state["query"], result["generation"])
+    except Exception as e:
+        print(f"[ERROR] Could not save conversation memory: {e}")
+
+def answer_cache_for(state: dict):
+    """
+    The semantic answer cache of the current API key and Mongo URI, or None when it does not apply.
+    """
+    # A follow-up's answer depends on the conversation, so only first turns use the answer cache
+    if state.get("messages"):
+        return None
+    return get_answer_cache()
+
+def lookup_cached(initial_state: dict, answer_cache):
+    """
+    Returns the cached result for the query (with its lookup span appended to the trace), or None.
+    """
+    with collect() as spans:
+        with span("answer_cache.lookup", "cache") as record:
+            cached = answer_cache.lookup(initial_state["query"])
+            record["hit"] = cached is not None
+    if cached is None:
+        return None
+    return {**initial_state, **cached, "trace": list(initial_state.get("trace") or []) + list(spans)}
+
+def answer_query(initial_state: dict) -> dict:
+    """
+    Runs the graph for `initial_state`, serving near-duplicate queries from
+    the semantic answer cache without any LLM calls. With a session_id the
+    conversation memory is loaded into the state and the turn is checkpointed.
+    """
+    initial_state = load_memory(initial_state)
+    query = initial_state["query"]
+    answer_cache = answer_cache_for(initial_state)
+    cached = lookup_cached(initial_state, answer_cache) if answer_cache is not None else None
+    if cached is not None:
+        save_memory(initial_state, cached)
+        export_trace(query, cached["trace"])
+        return cached
+
+    result = app_graph.invoke(initial_state)
+    if answer_cache is not None:
+        answer_cache.store(query, result)
+    save_memory(initial_state, result)
+    export_trace(query, result.get("trace"))
+    return result
+
+WORKER_NODES = {"resume", "video", "web", "planner"}
+
+def stream_answer(initial_state: dict):
+    """
+    Runs the graph in streaming mode and yields events for the UI:
+      ("route", update)  once the router has decided,
+      ("token", text)    for each generated token of the worker node
+                         (the map-reduce planner yields whole steps, in order),
+      ("final", state)   with the complete result at the end.
+    Cache hits yield the whole cached answer as a single token.
+    """
+    initial_state = load_memory(initial_state)
+    query = initial_state["query"]
+    answer_cache = answer_cache_for(initial_state)
+    if answer_cache is not None:
+        result = lookup_cached(initial_state, answer_cache)
+        if result is not None:
+            save_memory(initial_state, result)
+            export_trace(query, result["trace"])
+            yield "route", {key: result.get(key) for key in ("decision", "route_path", "route_confidence")}
+            yield "token", result["generation"]
+            yield "final", result
+            return
+
+    result = dict(initial_state, trace=list(initial_state.get("trace") or []))
+    for mode, payload in app_graph.stream(initial_state, stream_mode=["updates", "messages", "custom"]):
+        if mode == "custom":
+            if "planner_step" in payload:
+                yield "token", payload["text"]
+        elif mode == "messages":
+            chunk, metadata = payload
+            # Router fallback and condense tokens are not part of the answer
+            if metadata.get("langgraph_node") in WORKER_NODES:
+                text = chunk_text(chunk)
+                if text:
+                    yield "token", text
+        else:
+            for node, update in payload.items():
+                if update:
+                    # Node updates carry only their own spans; accumulate like the graph reducer
+                    result.update({key: value for key, value in update.items() if key != "trace"})
+                    result["trace"] += update.get("trace") or []
+                if node == "router":
+                    yield "route", dict(update or {})
+
+    if answer_cache is not None:
+        answer_cache.store(query, result)
+    save_memory(initial_state, result)
+    export_trace(query, result["trace"])
+    yield "final", result
+
+async def aanswer_query(initial_state: dict) -> dict:
+    """
+    Async counterpart of answer_query, built on app_graph.ainvoke.
+    """
+    initial_state = await asyncio.to_thread(load_memory, initial_state)
+    query = initial_state["query"]
+    answer_cache = answer_cache_for(initial_state)
+    cached = await asyncio.to_thread(lookup_cached, initial_state, answer_cache) if answer_cache is not None else None
+    if cached is not None:
+        await asyncio.to_thread(save_memory, initial_state, cached)
+        export_trace(query, cached["trace"])
+        return cached
+
+    result = await app_graph.ainvoke(initial_state)
+    if answer_cache is not None:
+        await asyncio.to_thread(answer_cache.store, query, result)
+    await asyncio.to_thread(save_memory, initial_state, result)
+    export_trace(query, result.get("trace"))
+    return result
+
+async def aanswer_many(queries: List[str], concurrency: int = None) -> List[dict]:
+    """
+    Answers many queries concurrently on the running event loop, with at most
+    `concurrency` graph runs in flight. Results keep the order of `queries`;
+    a failed query yields {"query": ..., "error": ...} instead of raising.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.AGENT_MAX_CONCURRENCY)
+
+    async def run(query: str) -> dict:
+        async with semaphore:
+            try:
+                return await aanswer_query({"query": query, "messages": []})
+            except Exception as e:
+                return {"query": query, "error": str(e)}
+
+    return await asyncio.gather(*(run(query) for query in queries))
+
+def answer_many(queries: List[str], concurrency: int = None) -> List[dict]:
+    """
+    Synchronous entry point for aanswer_many: runs every query on one new event loop.
+    """
+    return asyncio.run(aanswer_many(queries, concurrency))
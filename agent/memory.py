@@ -0,0 +1,250 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from config import settings
+from agent.context import estimate_tokens
+from agent.prompts import MEMORY_SUMMARY_PROMPT
+from agent.tracing import span, fail, record_usage
+
+class SessionStore:
+    """
+    SQLite checkpoint of chat sessions: every turn in order, plus the rolling
+    summary and how many of the turns it already covers. Sessions survive
+    restarts and can be resumed by id.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, summary TEXT NOT NULL DEFAULT '', summarized INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            "session_id TEXT NOT NULL, idx INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL, "
+            "created_at REAL NOT NULL, PRIMARY KEY (session_id, idx))"
+        )
+        self._conn.commit()
+
+    def load(self, session_id: str) -> dict:
+        """
+        Returns {"summary", "summarized", "turns"} where `turns` are the
+        (index, role, content) rows not yet folded into the summary.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, summarized FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            summary, summarized = row or ("", 0)
+            turns = self._conn.execute(
+                "SELECT idx, role, content FROM turns WHERE session_id = ? AND idx >= ? ORDER BY idx",
+                (session_id, summarized)
+            ).fetchall()
+        return {"summary": summary, "summarized": summarized, "turns": turns}
+
+    def history(self, session_id: str) -> List[dict]:
+        """
+        Every turn of the session as {"role", "content"}, for redisplaying a resumed chat.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content FROM turns WHERE session_id = ? ORDER BY idx", (session_id,)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def append(self, session_id: str, turns: List[tuple]):
+        """
+        Appends (role, content) turns after the last stored one.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, created_at, updated_at) VALUES (?, ?, ?)",
+                (session_id, now, now)
+            )
+            start = self._conn.execute(
+                "SELECT COALESCE(MAX(idx) + 1, 0) FROM turns WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT INTO turns (session_id, idx, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(session_id, start + offset, role, content, now) for offset, (role, content) in enumerate(turns)]
+            )
+            self._conn.execute("UPDATE sessions SET updated_at = ? WHERE session_id = ?", (now, session_id))
+            self._conn.commit()
+
+    def set_summary(self, session_id: str, summary: str, summarized: int):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sessions SET summary = ?, summarized = ?, updated_at = ? WHERE session_id = ?",
+                (summary, summarized, time.time(), session_id)
+            )
+            self._conn.commit()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            turns = self._conn.execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+        return {"sessions": sessions, "turns": turns}
+
+_ROLES = {"user": HumanMessage, "assistant": AIMessage}
+
+def _transcript(turns) -> str:
+    return "\n".join(f"{'User' if role == 'user' else 'Assistant'}: {content}" for _, role, content in turns)
+
+def _clip(text: str, max_tokens: int) -> str:
+    # estimate_tokens counts ~4 characters per token
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text[:max_tokens * 4].rsplit(" ", 1)[0] + " ..."
+
+class ConversationMemory:
+    """
+    Bounded multi-turn memory. The prompt gets the rolling summary plus the
+    most recent turns that fit in `window_tokens` (at most `max_turns`
+    exchanges); older turns are folded into the summary, which is itself
+    capped at `summary_tokens`. Prompt size per turn therefore stays flat
+    however long the conversation runs.
+    """
+    def __init__(self, store: SessionStore = None, window_tokens: int = None, max_turns: int = None,
+                 summary_tokens: int = None, llm=None):
+        self.store = store or SessionStore(settings.MEMORY_PATH)
+        self.window_tokens = window_tokens or settings.MEMORY_WINDOW_TOKENS
+        self.max_turns = max_turns or settings.MEMORY_MAX_TURNS
+        self.summary_tokens = summary_tokens or settings.MEMORY_SUMMARY_TOKENS
+        self._llm = llm
+        self.summaries = 0
+        self._session_locks = {}
+        self._locks_lock = threading.Lock()
+
+    @property
+    def llm(self):
+        if self._llm is not None:
+            return self._llm
+        from config.resources import get_llm
+        return get_llm()
+
+    def _session_lock(self, session_id: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._session_locks.setdefault(session_id, threading.Lock())
+
+    def messages(self, session_id: str) -> List[BaseMessage]:
+        """
+        The summary (as a system message) followed by the windowed turns, ready to put in state["messages"].
+        """
+        with span("memory.load", "memory") as record:
+            checkpoint = self.store.load(session_id)
+            messages = []
+            if checkpoint["summary"]:
+                messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{checkpoint['summary']}"))
+            messages += [_ROLES[role](content=content) for _, role, content in checkpoint["turns"]]
+            record["messages"] = len(messages)
+            return messages
+
+    def record(self, session_id: str, query: str, answer: str):
+        """
+        Checkpoints one exchange, then folds turns that no longer fit the window into the summary.
+        """
+        with self._session_lock(session_id):
+            self.store.append(session_id, [("user", query), ("assistant", answer)])
+            self._compact(session_id)
+
+    def _fits(self, turns, tokens: int, exchanges: int) -> bool:
+        return len(turns) <= exchanges * 2 and sum(estimate_tokens(content) for _, _, content in turns) <= tokens
+
+    def _overflow(self, turns) -> int:
+        """
+        Number of leading turns (whole exchanges) to fold into the summary. Once
+        the window overflows it is cut to half, so the summary is rewritten
+        every few turns rather than on every one.
+        """
+        if self._fits(turns, self.window_tokens, self.max_turns):
+            return 0
+        drop = 0
+        while drop < len(turns) and not self._fits(turns[drop:], self.window_tokens // 2, max(1, self.max_turns // 2)):
+            drop += 2
+        return min(drop, len(turns))
+
+    def _compact(self, session_id: str):
+        checkpoint = self.store.load(session_id)
+        turns = checkpoint["turns"]
+        drop = self._overflow(turns)
+        if not drop:
+            return
+        folded = turns[:drop]
+        summarized = folded[-1][0] + 1
+        try:
+            summary = self.summarize(checkpoint["summary"], folded)
+        except Exception as e:
+            # Never let the window grow: keep the old summary and drop the turns from the prompt
+            print(f"[WARN] Summarizing session {session_id} failed, dropping {drop} turns from memory: {e}")
+            summary = checkpoint["summary"]
+        self.store.set_summary(session_id, summary, summarized)
+
+    def summarize(self, summary: str, turns) -> str:
+        prompt = MEMORY_SUMMARY_PROMPT.format(summary=summary or "(none)", transcript=_transcript(turns),
+                                              words=self.summary_tokens * 3 // 4)
+        with span("llm.summarize", "llm") as record:
+            try:
+                response = self.llm.invoke(prompt)
+            except Exception as e:
+                fail(record, e)
+                raise
+            record_usage(record, response.usage_metadata)
+        self.summaries += 1
+        return _clip(response.content.strip() if isinstance(response.content, str) else str(response.content),
+                     self.summary_tokens)
+
+    def history(self, session_id: str) -> List[dict]:
+        return self.store.history(session_id)
+
+    def forget(self, session_id: str):
+        self.store.delete(session_id)
+
+    def stats(self) -> dict:
+        return dict(self.store.stats(), summaries=self.summaries)
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+def format_history(messages: List[BaseMessage]) -> str:
+    """
+    Plain-text rendering of state["messages"] for single-string prompts.
+    """
+    lines = []
+    for message in messages:
+        if isinstance(message, SystemMessage):
+            lines.append(message.content)
+        else:
+            lines.append(f"{'User' if isinstance(message, HumanMessage) else 'Assistant'}: {message.content}")
+    return "\n".join(lines)
+
+_memory = None
+_init_lock = threading.Lock()
+
+def get_memory() -> Optional[ConversationMemory]:
+    """
+    Process-wide conversation memory, or None when MEMORY_ENABLED is off.
+    """
+    global _memory
+    if not settings.MEMORY_ENABLED:
+        return None
+    with _init_lock:
+        if _memory is None:
+            _memory = ConversationMemory()
+        return _memory
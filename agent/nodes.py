@@ -1,102 +1,478 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_mongodb import MongoDBAtlasVectorSearch
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langgraph.constants import TAG_NOSTREAM
 
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from config import settings
-from database.mongo import mongo_handler
-from agent.prompts import ROUTER_SYSTEM_PROMPT, RESUME_QA_PROMPT, LEARNING_QA_PROMPT, PLANNER_PROMPT
+from config.resources import get_llm, get_vector_store
+from agent.prompts import (
+    ROUTER_SYSTEM_PROMPT, RESUME_QA_PROMPT, LEARNING_QA_PROMPT, PLANNER_PROMPT, CONDENSE_QUESTION_PROMPT,
+    PLANNER_OUTLINE_PROMPT, PLANNER_STEP_PROMPT
+)
 from agent.state import AgentState
+from agent.router import LocalRouter
+from agent.retrieval import hybrid_search, ahybrid_search
+from agent.context import pack_context
+from agent.memory import format_history
+from agent.planner import parse_outline, format_outline, format_step, merge_context_stats, step_writer
+from agent.tracing import span, fail, record_usage
 
-# Initialize LLM
-llm = ChatGoogleGenerativeAI(model=settings.LLM_MODEL, google_api_key=settings.GOOGLE_API_KEY)
+# The LLM, embeddings and vector store are built lazily by config.resources
+# and cached per API key / Mongo URI; the backend is chosen in settings.
 
-# Initialize Vector Store (Re-using logic, but cleaner to have a helper)
-embeddings = GoogleGenerativeAIEmbeddings(
-     model=settings.EMBEDDING_MODEL,
-     google_api_key=settings.GOOGLE_API_KEY
-)
+def search_documents(query: str, source_type: str) -> list:
+    # Filter by source_type; dense results are fused with BM25 when hybrid search is on
+    with span("retrieval", "retrieval", source_type=source_type) as record:
+        try:
+            results = hybrid_search(get_vector_store(), query, source_type)
+        except Exception as e:
+            print(f"Retrieval Error: {e}")
+            fail(record, e)
+            results = []
+        record["results"] = len(results)
+        return results
 
-vector_store = MongoDBAtlasVectorSearch(
-    collection=mongo_handler.get_collection(),
-    embedding=embeddings,
-    index_name=settings.INDEX_NAME,
-    relevance_score_fn=settings.VECTOR_SEARCH_METRIC
-)
+def list_sources(results) -> list:
+    # Video chunks link to the moment they were taken from
+    return list(dict.fromkeys(doc.metadata.get("timestamp_url") or doc.metadata.get("source", "Unknown") for doc in results))
 
 def retrieve_documents(query: str, source_type: str) -> str:
-    # Filter by source_type
-    filter_query = {"source_type": source_type}
-    try:
-        results = vector_store.similarity_search(query, k=5, pre_filter=filter_query)
-        return "\n\n".join([f"Source: {doc.metadata.get('source', 'Unknown')}\nContent: {doc.page_content}" for doc in results])
-    except Exception as e:
-        print(f"Retrieval Error: {e}")
-        return ""
+    return pack_context(search_documents(query, source_type))[0]
 
-def router_node(state: AgentState):
+def generate(prompt) -> str:
     """
-    Classifies the user's query.
+    Streams the LLM response and returns the full text. Streaming lets
+    app_graph.stream(stream_mode="messages") forward tokens as they arrive.
+    """
+    with span("llm.generate", "llm") as record:
+        parts = []
+        for chunk in get_llm().stream(prompt):
+            parts.append(chunk_text(chunk))
+            record_usage(record, getattr(chunk, "usage_metadata", None))
+        return "".join(parts)
+
+def with_history(state: AgentState, prompt: str):
+    """
+    Prepends the conversation memory (summary + recent turns) to a worker prompt.
+    Without history the prompt is sent as a plain string, as before.
+    """
+    history = state.get("messages") or []
+    if not history:
+        return prompt
+    return [*history, HumanMessage(content=prompt)]
+
+def condense_node(state: AgentState):
     """
+    Rewrites a follow-up question into a standalone one, so routing and
+    retrieval see what "it" or "that" refers to. No-op on the first turn.
+    """
+    history = state.get("messages") or []
+    if not history or not settings.MEMORY_CONDENSE_QUERY:
+        return {}
+    prompt = CONDENSE_QUESTION_PROMPT.format(history=format_history(history), question=state["query"])
+    with span("llm.condense", "llm") as record:
+        try:
+            response = get_llm().invoke(prompt)
+        except Exception as e:
+            print(f"Condense Error: {e}")
+            fail(record, e)
+            return {}
+        record_usage(record, response.usage_metadata)
+    standalone = chunk_text(response).strip()
+    return {"query": standalone, "original_query": state["query"]} if standalone else {}
+
+def chunk_text(chunk) -> str:
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    # Some Gemini responses arrive as a list of content parts
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+# Embedding/keyword classifier tried before the LLM router
+local_router = LocalRouter()
+
+def llm_route(query: str) -> str:
     messages = [
         SystemMessage(content=ROUTER_SYSTEM_PROMPT),
-        HumanMessage(content=state["query"])
+        HumanMessage(content=query)
     ]
-    response = llm.invoke(messages)
+    with span("llm.route", "llm") as record:
+        response = get_llm().invoke(messages)
+        record_usage(record, response.usage_metadata)
     decision = response.content.strip().lower()
-    
+
     # Fallback/Safety
     if decision not in ["resume", "video", "web", "planner"]:
         decision = "web" # default
-    
-    return {"decision": decision}
+    return decision
+
+def decide_route(query: str) -> dict:
+    """
+    Classifies the user's query. The local classifier decides when it is
+    confident enough; otherwise the LLM router is called.
+    """
+    confidence = 0.0
+    if settings.ROUTER_MODE != "llm":
+        try:
+            with span("router.local", "router"):
+                decision, confidence = local_router.classify(query)[:2]
+            if settings.ROUTER_MODE == "local" or confidence >= settings.ROUTER_CONFIDENCE_THRESHOLD:
+                return {"decision": decision, "route_path": "local", "route_confidence": confidence}
+        except Exception as e:
+            print(f"Local Router Error: {e}")
+
+    decision = llm_route(query)
+    return {"decision": decision, "route_path": "llm", "route_confidence": confidence}
+
+# Partitions searched speculatively while the router is still deciding
+SPECULATIVE_PARTITIONS = ("resume", "video", "web")
+_speculation_pool = ThreadPoolExecutor(max_workers=settings.SPECULATIVE_POOL_SIZE, thread_name_prefix="speculative")
+
+def _timed_search(query: str, source_type: str):
+    started = time.perf_counter()
+    results = search_documents(query, source_type)
+    return results, (time.perf_counter() - started) * 1000
+
+def _speculation_metrics(router_ms: float, retrieval_ms: float = None, waited_ms: float = None) -> dict:
+    metrics = {"router_ms": round(router_ms, 1), "searches": len(SPECULATIVE_PARTITIONS)}
+    if retrieval_ms is None:
+        # Planner: nothing to keep, every speculative search was wasted
+        metrics.update(retrieval_ms=None, waited_ms=0.0, hidden_ms=0.0)
+    else:
+        metrics.update(retrieval_ms=round(retrieval_ms, 1), waited_ms=round(waited_ms, 1),
+                       hidden_ms=round(max(0.0, retrieval_ms - waited_ms), 1))
+    return metrics
+
+def router_node(state: AgentState):
+    """
+    Routes the query. With SPECULATIVE_RETRIEVAL on, retrieval for every
+    partition starts alongside routing; the routed partition's results are
+    handed to the worker in `retrieved` and the rest are dropped.
+    """
+    query = state["query"]
+    if not settings.SPECULATIVE_RETRIEVAL:
+        return decide_route(query)
+
+    started = time.perf_counter()
+    # Each search runs in a copy of this context so its spans land in the router's trace
+    futures = {p: _speculation_pool.submit(contextvars.copy_context().run, _timed_search, query, p)
+               for p in SPECULATIVE_PARTITIONS}
+    update = decide_route(query)
+    routed = time.perf_counter()
+
+    decision = update["decision"]
+    for partition, future in futures.items():
+        if partition != decision:
+            future.cancel() # no-op if already running; its result is simply ignored
+
+    if decision not in futures:
+        update["speculation"] = _speculation_metrics((routed - started) * 1000)
+        return update
+
+    results, retrieval_ms = futures[decision].result()
+    waited_ms = (time.perf_counter() - routed) * 1000
+    update.update(retrieved=results, retrieved_for=decision,
+                  speculation=_speculation_metrics((routed - started) * 1000, retrieval_ms, waited_ms))
+    return update
+
+def retrieve_for(state: AgentState, source_type: str) -> list:
+    """
+    Uses speculatively prefetched results when the router produced them for this partition.
+    """
+    if state.get("retrieved_for") == source_type:
+        return state.get("retrieved") or []
+    return search_documents(state["query"], source_type)
 
 def resume_node(state: AgentState):
     """
     Handles Resume specific queries.
     """
     query = state["query"]
-    context = retrieve_documents(query, "resume")
+    results = retrieve_for(state, "resume")
+    context, context_stats = pack_context(results, settings.CONTEXT_TOKEN_BUDGETS.get("resume"))
     
     prompt = RESUME_QA_PROMPT.format(context=context, question=query)
-    response = llm.invoke(prompt)
+    generation = generate(with_history(state, prompt))
     
-    return {"generation": response.content, "documents": [context]}
+    return {"generation": generation, "documents": [context], "sources": list_sources(results),
+            "context_stats": context_stats}
 
 def video_node(state: AgentState):
     """
     Handles Video learning queries.
     """
     query = state["query"]
-    context = retrieve_documents(query, "video")
+    results = retrieve_for(state, "video")
+    context, context_stats = pack_context(results, settings.CONTEXT_TOKEN_BUDGETS.get("video"))
     
     prompt = LEARNING_QA_PROMPT.format(context=context, question=query)
-    response = llm.invoke(prompt)
+    generation = generate(with_history(state, prompt))
     
-    return {"generation": response.content, "documents": [context]}
+    return {"generation": generation, "documents": [context], "sources": list_sources(results),
+            "context_stats": context_stats}
 
 def web_node(state: AgentState):
     """
     Handles Web learning queries.
     """
     query = state["query"]
-    context = retrieve_documents(query, "web")
+    results = retrieve_for(state, "web")
+    context, context_stats = pack_context(results, settings.CONTEXT_TOKEN_BUDGETS.get("web"))
     
     prompt = LEARNING_QA_PROMPT.format(context=context, question=query)
-    response = llm.invoke(prompt)
+    generation = generate(with_history(state, prompt))
     
-    return {"generation": response.content, "documents": [context]}
+    return {"generation": generation, "documents": [context], "sources": list_sources(results),
+            "context_stats": context_stats}
+
+# Planner LLM calls whose tokens must not reach stream_mode="messages": steps are streamed whole, in order
+NOSTREAM = {"tags": [TAG_NOSTREAM]}
+_planner_pool = ThreadPoolExecutor(max_workers=settings.PLANNER_CONCURRENCY, thread_name_prefix="planner")
+
+def _outline_prompt(state: AgentState):
+    return with_history(state, PLANNER_OUTLINE_PROMPT.format(question=state["query"], max_steps=settings.PLANNER_MAX_STEPS))
+
+def _step_prompt(query: str, steps: list, number: int, context: str) -> str:
+    return PLANNER_STEP_PROMPT.format(question=query, outline=format_outline(steps), number=number,
+                                      step=steps[number - 1][0], context=context or "(nothing relevant ingested)")
+
+def _step_result(number: int, title: str, text: str, context: str, results: list, context_stats: dict) -> dict:
+    return {"text": format_step(number, title, text), "context": context, "sources": list_sources(results),
+            "context_stats": context_stats}
+
+def _assemble_plan(outputs: list) -> dict:
+    return {"generation": "\n\n".join(output["text"] for output in outputs),
+            "documents": [output["context"] for output in outputs if output["context"]],
+            "sources": list(dict.fromkeys(source for output in outputs for source in output["sources"])),
+            "context_stats": merge_context_stats([output["context_stats"] for output in outputs])}
+
+def outline_plan(state: AgentState) -> list:
+    """
+    Asks for a short outline of (step title, source type) pairs.
+    """
+    with span("llm.outline", "llm") as record:
+        response = get_llm().invoke(_outline_prompt(state), config=NOSTREAM)
+        record_usage(record, response.usage_metadata)
+    return parse_outline(chunk_text(response), settings.PLANNER_MAX_STEPS)
+
+def expand_step(query: str, steps: list, number: int) -> dict:
+    """
+    Retrieves from the step's source type and writes that one step.
+    """
+    title, source_type = steps[number - 1]
+    with span("planner.step", "planner", step=number, source_type=source_type) as record:
+        results = search_documents(title, source_type)
+        context, context_stats = pack_context(results, settings.PLANNER_STEP_TOKEN_BUDGET)
+        try:
+            with span("llm.generate", "llm") as llm_record:
+                response = get_llm().invoke(_step_prompt(query, steps, number, context), config=NOSTREAM)
+                record_usage(llm_record, response.usage_metadata)
+            text = chunk_text(response)
+        except Exception as e:
+            # One failed step should not lose the rest of the plan
+            print(f"Planner Step Error: {e}")
+            fail(record, e)
+            text = f"_This step could not be expanded: {e}_"
+        return _step_result(number, title, text, context, results, context_stats)
 
 def planner_node(state: AgentState):
     """
-    Handles complex planning queries.
+    Handles complex planning queries. In "map_reduce" mode a short outline
+    is generated first, then every step does its own retrieval and
+    generation in parallel (PLANNER_CONCURRENCY at a time), so latency is
+    bounded by the slowest step. Finished steps are streamed in order
+    through the graph's "custom" stream mode.
     """
     query = state["query"]
-    prompt = PLANNER_PROMPT.format(question=query)
-    response = llm.invoke(prompt)
-    
-    return {"generation": response.content}
+    steps = outline_plan(state) if settings.PLANNER_MODE == "map_reduce" else []
+    if not steps:
+        prompt = PLANNER_PROMPT.format(question=query)
+        return {"generation": generate(with_history(state, prompt))}
+
+    write = step_writer()
+    # Each step runs in a copy of this context so its spans land in the planner's trace
+    futures = [_planner_pool.submit(contextvars.copy_context().run, expand_step, query, steps, number)
+               for number in range(1, len(steps) + 1)]
+    outputs = []
+    try:
+        for future in futures:
+            output = future.result()
+            write({"planner_step": len(outputs) + 1, "text": ("\n\n" if outputs else "") + output["text"]})
+            outputs.append(output)
+    finally:
+        for future in futures:
+            future.cancel()
+    return _assemble_plan(outputs)
+
+# --- Async variants (used by app_graph.ainvoke / astream) ---
+
+async def asearch_documents(query: str, source_type: str) -> list:
+    with span("retrieval", "retrieval", source_type=source_type) as record:
+        try:
+            results = await ahybrid_search(get_vector_store(), query, source_type)
+        except Exception as e:
+            print(f"Retrieval Error: {e}")
+            fail(record, e)
+            results = []
+        record["results"] = len(results)
+        return results
+
+async def agenerate(prompt) -> str:
+    with span("llm.generate", "llm") as record:
+        parts = []
+        async for chunk in get_llm().astream(prompt):
+            parts.append(chunk_text(chunk))
+            record_usage(record, getattr(chunk, "usage_metadata", None))
+        return "".join(parts)
+
+async def acondense_node(state: AgentState):
+    history = state.get("messages") or []
+    if not history or not settings.MEMORY_CONDENSE_QUERY:
+        return {}
+    prompt = CONDENSE_QUESTION_PROMPT.format(history=format_history(history), question=state["query"])
+    with span("llm.condense", "llm") as record:
+        try:
+            response = await get_llm().ainvoke(prompt)
+        except Exception as e:
+            print(f"Condense Error: {e}")
+            fail(record, e)
+            return {}
+        record_usage(record, response.usage_metadata)
+    standalone = chunk_text(response).strip()
+    return {"query": standalone, "original_query": state["query"]} if standalone else {}
+
+async def allm_route(query: str) -> str:
+    messages = [
+        SystemMessage(content=ROUTER_SYSTEM_PROMPT),
+        HumanMessage(content=query)
+    ]
+    with span("llm.route", "llm") as record:
+        response = await get_llm().ainvoke(messages)
+        record_usage(record, response.usage_metadata)
+    decision = response.content.strip().lower()
+    if decision not in ["resume", "video", "web", "planner"]:
+        decision = "web" # default
+    return decision
+
+async def adecide_route(query: str) -> dict:
+    confidence = 0.0
+    if settings.ROUTER_MODE != "llm":
+        try:
+            # The local classifier only needs a (usually cached) query embedding
+            with span("router.local", "router"):
+                decision, confidence = (await asyncio.to_thread(local_router.classify, query))[:2]
+            if settings.ROUTER_MODE == "local" or confidence >= settings.ROUTER_CONFIDENCE_THRESHOLD:
+                return {"decision": decision, "route_path": "local", "route_confidence": confidence}
+        except Exception as e:
+            print(f"Local Router Error: {e}")
+
+    decision = await allm_route(query)
+    return {"decision": decision, "route_path": "llm", "route_confidence": confidence}
+
+async def _atimed_search(query: str, source_type: str):
+    started = time.perf_counter()
+    results = await asearch_documents(query, source_type)
+    return results, (time.perf_counter() - started) * 1000
+
+async def arouter_node(state: AgentState):
+    query = state["query"]
+    if not settings.SPECULATIVE_RETRIEVAL:
+        return await adecide_route(query)
+
+    started = time.perf_counter()
+    tasks = {p: asyncio.create_task(_atimed_search(query, p)) for p in SPECULATIVE_PARTITIONS}
+    try:
+        update = await adecide_route(query)
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    routed = time.perf_counter()
+
+    decision = update["decision"]
+    for partition, task in tasks.items():
+        if partition != decision:
+            task.cancel()
+
+    if decision not in tasks:
+        update["speculation"] = _speculation_metrics((routed - started) * 1000)
+        return update
+
+    results, retrieval_ms = await tasks[decision]
+    waited_ms = (time.perf_counter() - routed) * 1000
+    update.update(retrieved=results, retrieved_for=decision,
+                  speculation=_speculation_metrics((routed - started) * 1000, retrieval_ms, waited_ms))
+    return update
+
+async def aretrieve_for(state: AgentState, source_type: str) -> list:
+    if state.get("retrieved_for") == source_type:
+        return state.get("retrieved") or []
+    return await asearch_documents(state["query"], source_type)
+
+async def _aanswer_from(state: AgentState, source_type: str, template: str):
+    query = state["query"]
+    results = await aretrieve_for(state, source_type)
+    context, context_stats = pack_context(results, settings.CONTEXT_TOKEN_BUDGETS.get(source_type))
+    generation = await agenerate(with_history(state, template.format(context=context, question=query)))
+    return {"generation": generation, "documents": [context], "sources": list_sources(results),
+            "context_stats": context_stats}
+
+async def aresume_node(state: AgentState):
+    return await _aanswer_from(state, "resume", RESUME_QA_PROMPT)
+
+async def avideo_node(state: AgentState):
+    return await _aanswer_from(state, "video", LEARNING_QA_PROMPT)
+
+async def aweb_node(state: AgentState):
+    return await _aanswer_from(state, "web", LEARNING_QA_PROMPT)
+
+async def aoutline_plan(state: AgentState) -> list:
+    with span("llm.outline", "llm") as record:
+        response = await get_llm().ainvoke(_outline_prompt(state), config=NOSTREAM)
+        record_usage(record, response.usage_metadata)
+    return parse_outline(chunk_text(response), settings.PLANNER_MAX_STEPS)
+
+async def aexpand_step(query: str, steps: list, number: int, semaphore: asyncio.Semaphore) -> dict:
+    title, source_type = steps[number - 1]
+    async with semaphore:
+        with span("planner.step", "planner", step=number, source_type=source_type) as record:
+            results = await asearch_documents(title, source_type)
+            context, context_stats = pack_context(results, settings.PLANNER_STEP_TOKEN_BUDGET)
+            try:
+                with span("llm.generate", "llm") as llm_record:
+                    response = await get_llm().ainvoke(_step_prompt(query, steps, number, context), config=NOSTREAM)
+                    record_usage(llm_record, response.usage_metadata)
+                text = chunk_text(response)
+            except Exception as e:
+                print(f"Planner Step Error: {e}")
+                fail(record, e)
+                text = f"_This step could not be expanded: {e}_"
+            return _step_result(number, title, text, context, results, context_stats)
+
+async def aplanner_node(state: AgentState):
+    query = state["query"]
+    steps = await aoutline_plan(state) if settings.PLANNER_MODE == "map_reduce" else []
+    if not steps:
+        generation = await agenerate(with_history(state, PLANNER_PROMPT.format(question=query)))
+        return {"generation": generation}
+
+    write = step_writer()
+    semaphore = asyncio.Semaphore(settings.PLANNER_CONCURRENCY)
+    tasks = [asyncio.create_task(aexpand_step(query, steps, number, semaphore)) for number in range(1, len(steps) + 1)]
+    outputs = []
+    try:
+        for task in tasks:
+            output = await task
+            write({"planner_step": len(outputs) + 1, "text": ("\n\n" if outputs else "") + output["text"]})
+            outputs.append(output)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return _assemble_plan(outputs)
@@ -0,0 +1,57 @@
+import re
+from typing import List, Tuple
+
+from langgraph.config import get_stream_writer
+
+SOURCE_TYPES = ("video", "web", "resume")
+
+# "1. Learn embeddings | video", "- Build the index (web)", ...
+_STEP = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*(.+?)\s*$")
+_SOURCE = re.compile(r"\s*(?:\|\s*|[\[(]\s*)(video|web|resume)\s*[\])]?\s*$", re.IGNORECASE)
+
+def parse_outline(text: str, max_steps: int) -> List[Tuple[str, str]]:
+    """
+    Parses the outline into (step title, source type) pairs, at most `max_steps`.
+    Steps without a recognised source type search "web".
+    """
+    steps = []
+    for line in text.splitlines():
+        match = _STEP.match(line)
+        if not match:
+            continue
+        title, source_type = match.group(1), "web"
+        source = _SOURCE.search(title)
+        if source:
+            title, source_type = title[:source.start()], source.group(1).lower()
+        title = title.strip(" *_`").strip()
+        if title:
+            steps.append((title, source_type))
+        if len(steps) >= max_steps:
+            break
+    return steps
+
+def format_outline(steps: List[Tuple[str, str]]) -> str:
+    return "\n".join(f"{number}. {title}" for number, (title, _) in enumerate(steps, 1))
+
+def format_step(number: int, title: str, text: str) -> str:
+    return f"### Step {number}: {title}\n\n{text.strip()}"
+
+def merge_context_stats(stats: List[dict]) -> dict:
+    """
+    Sums the context-packing stats of every step.
+    """
+    merged = {}
+    for step_stats in stats:
+        for key, value in step_stats.items():
+            if isinstance(value, (int, float)):
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+def step_writer():
+    """
+    Writer for the graph's "custom" stream mode, or a no-op when the node runs outside a graph.
+    """
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda payload: None
@@ -0,0 +1,92 @@
+import os
+import sys
+import threading
+from collections import Counter
+from typing import List, Tuple
+
+from config import settings
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+class SamplingProfiler:
+    """
+    Low-overhead wall-clock profiler: a background thread snapshots the stack
+    of every other thread every `interval_ms` and counts the collapsed stacks.
+    Output is in the folded format read by flamegraph.pl and speedscope.
+    """
+    def __init__(self, interval_ms: float = None, max_depth: int = 64):
+        self.interval = (interval_ms or settings.PROFILER_INTERVAL_MS) / 1000
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        print(f"[INFO] Sampling profiler started ({self.interval * 1000:.0f} ms interval).")
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        print(f"[INFO] Sampling profiler stopped after {self.samples} samples.")
+
+    def reset(self):
+        with self._lock:
+            self.stacks = Counter()
+            self.samples = 0
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                self.samples += 1
+                for thread_id, frame in frames.items():
+                    if thread_id == own:
+                        continue
+                    stack = []
+                    while frame is not None and len(stack) < self.max_depth:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def top(self, n: int = 20) -> List[Tuple[str, int]]:
+        """
+        Functions most often on top of a stack (self time), as (label, samples).
+        Idle waits show up too; look past threading/selectors frames.
+        """
+        leaves = Counter()
+        with self._lock:
+            for stack, count in self.stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(n)
+
+    def folded(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def write_folded(self, path: str = None):
+        path = path or settings.PROFILER_OUTPUT_PATH
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.folded())
+        print(f"[INFO] Wrote {len(self.stacks)} stacks to '{path}'.")
+
+profiler = SamplingProfiler()
+if settings.PROFILER_ENABLED:
+    profiler.start()
@@ -44,3 +44,59 @@ For EACH major step of the plan, you MUST provide:
 
 Format the output cleanly in Markdown with bold headers for each step.
 """
+
+CONDENSE_QUESTION_PROMPT = """Given the conversation so far and a follow-up question, rewrite the follow-up as a standalone question that can be understood without the conversation.
+Resolve pronouns and references like "it", "that" or "the second step". If it is already standalone, return it unchanged.
+Return ONLY the question.
+
+Conversation:
+{history}
+
+Follow-up question: {question}
+"""
+
+MEMORY_SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an assistant with the new turns below.
+Keep the facts, names, decisions and open questions a later turn might refer back to; drop pleasantries and detail.
+Write at most {words} words.
+
+Current summary:
+{summary}
+
+New turns:
+{transcript}
+
+Updated summary:
+"""
+
+PLANNER_OUTLINE_PROMPT = """You are a senior planner and educator agent.
+The user has asked a complex question: {question}
+
+Break it down into at most {max_steps} major steps of a learning or execution plan, in order.
+For each step, name the knowledge-base section most likely to help with it:
+"video" (tutorials, lectures, how-tos), "web" (articles, documentation, definitions) or "resume" (the user's own background).
+
+Return ONLY the steps, one per line, formatted as:
+1. <short step title> | <video, web or resume>
+"""
+
+PLANNER_STEP_PROMPT = """You are a senior planner and educator agent, writing one step of a larger plan.
+Overall question: {question}
+Full outline:
+{outline}
+
+Write step {number}: {step}
+
+Use the following context from the knowledge base where it is relevant, and cite its sources by name or link.
+
+Context:
+{context}
+
+Provide:
+1. **Action**: Brief explanation of what to do or learn in this step.
+2. **Recommended Resources**:
+   - 🔗 **Web**: Specific documentation, tutorial sites, or free courses.
+   - 📺 **Video**: Specific YouTube Channels and with specific or relevant video titles or search terms.
+   - 📚 **Book**: Key textbooks or O'Reilly books or etc. books on the topic.
+
+Format the output in Markdown. Do not repeat the step title and do not write the other steps.
+"""
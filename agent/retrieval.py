@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+from typing import Dict, List, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from config import settings
+from database.vector_store import get_chunk_store, get_lexical_index
+from agent.tracing import span, fail
+
+def doc_key(doc: Document) -> str:
+    """
+    Stable identity of a retrieved chunk, used to merge results across retrievers.
+    """
+    key = doc.metadata.get("_id") or getattr(doc, "id", None)
+    if key:
+        return str(key)
+    return hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()[:32]
+
+def reciprocal_rank_fusion(rankings: Sequence[Tuple[List[str], float]], rrf_k: int = None) -> List[Tuple[str, float]]:
+    """
+    Fuses ranked id lists: score(d) = sum(weight / (rrf_k + rank)) over the
+    rankings that contain d. Returns (id, score) pairs, best first.
+    """
+    rrf_k = rrf_k if rrf_k is not None else settings.RRF_K
+    scores: Dict[str, float] = {}
+    for ids, weight in rankings:
+        for rank, key in enumerate(ids, start=1):
+            scores[key] = scores.get(key, 0.0) + weight / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+def _to_document(chunk: dict) -> Document:
+    metadata = {key: value for key, value in chunk.items() if key not in ("text", "embedding")}
+    metadata["_id"] = str(metadata["_id"])
+    return Document(page_content=chunk.get("text", ""), metadata=metadata)
+
+def fuse(query: str, source_type: str, vector_results: List[Document], k: int) -> List[Document]:
+    """
+    Combines dense results with BM25 hits from the same partition using
+    reciprocal rank fusion. Lexical-only hits are fetched from the chunk store.
+    """
+    lexical = get_lexical_index()
+    if lexical is None:
+        return vector_results[:k]
+
+    with span("bm25.search", "lexical") as record:
+        lexical_ids = [cid for cid, _ in lexical.search(query, source_type, settings.HYBRID_CANDIDATES)]
+        record["results"] = len(lexical_ids)
+    by_key = {doc_key(doc): doc for doc in vector_results}
+    fused = reciprocal_rank_fusion([
+        (list(by_key), settings.HYBRID_VECTOR_WEIGHT),
+        (lexical_ids, settings.HYBRID_LEXICAL_WEIGHT),
+    ])[:k]
+
+    missing = [key for key, _ in fused if key not in by_key]
+    if missing:
+        with span("chunk_store.get_chunks", "mongo", ids=len(missing)) as record:
+            try:
+                chunks = get_chunk_store().get_chunks(missing)
+                record["results"] = len(chunks)
+                for chunk in chunks:
+                    by_key[str(chunk["_id"])] = _to_document(chunk)
+            except Exception as e:
+                print(f"Lexical Fetch Error: {e}")
+                fail(record, e)
+    return [by_key[key] for key, _ in fused if key in by_key]
+
+def hybrid_search(vector_store, query: str, source_type: str, k: int = None) -> List[Document]:
+    """
+    Vector search over `source_type`, fused with BM25 when HYBRID_SEARCH is on.
+    """
+    k = k or settings.RETRIEVAL_K
+    depth = settings.HYBRID_CANDIDATES if settings.HYBRID_SEARCH else k
+    with span("vector_store.search", "mongo", backend=settings.VECTOR_STORE_BACKEND) as record:
+        results = vector_store.similarity_search(query, k=depth, pre_filter={"source_type": source_type})
+        record["results"] = len(results)
+    return fuse(query, source_type, results, k)
+
+async def ahybrid_search(vector_store, query: str, source_type: str, k: int = None) -> List[Document]:
+    k = k or settings.RETRIEVAL_K
+    depth = settings.HYBRID_CANDIDATES if settings.HYBRID_SEARCH else k
+    with span("vector_store.search", "mongo", backend=settings.VECTOR_STORE_BACKEND) as record:
+        results = await vector_store.asimilarity_search(query, k=depth, pre_filter={"source_type": source_type})
+        record["results"] = len(results)
+    return await asyncio.to_thread(fuse, query, source_type, results, k)
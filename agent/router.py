@@ -0,0 +1,128 @@
+import re
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+
+from config import settings
+
+ROUTES = ("resume", "video", "web", "planner")
+
+# Keyword rules mirroring the categories in ROUTER_SYSTEM_PROMPT
+KEYWORD_RULES = {
+    "resume": [
+        r"\bresume\b", r"\bcv\b", r"\bskills?\b", r"\bwork experience\b", r"\bexperience\b",
+        r"\beducation\b", r"\bdegree\b", r"\bcertifications?\b", r"\bcandidate\b", r"\bworked (at|on)\b",
+        r"\bprojects? (did|has)\b", r"\bemployer\b", r"\bqualifications?\b",
+    ],
+    "video": [
+        r"\btutorials?\b", r"\bhow[- ]to\b", r"\blectures?\b", r"\bvideos?\b", r"\bwalk ?through\b",
+        r"\bexplain\b", r"\bin detail\b", r"\barchitecture\b", r"\bhow does\b", r"\bhow do(es)? .* work\b",
+    ],
+    "web": [
+        r"\bwhat is\b", r"\bdefine\b", r"\bdefinition\b", r"\bhistory\b",
+        r"\bnews\b", r"\bwho (is|was)\b", r"\bwhen (was|did)\b", r"\bencyclop",
+    ],
+    "planner": [
+        r"\bplan\b", r"\broadmap\b", r"\bstep[- ]by[- ]step\b", r"\bfrom scratch\b", r"\bstudy plan\b",
+        r"\blearning path\b", r"\bhow (do|should|can) i (build|learn|become|start|get)\b",
+        r"\bbreak (it|this) down\b", r"\bcurriculum\b",
+    ],
+}
+
+# Seed queries per category; their mean embedding is the category centroid
+EXEMPLARS = {
+    "resume": [
+        "What are their skills?",
+        "List the skills on the resume",
+        "Where did the candidate work before?",
+        "What is their educational background?",
+        "How many years of experience do they have with Python?",
+        "Which certifications does the candidate hold?",
+    ],
+    "video": [
+        "Explain how retrieval augmented generation works",
+        "Walk me through the transformer architecture",
+        "Show me a tutorial on fine-tuning a language model",
+        "How does attention work in neural networks?",
+        "What did the lecture say about vector databases?",
+        "How to set up LangGraph agents",
+    ],
+    "web": [
+        "What is MongoDB?",
+        "Define machine learning",
+        "Who invented the transistor?",
+        "History of the internet",
+        "What is the latest news on AI regulation?",
+        "When was Python first released?",
+    ],
+    "planner": [
+        "How do I build a RAG system from scratch?",
+        "Create a study plan for learning deep learning",
+        "Give me a step-by-step roadmap to become a data engineer",
+        "Plan a 3 month curriculum to learn Kubernetes",
+        "Break down how to launch a SaaS product",
+        "What should I learn, in order, to get into MLOps?",
+    ],
+}
+
+_COMPILED = {route: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+             for route, patterns in KEYWORD_RULES.items()}
+
+class LocalRouter:
+    """
+    Routes queries without an LLM call: nearest-centroid over query
+    embeddings combined with keyword rules, turned into a softmax confidence.
+    """
+    def __init__(self, embeddings=None, temperature: float = None, keyword_weight: float = None):
+        self._embeddings = embeddings
+        self.temperature = temperature or settings.ROUTER_TEMPERATURE
+        self.keyword_weight = keyword_weight if keyword_weight is not None else settings.ROUTER_KEYWORD_WEIGHT
+        self._centroids = None
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        # Falls back to the shared registry client, resolved per call so a new API key takes effect
+        if self._embeddings is not None:
+            return self._embeddings
+        from config.resources import get_embeddings
+        return get_embeddings()
+
+    def centroids(self) -> np.ndarray:
+        # Built on first use; the exemplar embeddings are served from the embedding cache afterwards.
+        # Exemplars are embedded as queries so they live in the same space as incoming queries.
+        with self._lock:
+            if self._centroids is None:
+                rows = []
+                for route in ROUTES:
+                    vectors = np.asarray([self.embeddings.embed_query(q) for q in EXEMPLARS[route]], dtype=np.float32)
+                    centroid = vectors.mean(axis=0)
+                    rows.append(centroid / np.linalg.norm(centroid))
+                self._centroids = np.stack(rows)
+            return self._centroids
+
+    @staticmethod
+    def keyword_hits(query: str) -> Dict[str, int]:
+        return {route: sum(1 for pattern in patterns if pattern.search(query))
+                for route, patterns in _COMPILED.items()}
+
+    def classify(self, query: str) -> Tuple[str, float, dict]:
+        """
+        Returns (route, confidence, details) where confidence is the softmax
+        probability of the chosen route.
+        """
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        similarities = self.centroids() @ vector
+        hits = self.keyword_hits(query)
+
+        logits = similarities / self.temperature + self.keyword_weight * np.array([hits[r] for r in ROUTES])
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+        best = int(np.argmax(probs))
+        details = {
+            "similarities": {route: round(float(s), 4) for route, s in zip(ROUTES, similarities)},
+            "keyword_hits": hits,
+        }
+        return ROUTES[best], float(probs[best]), details
@@ -0,0 +1,572 @@
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+from agent.tracing import metrics
+
+_THROTTLE = re.compile(r"\b429\b|resource[_ ]exhausted|rate[_ ]limit|too many requests|quota", re.IGNORECASE)
+_TRANSIENT = re.compile(r"\b(500|502|503|504)\b|unavailable|deadline|timed? ?out|connection (reset|aborted)", re.IGNORECASE)
+
+def classify(error: BaseException) -> str:
+    """
+    "throttle" for 429/quota errors, "transient" for 5xx/timeouts, "" for errors not worth retrying.
+    """
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code == 429:
+        return "throttle"
+    if code in (500, 502, 503, 504):
+        return "transient"
+    text = f"{type(error).__name__}: {error}"
+    if _THROTTLE.search(text):
+        return "throttle"
+    if isinstance(error, (TimeoutError, ConnectionError)) or _TRANSIENT.search(text):
+        return "transient"
+    return ""
+
+def estimate_tokens(value) -> int:
+    """
+    Rough prompt size (4 characters per token) of a string, message list or prompt value.
+    """
+    if hasattr(value, "to_messages"):
+        value = value.to_messages()
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_tokens(item) for item in value)
+    content = getattr(value, "content", value)
+    return max(1, len(str(content)) // 4)
+
+class TokenBucket:
+    """
+    Refills `per_minute` units per minute, holding at most a minute's worth.
+    reserve() takes units immediately (the balance may go negative) and
+    returns how long the caller must wait, so sync and async callers share it.
+    """
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+    def drain(self):
+        """Empties the bucket after the server throttled us: its view of the quota wins."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+    def adjust(self, amount: float):
+        """Charges (or refunds, if negative) the difference between an estimate and actual usage."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that grows by one per limit's worth of successes and
+    halves on throttling (at most once per second), between 1 and `max_limit`.
+    """
+    def __init__(self, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def _try_acquire(self) -> bool:
+        if self.in_flight < max(1, int(self.limit)):
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        with self._cond:
+            self.waiting += 1
+            while not self._try_acquire():
+                self._cond.wait()
+            self.waiting -= 1
+
+    async def aacquire(self):
+        with self._cond:
+            if self._try_acquire():
+                return
+            self.waiting += 1
+        delay = 0.005
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                with self._cond:
+                    if self._try_acquire():
+                        return
+                delay = min(delay * 2, 0.1)
+        finally:
+            with self._cond:
+                self.waiting -= 1
+
+    def release(self, throttled: bool = False, succeeded: bool = True):
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled and now - self._last_decrease >= 1.0:
+                self.limit = max(1.0, self.limit / 2)
+                self._last_decrease = now
+            elif succeeded and not throttled:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+class _Abandoned(Exception):
+    """Set on a coalesced call whose owner was cancelled; waiters then make the call themselves."""
+
+class Scheduler:
+    """
+    Client-side gate for one upstream API: requests/min and tokens/min token
+    buckets, an adaptive concurrency limit, retries with exponential backoff
+    and full jitter on throttling and transient errors, and single-flight
+    coalescing of identical in-flight requests (by `key`).
+    """
+    def __init__(self, name: str, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 max_concurrency: int = 16, max_retries: int = None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.limiter = AdaptiveLimiter(max_concurrency)
+        self.max_retries = settings.SCHEDULER_MAX_RETRIES if max_retries is None else max_retries
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "coalesced": 0, "retries": 0, "throttled": 0, "failures": 0, "wait_ms": 0.0}
+
+    def count(self, name: str, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _delay(self, tokens: int) -> float:
+        delay = self.requests.reserve(1) if self.requests else 0.0
+        if self.tokens:
+            delay = max(delay, self.tokens.reserve(tokens))
+        return delay
+
+    def _backoff(self, attempt: int) -> float:
+        ceiling = min(settings.SCHEDULER_BACKOFF_MAX_MS, settings.SCHEDULER_BACKOFF_BASE_MS * 2 ** attempt)
+        return random.uniform(0, ceiling) / 1000
+
+    def _failed(self, error: BaseException, attempt: int, started: bool = False) -> float:
+        """
+        Records a failed attempt and returns the backoff before retrying; raises when giving up.
+        """
+        kind = classify(error)
+        throttled = kind == "throttle"
+        self.limiter.release(throttled=throttled, succeeded=False)
+        if throttled:
+            self.count("throttled")
+            for bucket in (self.requests, self.tokens):
+                if bucket:
+                    bucket.drain()
+        if not kind or started or attempt >= self.max_retries:
+            self.count("failures")
+            raise error
+        self.count("retries")
+        return self._backoff(attempt)
+
+    def _settle(self, result, estimate: int):
+        self.limiter.release()
+        usage = getattr(result, "usage_metadata", None) or {}
+        if self.tokens and usage.get("total_tokens"):
+            self.tokens.adjust(usage["total_tokens"] - estimate)
+        return result
+
+    def _admit(self, tokens: int):
+        started = time.perf_counter()
+        delay = self._delay(tokens)
+        if delay:
+            time.sleep(delay)
+        self.limiter.acquire()
+        self.count("wait_ms", (time.perf_counter() - started) * 1000)
+
+    async def _aadmit(self, tokens: int):
+        started = time.perf_counter()
+        delay = self._delay(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+        await self.limiter.aacquire()
+        self.count("wait_ms", (time.perf_counter() - started) * 1000)
+
+    def _claim(self, key):
+        """
+        Returns (future, owner). Non-owners wait on the owner's future instead of calling.
+        """
+        with self._lock:
+            self.counters["calls"] += 1
+            future = self._inflight.get(key) if key is not None else None
+            if future is not None:
+                self.counters["coalesced"] += 1
+                return future, False
+            future = Future()
+            if key is not None:
+                self._inflight[key] = future
+            return future, True
+
+    def _finish(self, key, future: Future, result=None, error: BaseException = None):
+        with self._lock:
+            if key is not None:
+                self._inflight.pop(key, None)
+        if error is not None:
+            # The owner's cancellation is not the waiters' failure: they retry instead
+            future.set_exception(error if isinstance(error, Exception) else _Abandoned())
+        else:
+            future.set_result(result)
+
+    def run(self, func, tokens: int = 1, key: str = None):
+        """
+        Calls `func()` under the limits, retrying throttled and transient failures.
+        Concurrent calls with the same `key` share one call and its result.
+        """
+        future, owner = self._claim(key)
+        if not owner:
+            try:
+                return future.result()
+            except _Abandoned:
+                return self.run(func, tokens, key)
+        try:
+            for attempt in range(self.max_retries + 1):
+                self._admit(tokens)
+                settled = False
+                try:
+                    result = func()
+                    settled = True
+                    result = self._settle(result, tokens)
+                except Exception as e:
+                    settled = True
+                    delay = self._failed(e, attempt)
+                else:
+                    self._finish(key, future, result)
+                    return result
+                finally:
+                    if not settled:
+                        # Interrupted: give the slot back
+                        self.limiter.release(succeeded=False)
+                time.sleep(delay)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+
+    async def arun(self, afunc, tokens: int = 1, key: str = None):
+        future, owner = self._claim(key)
+        if not owner:
+            try:
+                # Shielded: a cancelled waiter must not cancel the shared call
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _Abandoned:
+                return await self.arun(afunc, tokens, key)
+        try:
+            for attempt in range(self.max_retries + 1):
+                await self._aadmit(tokens)
+                settled = False
+                try:
+                    result = await afunc()
+                    settled = True
+                    result = self._settle(result, tokens)
+                except Exception as e:
+                    settled = True
+                    delay = self._failed(e, attempt)
+                else:
+                    self._finish(key, future, result)
+                    return result
+                finally:
+                    if not settled:
+                        # Cancelled: give the slot back
+                        self.limiter.release(succeeded=False)
+                await asyncio.sleep(delay)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+
+    def stream(self, make_iterator, tokens: int = 1):
+        """
+        Yields from `make_iterator()` under the limits. Failures before the
+        first chunk are retried; once output has been yielded they are raised.
+        """
+        self.count("calls")
+        for attempt in range(self.max_retries + 1):
+            self._admit(tokens)
+            yielded = False
+            settled = False
+            try:
+                for chunk in make_iterator():
+                    yielded = True
+                    yield chunk
+                settled = True
+                self.limiter.release()
+                return
+            except Exception as e:
+                settled = True
+                delay = self._failed(e, attempt, started=yielded)
+            finally:
+                if not settled:
+                    # Consumer stopped early
+                    self.limiter.release()
+            time.sleep(delay)
+
+    async def astream(self, make_iterator, tokens: int = 1):
+        self.count("calls")
+        for attempt in range(self.max_retries + 1):
+            await self._aadmit(tokens)
+            yielded = False
+            settled = False
+            try:
+                async for chunk in make_iterator():
+                    yielded = True
+                    yield chunk
+                settled = True
+                self.limiter.release()
+                return
+            except Exception as e:
+                settled = True
+                delay = self._failed(e, attempt, started=yielded)
+            finally:
+                if not settled:
+                    self.limiter.release()
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        counters["wait_ms"] = round(counters["wait_ms"], 1)
+        return dict(counters, name=self.name, queue_depth=self.limiter.waiting, in_flight=self.limiter.in_flight,
+                    concurrency_limit=round(self.limiter.limit, 2))
+
+def _request_key(value, kwargs: dict) -> str:
+    if hasattr(value, "to_messages"):
+        value = value.to_messages()
+    if isinstance(value, (list, tuple)):
+        text = "\x00".join(f"{getattr(m, 'type', '')}:{getattr(m, 'content', m)}" for m in value)
+    else:
+        text = str(value)
+    text += "\x00" + repr(sorted(kwargs.items()))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class ScheduledChatModel:
+    """
+    Routes invoke/ainvoke/stream/astream of a chat model through a Scheduler.
+    Identical concurrent invoke calls are coalesced; streams are not. Other
+    attributes are delegated to the wrapped model.
+    """
+    def __init__(self, llm, scheduler: Scheduler):
+        self.llm = llm
+        self.scheduler = scheduler
+
+    def invoke(self, value, config=None, **kwargs):
+        return self.scheduler.run(lambda: self.llm.invoke(value, config, **kwargs),
+                                  tokens=estimate_tokens(value), key=_request_key(value, kwargs))
+
+    async def ainvoke(self, value, config=None, **kwargs):
+        return await self.scheduler.arun(lambda: self.llm.ainvoke(value, config, **kwargs),
+                                         tokens=estimate_tokens(value), key=_request_key(value, kwargs))
+
+    def stream(self, value, config=None, **kwargs):
+        return self.scheduler.stream(lambda: self.llm.stream(value, config, **kwargs), tokens=estimate_tokens(value))
+
+    def astream(self, value, config=None, **kwargs):
+        return self.scheduler.astream(lambda: self.llm.astream(value, config, **kwargs), tokens=estimate_tokens(value))
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+class ScheduledEmbeddings(Embeddings):
+    """
+    Embeddings whose API calls go through a Scheduler. Texts already being
+    embedded by another caller are not sent again: the caller waits for
+    that result, so overlapping batches share work.
+    """
+    def __init__(self, embeddings: Embeddings, scheduler: Scheduler):
+        self.embeddings = embeddings
+        self.scheduler = scheduler
+        self._pending: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+
+    def _claim(self, texts: List[str], kind: str = "document"):
+        # Queries and documents embed differently, so they only coalesce with their own kind
+        futures, owned = {}, []
+        with self._lock:
+            for text in dict.fromkeys(texts):
+                future = self._pending.get((kind, text))
+                if future is None:
+                    future = self._pending[(kind, text)] = Future()
+                    owned.append(text)
+                futures[text] = future
+        if len(owned) < len(futures):
+            self.scheduler.count("coalesced", len(futures) - len(owned))
+        return futures, owned
+
+    def _resolve(self, futures: dict, owned: List[str], vectors=None, error: BaseException = None, kind: str = "document"):
+        with self._lock:
+            for text in owned:
+                self._pending.pop((kind, text), None)
+        for i, text in enumerate(owned):
+            if error is not None:
+                # As in Scheduler._finish: an owner's cancellation makes waiters embed the text themselves
+                futures[text].set_exception(error if isinstance(error, Exception) else _Abandoned())
+            else:
+                futures[text].set_result(vectors[i])
+
+    def _gather(self, texts: List[str], futures: dict, retry) -> List[List[float]]:
+        """
+        Waits for every text's vector; texts whose owner was cancelled are passed to `retry`.
+        """
+        vectors, abandoned = {}, []
+        for text, future in futures.items():
+            try:
+                vectors[text] = future.result()
+            except _Abandoned:
+                abandoned.append(text)
+        if abandoned:
+            vectors.update(zip(abandoned, retry(abandoned)))
+        return [vectors[text] for text in texts]
+
+    async def _agather(self, texts: List[str], futures: dict, retry) -> List[List[float]]:
+        vectors, abandoned = {}, []
+        for text, future in futures.items():
+            try:
+                # Shielded: a cancelled waiter must not cancel a vector other callers share
+                vectors[text] = await asyncio.shield(asyncio.wrap_future(future))
+            except _Abandoned:
+                abandoned.append(text)
+        if abandoned:
+            vectors.update(zip(abandoned, await retry(abandoned)))
+        return [vectors[text] for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        futures, owned = self._claim(texts)
+        if owned:
+            try:
+                vectors = self.scheduler.run(lambda: self.embeddings.embed_documents(owned),
+                                             tokens=sum(estimate_tokens(text) for text in owned))
+            except BaseException as e:
+                self._resolve(futures, owned, error=e)
+                raise
+            self._resolve(futures, owned, vectors)
+        return self._gather(texts, futures, self.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        futures, owned = self._claim([text], "query")
+        if owned:
+            try:
+                vector = self.scheduler.run(lambda: self.embeddings.embed_query(text), tokens=estimate_tokens(text))
+            except BaseException as e:
+                self._resolve(futures, owned, error=e, kind="query")
+                raise
+            self._resolve(futures, owned, [vector], kind="query")
+        return self._gather([text], futures, lambda abandoned: [self.embed_query(text)])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds a batch of queries as one scheduled request (used by the query batcher).
+        """
+        from agent.batching import embed_queries
+        futures, owned = self._claim(texts, "query")
+        if owned:
+            try:
+                vectors = self.scheduler.run(lambda: embed_queries(self.embeddings, owned),
+                                             tokens=sum(estimate_tokens(text) for text in owned))
+            except BaseException as e:
+                self._resolve(futures, owned, error=e, kind="query")
+                raise
+            self._resolve(futures, owned, vectors, kind="query")
+        return self._gather(texts, futures, self.embed_queries)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        futures, owned = self._claim(texts)
+        if owned:
+            try:
+                vectors = await self.scheduler.arun(lambda: self.embeddings.aembed_documents(owned),
+                                                    tokens=sum(estimate_tokens(text) for text in owned))
+            except BaseException as e:
+                self._resolve(futures, owned, error=e)
+                raise
+            self._resolve(futures, owned, vectors)
+        return await self._agather(texts, futures, self.aembed_documents)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        futures, owned = self._claim([text], "query")
+        if owned:
+            try:
+                vector = await self.scheduler.arun(lambda: self.embeddings.aembed_query(text), tokens=estimate_tokens(text))
+            except BaseException as e:
+                self._resolve(futures, owned, error=e, kind="query")
+                raise
+            self._resolve(futures, owned, [vector], kind="query")
+
+        async def retry(abandoned):
+            return [await self.aembed_query(text)]
+        return (await self._agather([text], futures, retry))[0]
+
+    def __getattr__(self, name):
+        return getattr(self.embeddings, name)
+
+_schedulers: Dict[str, Scheduler] = {}
+_schedulers_lock = threading.Lock()
+
+def get_scheduler(name: str) -> Scheduler:
+    """
+    Process-wide scheduler for "llm" or "embeddings", shared by every caller.
+    """
+    with _schedulers_lock:
+        if name not in _schedulers:
+            if name == "llm":
+                _schedulers[name] = Scheduler(name, settings.LLM_REQUESTS_PER_MINUTE, settings.LLM_TOKENS_PER_MINUTE,
+                                              settings.LLM_MAX_CONCURRENCY)
+            else:
+                _schedulers[name] = Scheduler(name, settings.EMBED_REQUESTS_PER_MINUTE, settings.EMBED_TOKENS_PER_MINUTE,
+                                              settings.EMBED_MAX_CONCURRENCY)
+        return _schedulers[name]
+
+def schedule_llm(llm):
+    return ScheduledChatModel(llm, get_scheduler("llm")) if settings.SCHEDULER_ENABLED else llm
+
+def schedule_embeddings(embeddings: Embeddings) -> Embeddings:
+    return ScheduledEmbeddings(embeddings, get_scheduler("embeddings")) if settings.SCHEDULER_ENABLED else embeddings
+
+def scheduler_stats() -> List[dict]:
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return [scheduler.stats() for scheduler in schedulers]
+
+def to_prometheus() -> str:
+    """
+    Scheduler gauges and counters in Prometheus text format (appended to the span metrics).
+    """
+    stats = scheduler_stats()
+    lines = []
+    for metric, key, kind, help_text in (
+        ("nexus_scheduler_queue_depth", "queue_depth", "gauge", "Callers waiting for a concurrency slot."),
+        ("nexus_scheduler_in_flight", "in_flight", "gauge", "Requests currently running."),
+        ("nexus_scheduler_concurrency_limit", "concurrency_limit", "gauge", "Current adaptive concurrency limit."),
+        ("nexus_scheduler_calls_total", "calls", "counter", "Requests submitted."),
+        ("nexus_scheduler_coalesced_total", "coalesced", "counter", "Requests served by an identical in-flight call."),
+        ("nexus_scheduler_throttled_total", "throttled", "counter", "Attempts rejected with 429/quota errors."),
+        ("nexus_scheduler_retries_total", "retries", "counter", "Attempts retried after backoff."),
+        ("nexus_scheduler_failures_total", "failures", "counter", "Requests that failed after retries."),
+        ("nexus_scheduler_wait_ms_total", "wait_ms", "counter", "Time spent waiting for rate limits and slots."),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{scheduler="{s["name"]}"}} {s[key]}' for s in stats]
+    return "\n".join(lines) + "\n" if stats else ""
+
+metrics.add_collector(to_prometheus, scheduler_stats)
@@ -1,4 +1,5 @@
 from typing import TypedDict, List, Annotated
+from langchain_core.documents import Document
 from langchain_core.messages import BaseMessage
 import operator
 
@@ -6,8 +7,19 @@ class AgentState(TypedDict):
     """
     The state of the agent graph.
     """
-    messages: Annotated[List[BaseMessage], operator.add]
-    query: str
+    messages: Annotated[List[BaseMessage], operator.add]  # Conversation memory: rolling summary + recent turns
+    session_id: str  # Conversation checkpointed in the memory store, if any
+    query: str  # Standalone question (follow-ups are rewritten by the condense node)
+    original_query: str  # The follow-up as the user typed it, when it was rewritten
     documents: List[str]
+    sources: List[str]  # Source names of the retrieved chunks
     generation: str
     decision: str  # To track which path was taken for UI
+    route_path: str  # "local" if the embedding/keyword router decided, "llm" if it fell back
+    route_confidence: float
+    retrieved: List[Document]  # Speculatively prefetched results for `retrieved_for`
+    retrieved_for: str
+    speculation: dict  # Latency hidden by speculative retrieval
+    context_stats: dict  # Token accounting from context packing
+    memory_stats: dict  # Messages and estimated tokens of conversation memory in the prompt
+    trace: Annotated[List[dict], operator.add]  # Timed spans from every node and external call
@@ -0,0 +1,224 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+
+# Spans of the trace being collected in the current context (graph node, request)
+_spans = contextvars.ContextVar("nexus_spans", default=None)
+_depth = contextvars.ContextVar("nexus_span_depth", default=0)
+_origin = contextvars.ContextVar("nexus_trace_origin", default=0.0)
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+class Metrics:
+    """
+    Process-wide aggregates per span name: calls, errors, latency histogram,
+    token and result counts. Exported as Prometheus text or JSON lines.
+    """
+    def __init__(self):
+        self._series: Dict[str, dict] = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def add_collector(self, prometheus, snapshot):
+        """
+        Adds another metrics source (e.g. the API schedulers): `prometheus()`
+        returns exposition text and `snapshot()` a list of dicts for JSON lines.
+        """
+        self._collectors.append((prometheus, snapshot))
+
+    def observe(self, record: dict):
+        with self._lock:
+            series = self._series.get(record["name"])
+            if series is None:
+                series = self._series[record["name"]] = {
+                    "name": record["name"], "kind": record["kind"], "calls": 0, "errors": 0,
+                    "total_ms": 0.0, "max_ms": 0.0, "buckets": [0] * len(LATENCY_BUCKETS_MS),
+                    "input_tokens": 0, "output_tokens": 0, "results": 0,
+                }
+            series["calls"] += 1
+            series["errors"] += 1 if record.get("error") else 0
+            series["total_ms"] += record["ms"]
+            series["max_ms"] = max(series["max_ms"], record["ms"])
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if record["ms"] <= bound:
+                    series["buckets"][i] += 1
+            for key in ("input_tokens", "output_tokens", "results"):
+                series[key] += record.get(key) or 0
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            return [dict(series, buckets=list(series["buckets"])) for series in self._series.values()]
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP nexus_span_duration_ms Latency of graph nodes and external calls.",
+            "# TYPE nexus_span_duration_ms histogram",
+        ]
+        counters = []
+        for series in self.snapshot():
+            labels = f'span="{series["name"]}",kind="{series["kind"]}"'
+            for bound, count in zip(LATENCY_BUCKETS_MS, series["buckets"]):
+                lines.append(f'nexus_span_duration_ms_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'nexus_span_duration_ms_bucket{{{labels},le="+Inf"}} {series["calls"]}')
+            lines.append(f'nexus_span_duration_ms_sum{{{labels}}} {series["total_ms"]:.3f}')
+            lines.append(f'nexus_span_duration_ms_count{{{labels}}} {series["calls"]}')
+            counters.append((labels, series))
+        for metric, key, help_text in (
+            ("nexus_span_errors_total", "errors", "Spans that raised."),
+            ("nexus_tokens_input_total", "input_tokens", "Prompt tokens sent to the LLM."),
+            ("nexus_tokens_output_total", "output_tokens", "Tokens generated by the LLM."),
+            ("nexus_span_results_total", "results", "Documents or vectors returned."),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            lines += [f"{metric}{{{labels}}} {series[key]}" for labels, series in counters]
+        return "\n".join(lines) + "\n" + "".join(prometheus() for prometheus, _ in self._collectors)
+
+    def to_jsonl(self) -> str:
+        now = time.time()
+        records = self.snapshot() + [record for _, snapshot in self._collectors for record in snapshot()]
+        return "".join(json.dumps(dict(record, ts=now)) + "\n" for record in records)
+
+    def write_jsonl(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(self.to_jsonl())
+
+metrics = Metrics()
+
+@contextmanager
+def collect():
+    """
+    Collects every span finished in this context (including threads and tasks
+    started with a copy of it) into the yielded list, ordered by start time.
+    """
+    spans: List[dict] = []
+    tokens = (_spans.set(spans), _depth.set(0), _origin.set(time.perf_counter()))
+    try:
+        yield spans
+    finally:
+        spans.sort(key=lambda record: record["start_ms"])
+        for record in spans:
+            record["start_ms"] = round(record["start_ms"], 1)
+        _origin.reset(tokens[2])
+        _depth.reset(tokens[1])
+        _spans.reset(tokens[0])
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """
+    Times the wrapped block. The yielded dict can be updated with
+    input_tokens, output_tokens, results or any other attribute.
+    Exceptions are recorded on the span and re-raised.
+    """
+    if not settings.TRACING_ENABLED:
+        yield {}
+        return
+    depth = _depth.get()
+    token = _depth.set(depth + 1)
+    started = time.perf_counter()
+    record = {"name": name, "kind": kind, "depth": depth,
+              "start_ms": (started - (_origin.get() or started)) * 1000, **attributes}
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _depth.reset(token)
+        record["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        metrics.observe(record)
+        spans = _spans.get()
+        if spans is not None:
+            spans.append(record)
+
+def fail(record: dict, error: Exception):
+    """
+    Marks a span as failed when the error is handled inside it instead of raised.
+    """
+    if record is not None:
+        record["error"] = f"{type(error).__name__}: {error}"
+
+def record_usage(record: dict, usage: dict):
+    """
+    Copies LangChain usage_metadata (input/output token counts) onto a span.
+    """
+    if usage:
+        record["input_tokens"] = record.get("input_tokens", 0) + (usage.get("input_tokens") or 0)
+        record["output_tokens"] = record.get("output_tokens", 0) + (usage.get("output_tokens") or 0)
+
+def traced_node(name: str, func):
+    """
+    Wraps a sync graph node so its spans are returned in the `trace` state field.
+    """
+    def node(state):
+        with collect() as spans:
+            with span(name, "node"):
+                update = func(state)
+        return {**(update or {}), "trace": list(spans)}
+    node.__name__ = func.__name__
+    return node
+
+def atraced_node(name: str, afunc):
+    async def node(state):
+        with collect() as spans:
+            with span(name, "node"):
+                update = await afunc(state)
+        return {**(update or {}), "trace": list(spans)}
+    node.__name__ = afunc.__name__
+    return node
+
+def export_trace(query: str, trace: List[dict]):
+    """
+    Appends a finished trace to settings.TRACE_EXPORT_PATH as one JSON line, if set.
+    """
+    if not settings.TRACE_EXPORT_PATH or not trace:
+        return
+    try:
+        os.makedirs(os.path.dirname(settings.TRACE_EXPORT_PATH) or ".", exist_ok=True)
+        with open(settings.TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"ts": time.time(), "query": query, "spans": trace}, default=str) + "\n")
+    except OSError as e:
+        print(f"[WARN] Could not export trace: {e}")
+
+class TracedEmbeddings(Embeddings):
+    """
+    Records a span for every embedding call; other attributes (e.g. `cache`)
+    are delegated to the wrapped embeddings.
+    """
+    def __init__(self, underlying: Embeddings):
+        self.underlying = underlying
+
+    def __getattr__(self, name):
+        return getattr(self.underlying, name)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with span("embeddings.embed_documents", "embeddings", texts=len(texts)) as record:
+            vectors = self.underlying.embed_documents(texts)
+            record["results"] = len(vectors)
+            return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        with span("embeddings.embed_query", "embeddings"):
+            return self.underlying.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        with span("embeddings.embed_documents", "embeddings", texts=len(texts)) as record:
+            vectors = await self.underlying.aembed_documents(texts)
+            record["results"] = len(vectors)
+            return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with span("embeddings.embed_query", "embeddings"):
+            return await self.underlying.aembed_query(text)
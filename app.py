@@ -1,5 +1,4 @@
 import streamlit as st
-import subprocess
 import os
 import sys
 
@@ -36,17 +35,15 @@ if not user_google_key or not user_mongo_uri:
 os.environ["GOOGLE_API_KEY"] = user_google_key
 os.environ["MONGO_URI"] = user_mongo_uri
 
-# Force reload settings if they were already imported (hacky but needed for Streamlit's execution model)
+# Clients are built lazily by the resource registry and cached per (key, URI),
+# so pointing settings at the user's keys is enough; no module reload needed.
 from config import settings
-import importlib
-importlib.reload(settings)
-if settings.GOOGLE_API_KEY != user_google_key:
-    settings.GOOGLE_API_KEY = user_google_key
-if settings.MONGO_URI != user_mongo_uri:
-    settings.MONGO_URI = user_mongo_uri
+from config.resources import registry
+settings.GOOGLE_API_KEY = user_google_key
+settings.MONGO_URI = user_mongo_uri
 
-# Now safe to import logic that depends on settings
-from agent.graph import app_graph
+with registry.time_first("import.agent_graph"):
+    from agent.graph import stream_answer
 
 st.set_page_config(page_title="Nexus AI", layout="wide")
 
@@ -65,67 +62,136 @@ else:
     url_input = st.sidebar.text_input("URL")
 
 import tempfile
+from data_pipeline.jobs import IngestJobManager
+
+@st.cache_resource
+def get_job_manager(google_key: str, mongo_uri: str):
+    # One manager per key pair, shared across reruns and sessions
+    from database.mongo import mongo_handler
+    mongo_handler.init_search_index()
+    return IngestJobManager()
+
+job_manager = get_job_manager(user_google_key, user_mongo_uri)
 
 if st.sidebar.button("Ingest Data"):
     if source_type == "resume" and uploaded_file:
-        with st.sidebar.status("Ingesting uploaded file...") as status:
-            try:
-                # Save uploaded file safely using tempfile
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                    tmp_file.write(uploaded_file.getbuffer())
-                    temp_path = tmp_file.name
-                
-                cmd = [sys.executable, "-m", "data_pipeline.ingestion", "--type", source_type, "--url", temp_path]
-                
-                # Use absolute path for CWD to avoid empty string error
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                result = subprocess.run(cmd, capture_output=True, text=True, cwd=current_dir)
-                
-                # Cleanup
-                if os.path.exists(temp_path):
-                    try:
-                        os.unlink(temp_path) # unlink is better for temp files
-                    except:
-                        pass # Ignore cleanup errors
-
-                if result.returncode == 0:
-                    status.update(label="Ingestion Complete!", state="complete", expanded=True)
-                    st.sidebar.success(result.stdout)
-                else:
-                    status.update(label="Ingestion Failed", state="error", expanded=True)
-                    st.sidebar.error(result.stderr)
-            except Exception as e:
-                st.sidebar.error(f"Error: {e}")
-
+        # Save uploaded file safely using tempfile; the job deletes it when done
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+            tmp_file.write(uploaded_file.getbuffer())
+            temp_path = tmp_file.name
+        # Keep the original filename as the source so re-uploads replace, not duplicate
+        job_manager.submit(source_type, temp_path, source=uploaded_file.name, cleanup_path=temp_path)
     elif source_type != "resume" and url_input:
-        with st.sidebar.status(f"Ingesting from {source_type}...") as status:
-            try:
-                cmd = [sys.executable, "-m", "data_pipeline.ingestion", "--type", source_type, "--url", url_input]
-                
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                result = subprocess.run(cmd, capture_output=True, text=True, cwd=current_dir)
-                
-                if result.returncode == 0:
-                    status.update(label="Ingestion Complete!", state="complete", expanded=True)
-                    st.sidebar.success(result.stdout)
-                else:
-                    status.update(label="Ingestion Failed", state="error", expanded=True)
-                    st.sidebar.error(result.stderr)
-            except Exception as e:
-                st.sidebar.error(f"Error: {e}")
+        job_manager.submit(source_type, url_input)
     else:
         st.sidebar.warning("Please provide a URL or upload a file.")
 
+@st.fragment(run_every=1.0)
+def render_ingest_jobs():
+    jobs = job_manager.jobs()
+    if not jobs:
+        return
+    st.subheader("Ingestion Jobs")
+    for job in jobs:
+        progress = job.progress
+        label = f"#{job.id} {job.source_type}: {os.path.basename(job.source) or job.source}"
+        st.markdown(f"**{label}** — {job.status} ({job.elapsed:.1f}s)")
+        st.caption(
+            f"{progress.get('pages', 0)} pages, {progress.get('chunks', 0)} chunks, "
+            f"{progress.get('embedded', 0)} embedded, {progress.get('added', 0)} written, "
+            f"{progress.get('unchanged', 0)} unchanged, {progress.get('removed', 0)} removed"
+        )
+        if job.error:
+            st.error(job.error)
+        if not job.done and st.button("Cancel", key=f"cancel-{job.id}"):
+            job_manager.cancel(job.id)
+    if any(job.done for job in jobs) and st.button("Clear finished"):
+        job_manager.clear_finished()
+
+with st.sidebar:
+    render_ingest_jobs()
+    with st.expander("⏱️ Diagnostics"):
+        from agent.tracing import metrics
+        from agent.profiler import profiler
+        from agent.scheduler import scheduler_stats
+        st.caption("Startup timings (ms)")
+        st.json(registry.report())
+        st.caption("Gemini schedulers (queue depth, throttles, retries)")
+        st.json(scheduler_stats())
+        st.download_button("Metrics (Prometheus)", metrics.to_prometheus(), file_name="nexus_metrics.prom")
+        st.download_button("Metrics (JSON lines)", metrics.to_jsonl(), file_name="nexus_metrics.jsonl")
+        if st.toggle("Sampling profiler", value=profiler.running):
+            profiler.start()
+            st.caption(f"{profiler.samples} samples; hottest frames:")
+            st.text("\n".join(f"{count:6d}  {label}" for label, count in profiler.top(10)))
+            st.download_button("Folded stacks", profiler.folded(), file_name="nexus_profile.folded")
+        else:
+            profiler.stop()
+
 # Chat Interface
+# The session id lives in the URL, so a reload or restart resumes the checkpointed conversation
+from agent.memory import get_memory, new_session_id
+memory = get_memory()
+if "session_id" not in st.session_state:
+    st.session_state.session_id = st.query_params.get("session") or new_session_id()
+    st.query_params["session"] = st.session_state.session_id
 if "messages" not in st.session_state:
+    st.session_state.messages = memory.history(st.session_state.session_id) if memory else []
+
+if st.sidebar.button("🆕 New conversation"):
+    st.session_state.session_id = new_session_id()
+    st.query_params["session"] = st.session_state.session_id
     st.session_state.messages = []
+    st.rerun()
+
+def render_thought_process(result: dict):
+    with st.expander("🧠 Thought Process"):
+        st.write(f"**Route Selected:** {result.get('decision', 'unknown')}")
+        if result.get("original_query"):
+            st.write(f"**Follow-up Rewritten As:** {result['query']}")
+        if result.get("route_path"):
+            st.write(f"**Decided By:** {result['route_path']} router (confidence {result.get('route_confidence') or 0:.2f})")
+        if result.get("cache_hit"):
+            st.write(f"**Answer Cache:** hit ({result['cache_similarity']:.2f} similar to \"{result['cached_query']}\")")
+        speculation = result.get("speculation")
+        if speculation:
+            st.write(f"**Speculative Retrieval:** hid {speculation['hidden_ms']:.0f} ms "
+                     f"(router {speculation['router_ms']:.0f} ms, {speculation['searches']} searches)")
+        context_stats = result.get("context_stats")
+        if context_stats:
+            st.write(f"**Context:** {context_stats['packed_tokens']} tokens from {context_stats['chunks']} chunks "
+                     f"(saved {context_stats['saved_tokens']})")
+        memory_stats = result.get("memory_stats")
+        if memory_stats and memory_stats["messages"]:
+            st.write(f"**Memory:** {memory_stats['tokens']} tokens in {memory_stats['messages']} messages"
+                     f"{' (incl. summary)' if memory_stats['summary'] else ''}")
+        if result.get("sources"):
+            st.write("**Sources:**")
+            for source in result["sources"]:
+                st.write(f"- {source}")
+        if result.get("trace"):
+            st.write("**Trace:**")
+            st.text(format_trace(result["trace"]))
+
+def format_trace(trace: list) -> str:
+    lines = []
+    for record in trace:
+        details = []
+        if record.get("input_tokens") or record.get("output_tokens"):
+            details.append(f"{record.get('input_tokens', 0)} in / {record.get('output_tokens', 0)} out tokens")
+        if "results" in record:
+            details.append(f"{record['results']} results")
+        if record.get("error"):
+            details.append(f"ERROR {record['error']}")
+        name = "  " * record["depth"] + record["name"]
+        lines.append(f"{name:<36} {record['ms']:>8.1f} ms  {', '.join(details)}".rstrip())
+    return "\n".join(lines)
 
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
         if "thought_process" in message:
-            with st.expander("🧠 Thought Process"):
-                st.write(f"**Route Selected:** {message['thought_process']}")
+            render_thought_process(message["thought_process"])
 
 query = st.chat_input("Ask something about the knowledge base...")
 
@@ -135,24 +201,39 @@ if query:
         st.markdown(query)
 
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                # Run Agent
-                initial_state = {"query": query, "messages": []}
-                result = app_graph.invoke(initial_state)
-                
-                response = result.get("generation", "I couldn't generate a response.")
-                decision = result.get("decision", "unknown")
-                
+        try:
+            # Run Agent, rendering tokens as the worker node generates them
+            initial_state = {"query": query, "messages": [], "session_id": st.session_state.session_id}
+            route_placeholder = st.empty()
+            route_placeholder.caption("Routing...")
+            result = {}
+
+            def token_stream():
+                for kind, payload in stream_answer(initial_state):
+                    if kind == "route":
+                        route_placeholder.caption(f"Route: **{payload.get('decision', 'unknown')}**")
+                    elif kind == "token":
+                        yield payload
+                    else:
+                        result.update(payload)
+
+            with registry.time_first("first_request"):
+                response = st.write_stream(token_stream())
+            if not result.get("generation"):
+                response = "I couldn't generate a response."
                 st.markdown(response)
-                with st.expander("🧠 Thought Process"):
-                    st.write(f"**Route Selected:** {decision}")
-                    
-                st.session_state.messages.append({
-                    "role": "assistant", 
-                    "content": response,
-                    "thought_process": decision
-                })
-            except Exception as e:
-                st.error(f"An error occurred: {e}")
-
+            route_placeholder.empty()
+
+            thought_process = {key: result.get(key) for key in (
+                "decision", "route_path", "route_confidence", "query", "original_query", "memory_stats",
+                "cache_hit", "cache_similarity", "cached_query", "sources", "speculation", "context_stats", "trace"
+            )}
+            render_thought_process(thought_process)
+
+            st.session_state.messages.append({
+                "role": "assistant", 
+                "content": result.get("generation") or response,
+                "thought_process": thought_process
+            })
+        except Exception as e:
+            st.error(f"An error occurred: {e}")
@@ -0,0 +1,135 @@
+import random
+import textwrap
+from typing import Iterator, List
+
+from langchain_core.documents import Document
+
+from config import settings
+
+# Vocabulary the generated text for each source_type is drawn from
+TOPICS = {
+    "resume": ["python", "django", "kubernetes", "aws", "led", "team", "shipped", "microservices", "postgres",
+               "degree", "university", "intern", "engineer", "certified", "react", "migrated", "latency", "pipeline"],
+    "video": ["transformer", "attention", "gradient", "tutorial", "layer", "embedding", "training", "loss",
+              "backpropagation", "tokenizer", "architecture", "explain", "batch", "epoch", "optimizer", "decoder"],
+    "web": ["release", "announced", "framework", "version", "benchmark", "pricing", "update", "startup",
+            "security", "vulnerability", "news", "library", "api", "cloud", "outage", "roadmap"],
+}
+COMMON = ("the a of to and in is for with on that this it as by we from at be are an was").split()
+
+# Page length in characters; with the default splitter this yields about four chunks per page
+PAGE_CHARS = 4 * (settings.CHUNK_SIZE - settings.CHUNK_OVERLAP)
+
+def chunks_per_page() -> int:
+    return max(1, round((PAGE_CHARS - settings.CHUNK_OVERLAP) / (settings.CHUNK_SIZE - settings.CHUNK_OVERLAP)))
+
+def _sentence(rng: random.Random, vocabulary: List[str]) -> str:
+    words = [rng.choice(vocabulary) if rng.random() < 0.35 else rng.choice(COMMON) for _ in range(rng.randint(8, 18))]
+    words[0] = words[0].capitalize()
+    return " ".join(words) + "."
+
+def _text(rng: random.Random, vocabulary: List[str], chars: int) -> str:
+    parts, size = [], 0
+    while size < chars:
+        sentence = _sentence(rng, vocabulary)
+        parts.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(parts)
+
+def pdf_page(rng: random.Random, index: int) -> str:
+    return f"Page {index + 1}\n" + _text(rng, TOPICS["resume"], PAGE_CHARS)
+
+def transcript_page(rng: random.Random, index: int) -> str:
+    lines, size, second = [], 0, index * 600
+    while size < PAGE_CHARS:
+        line = f"[{second // 60:02d}:{second % 60:02d}] {_sentence(rng, TOPICS['video'])}"
+        lines.append(line)
+        size += len(line) + 1
+        second += rng.randint(3, 9)
+    return "\n".join(lines)
+
+def web_page(rng: random.Random, index: int) -> str:
+    sections, size = [], 0
+    while size < PAGE_CHARS:
+        heading = f"## {rng.choice(TOPICS['web']).title()} {rng.choice(TOPICS['web'])}"
+        body = _text(rng, TOPICS["web"], 600)
+        sections.append(f"{heading}\n\n{body}")
+        size += len(heading) + len(body) + 2
+    return f"# Article {index + 1}\n\n" + "\n\n".join(sections)
+
+GENERATORS = {"resume": pdf_page, "video": transcript_page, "web": web_page}
+
+class SyntheticLoader:
+    """
+    DocumentLoader for synthetic sources named "synthetic://<source_type>/<seed>/<pages>".
+    Pages are generated lazily and deterministically from the seed.
+    """
+    def lazy_load(self, source: str) -> Iterator[Document]:
+        source_type, seed, pages = source[len("synthetic://"):].split("/")
+        rng = random.Random(f"{source_type}:{seed}")
+        for index in range(int(pages)):
+            yield Document(page_content=GENERATORS[source_type](rng, index),
+                           metadata={"source": source, "page": index})
+
+    def load(self, source: str) -> List[Document]:
+        return list(self.lazy_load(source))
+
+def corpus_sources(total_chunks: int, pages_per_source: int = 250) -> List[tuple]:
+    """
+    Splits a target chunk count evenly over the three source types and
+    returns (source_type, source) pairs covering it.
+    """
+    pages_needed = max(1, total_chunks // chunks_per_page())
+    sources = []
+    for i, source_type in enumerate(GENERATORS):
+        pages = pages_needed // len(GENERATORS) + (1 if i < pages_needed % len(GENERATORS) else 0)
+        seed = 0
+        while pages > 0:
+            count = min(pages, pages_per_source)
+            sources.append((source_type, f"synthetic://{source_type}/{seed}/{count}"))
+            pages -= count
+            seed += 1
+    return sources
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path: str, pages: int, seed: int = 0):
+    """
+    Writes a plain-text PDF of synthetic resume pages (Helvetica, one text
+    stream per page), so parsing benchmarks exercise real pypdf extraction.
+    """
+    rng = random.Random(f"pdf:{seed}")
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for index in range(pages):
+        lines = textwrap.wrap(pdf_page(rng, index).replace("\n", " "), 95)
+        body = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1", errors="replace")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+QUESTIONS = {
+    "resume": "What {0} and {1} experience does the candidate's resume list?",
+    "video": "Explain how {0} and {1} work in the video tutorial.",
+    "web": "What is the latest news about {0} {1}?",
+}
+
+def queries(count: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    routes = list(QUESTIONS)
+    return [QUESTIONS[route].format(*rng.sample(TOPICS[route], 2)) for route in (routes[i % 3] for i in range(count))]
@@ -0,0 +1,307 @@
+import asyncio
+import copy
+import hashlib
+import re
+import threading
+import time
+from typing import Any, Iterator, AsyncIterator, List, Optional
+
+import bson
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForLLMRun, AsyncCallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+from pymongo import UpdateOne
+
+_WORD = re.compile(r"\w+")
+
+class FakeRateLimitError(Exception):
+    """Raised by the fakes when their quota is exceeded, worded like Gemini's 429."""
+    code = 429
+
+class _Quota:
+    """
+    Sliding one-second window of calls; beyond `per_second` calls are rejected.
+    """
+    def __init__(self, per_second: float):
+        self.per_second = per_second
+        self.calls = []
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def check(self):
+        if not self.per_second:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.calls = [t for t in self.calls if now - t < 1.0]
+            if len(self.calls) >= self.per_second:
+                self.rejected += 1
+                raise FakeRateLimitError("429 RESOURCE_EXHAUSTED: fake quota exceeded")
+            self.calls.append(now)
+
+FILLER = ("the system uses a retrieval step to ground each answer in the indexed sources "
+          "and cites the documents it relied on when building the final response").split()
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for Gemini. Waits `latency_ms` before the first
+    token, then emits `response_tokens` words at `tokens_per_second`.
+    Router calls (system prompt + query) answer with `route_response`;
+    planner outline calls answer with `outline_steps` numbered steps.
+    With `quota_per_second` set, calls beyond that rate fail with a 429.
+    """
+    latency_ms: float = 300.0
+    tokens_per_second: float = 80.0
+    response_tokens: int = 120
+    route_response: str = "web"
+    outline_steps: int = 5
+    quota_per_second: float = 0.0
+
+    _quota: Any = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any):
+        self._quota = _Quota(self.quota_per_second)
+
+    @property
+    def quota(self) -> "_Quota":
+        return self._quota
+
+    @property
+    def _llm_type(self) -> str:
+        return "nexus-fake-chat"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        if messages and isinstance(messages[0], SystemMessage):
+            return [self.route_response]
+        if messages and "Return ONLY the steps" in str(messages[-1].content):
+            sources = ("video", "web", "resume")
+            return [f"{i + 1}. {FILLER[i % len(FILLER)]} step | {sources[i % 3]}\n" for i in range(self.outline_steps)]
+        return [FILLER[i % len(FILLER)] + " " for i in range(self.response_tokens)]
+
+    def _usage(self, messages: List[BaseMessage], output_tokens: int) -> dict:
+        input_tokens = sum(len(str(message.content)) for message in messages) // 4
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        self.quota.check()
+        tokens = self._tokens(messages)
+        time.sleep((self.latency_ms + 1000 * len(tokens) / self.tokens_per_second) / 1000)
+        message = AIMessage(content="".join(tokens).strip(), usage_metadata=self._usage(messages, len(tokens)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        self.quota.check()
+        tokens = self._tokens(messages)
+        await asyncio.sleep((self.latency_ms + 1000 * len(tokens) / self.tokens_per_second) / 1000)
+        message = AIMessage(content="".join(tokens).strip(), usage_metadata=self._usage(messages, len(tokens)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self.quota.check()
+        tokens = self._tokens(messages)
+        time.sleep(self.latency_ms / 1000)
+        for i, token in enumerate(tokens):
+            time.sleep(1 / self.tokens_per_second)
+            usage = self._usage(messages, len(tokens)) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self.quota.check()
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency_ms / 1000)
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            usage = self._usage(messages, len(tokens)) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+class HashEmbeddings(Embeddings):
+    """
+    Feature-hashing bag-of-words embedder: deterministic across processes,
+    and texts sharing words get similar vectors, so retrieval stays meaningful.
+    `latency_ms` is added per request to mimic the embedding API, and
+    requests beyond `quota_per_second` fail with a 429.
+    """
+    def __init__(self, dimensions: int = 768, latency_ms: float = 0.0, quota_per_second: float = 0.0):
+        self.dimensions = dimensions
+        self.latency_ms = latency_ms
+        self.quota = _Quota(quota_per_second)
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            digest = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dimensions] += 1.0 if digest >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.quota.check()
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$eq" in condition and value != condition["$eq"]:
+                return False
+            if "$exists" in condition and (key in doc) != bool(condition["$exists"]):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return copy.copy(doc)
+    if any(projection.values()):
+        return {key: doc[key] for key in doc if key == "_id" or projection.get(key)}
+    return {key: value for key, value in doc.items() if key not in projection}
+
+class MockCollection:
+    """
+    In-memory stand-in for the pymongo Collection calls made by MongoDBHandler
+    and MongoDBAtlasVectorSearch: bulk ReplaceOne/UpdateOne writes, find/delete
+    with equality, $in and $exists filters, and a brute-force $vectorSearch aggregate.
+    """
+    def __init__(self, database, name: str):
+        self.database = database
+        self.name = name
+        self.docs = {}
+        self._lock = threading.Lock()
+
+    def create_index(self, *args, **kwargs):
+        return "source_1"
+
+    def list_search_indexes(self):
+        from config import settings
+        return [{"name": settings.INDEX_NAME}]
+
+    def bulk_write(self, ops, ordered: bool = True):
+        with self._lock:
+            for op in ops:
+                # pymongo keeps the operation arguments on private attributes
+                if isinstance(op, UpdateOne):
+                    doc = self.docs.get(op._filter["_id"])
+                    if doc is None:
+                        continue
+                    doc.update(op._doc.get("$set", {}))
+                    for key in op._doc.get("$unset", {}):
+                        doc.pop(key, None)
+                else:
+                    self.docs[op._filter["_id"]] = op._doc
+        return None
+
+    def stats(self) -> dict:
+        sizes = [len(bson.encode(doc)) for doc in list(self.docs.values())]
+        return {"count": len(sizes), "size": sum(sizes), "avgObjSize": sum(sizes) // max(1, len(sizes)),
+                "storageSize": sum(sizes), "totalIndexSize": 0}
+
+    def find(self, query: dict = None, projection: dict = None, **kwargs):
+        with self._lock:
+            docs = list(self.docs.values())
+        if query and list(query) == ["_id"] and isinstance(query["_id"], dict) and "$in" in query["_id"]:
+            docs = [self.docs[cid] for cid in query["_id"]["$in"] if cid in self.docs]
+        elif query:
+            docs = [doc for doc in docs if _matches(doc, query)]
+        return [_project(doc, projection) for doc in docs]
+
+    def count_documents(self, query: dict) -> int:
+        return len(self.find(query, {"_id": 1}))
+
+    def delete_many(self, filter: dict = None, **kwargs):
+        ids = [doc["_id"] for doc in self.find(filter or {}, {"_id": 1})]
+        with self._lock:
+            for cid in ids:
+                self.docs.pop(cid, None)
+        return _DeleteResult(len(ids))
+
+    def aggregate(self, pipeline: List[dict]):
+        results = None
+        for stage in pipeline:
+            if "$vectorSearch" in stage:
+                results = self._vector_search(stage["$vectorSearch"])
+            elif "$match" in stage:
+                results = [doc for doc in (results if results is not None else self.find()) if _matches(doc, stage["$match"])]
+            elif "$project" in stage:
+                results = [_project(doc, stage["$project"]) for doc in results]
+            elif "$limit" in stage:
+                results = results[:stage["$limit"]]
+            # "$set": {"score": {"$meta": "vectorSearchScore"}} is applied by _vector_search
+        return iter(results or [])
+
+    def _vector_search(self, spec: dict) -> List[dict]:
+        docs = [doc for doc in self.find(spec.get("filter") or {}) if spec["path"] in doc]
+        if not docs:
+            return []
+        from database.mongo import decode_vector
+        matrix = np.stack([decode_vector(doc[spec["path"]]) for doc in docs])
+        query = decode_vector(spec["queryVector"])
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        scores = matrix @ query / np.where(norms == 0, 1.0, norms)
+        top = np.argsort(-scores)[:spec["limit"]]
+        # Atlas reports cosine similarity normalised to [0, 1]
+        return [dict(docs[i], score=float((scores[i] + 1) / 2)) for i in top]
+
+class _DeleteResult:
+    def __init__(self, deleted_count: int):
+        self.deleted_count = deleted_count
+        self.acknowledged = True
+
+class MockDatabase:
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> MockCollection:
+        if name not in self._collections:
+            self._collections[name] = MockCollection(self, name)
+        return self._collections[name]
+
+    def create_collection(self, name: str) -> MockCollection:
+        return self[name]
+
+    def command(self, name: str, collection: str = None, **kwargs) -> dict:
+        if name == "collStats":
+            return self[collection].stats()
+        raise NotImplementedError(f"Mock database does not support '{name}'")
+
+class MockMongoClient:
+    """
+    Registered in place of MongoClient (registry.override("mongo_client", ...)).
+    """
+    def __init__(self):
+        self._databases = {}
+
+    def __getitem__(self, name: str) -> MockDatabase:
+        if name not in self._databases:
+            self._databases[name] = MockDatabase(self, name)
+        return self._databases[name]
+
+    def append_metadata(self, driver_info):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,87 @@
+import argparse
+import hashlib
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+def main_cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def run(source_type: str, url: str, workers: int, loader=None) -> dict:
+    """
+    Parses and splits one source with `workers` processes (1 = the in-process
+    loader and splitter) and returns throughput plus a digest of the chunks.
+    """
+    from config import settings
+    from data_pipeline import parallel
+    from data_pipeline.ingestion import get_text_splitter
+    from data_pipeline.loaders import get_loader
+
+    parallel.shutdown_process_pool()
+    settings.PARSE_WORKERS = workers
+    if workers > 1:
+        # Spawn and import the workers before timing
+        list(parallel._ordered((parallel._split, [], settings.CHUNK_SIZE, settings.CHUNK_OVERLAP) for _ in range(workers)))
+
+    digest = hashlib.sha256()
+    pages = chunks = 0
+    cpu_before = main_cpu_seconds()
+    started = time.perf_counter()
+    if workers > 1:
+        per_page = parallel.parse_and_split(source_type, url, loader=loader)
+    else:
+        splitter = get_text_splitter()
+        per_page = (splitter.split_documents([page]) for page in (loader or get_loader(source_type)).lazy_load(url))
+    for page_chunks in per_page:
+        pages += 1
+        for chunk in page_chunks:
+            chunks += 1
+            digest.update(chunk.page_content.encode("utf-8"))
+    seconds = time.perf_counter() - started
+    return {"workers": workers, "pages": pages, "chunks": chunks, "seconds": round(seconds, 2),
+            "pages_per_s": round(pages / seconds, 1), "main_cpu_s": round(main_cpu_seconds() - cpu_before, 2),
+            "digest": digest.hexdigest()[:12]}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse+split scaling with process-pool worker count")
+    parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker counts")
+    parser.add_argument("--pages", type=int, default=400, help="Pages in the generated input")
+    parser.add_argument("--input", choices=["pdf", "text"], default="pdf",
+                        help="Generated PDF (pypdf extraction + split) or synthetic text pages (split only)")
+    parser.add_argument("--pdf", help="Parse this PDF instead of a generated one")
+    args = parser.parse_args()
+
+    from benchmarks.corpus import SyntheticLoader, write_pdf
+
+    loader = None
+    with tempfile.TemporaryDirectory(prefix="nexus-parse-") as workdir:
+        if args.pdf:
+            source_type, url = "resume", args.pdf
+        elif args.input == "pdf":
+            source_type, url = "resume", os.path.join(workdir, "corpus.pdf")
+            write_pdf(url, args.pages)
+        else:
+            source_type, url, loader = "resume", f"synthetic://resume/0/{args.pages}", SyntheticLoader()
+
+        print(f"[INFO] {os.cpu_count()} cores; input: {url}")
+        baseline = None
+        digests = set()
+        for workers in (int(w) for w in args.workers.split(",")):
+            result = run(source_type, url, workers, loader)
+            baseline = baseline or result["seconds"]
+            digests.add(result["digest"])
+            print(f"  workers {workers:>3}: {result['pages']} pages, {result['chunks']} chunks in {result['seconds']:>7}s "
+                  f"({result['pages_per_s']:>8} pages/s, x{baseline / result['seconds']:.2f}), "
+                  f"main process CPU {result['main_cpu_s']}s, digest {result['digest']}")
+        from data_pipeline.parallel import shutdown_process_pool
+        shutdown_process_pool()
+    if len(digests) == 1:
+        print("[SUCCESS] Every worker count produced identical chunks in the same order.")
+    else:
+        print("[ERROR] Chunk output differs between worker counts.")
+        sys.exit(1)
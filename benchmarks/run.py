@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def percentiles(values: List[float]) -> dict:
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": len(values), "p50_ms": round(float(p50), 1), "p95_ms": round(float(p95), 1),
+            "p99_ms": round(float(p99), 1), "max_ms": round(max(values), 1)}
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+def configure(args, workdir: str):
+    """
+    Points settings at a scratch directory and swaps Gemini and Atlas for the fakes.
+    Must run before agent.graph is imported.
+    """
+    from config import settings
+    from config.resources import registry
+    from agent.scheduler import schedule_embeddings, schedule_llm
+    from agent.tracing import TracedEmbeddings
+    from benchmarks.fakes import FakeChatModel, HashEmbeddings, MockMongoClient
+
+    settings.GOOGLE_API_KEY = settings.GOOGLE_API_KEY or "benchmark"
+    settings.MONGO_URI = "mongodb://benchmark"
+    settings.VECTOR_STORE_BACKEND = "local" if args.store == "local" else "atlas"
+    settings.VECTOR_STORAGE_FORMAT = args.vector_format
+    settings.LOCAL_INDEX_DIR = os.path.join(workdir, "local_index")
+    settings.BM25_INDEX_DIR = os.path.join(workdir, "bm25")
+    settings.EMBEDDING_CACHE_PATH = os.path.join(workdir, "embeddings.sqlite3")
+    settings.EMBEDDING_CACHE_ENABLED = args.embedding_cache
+    settings.ANSWER_CACHE_ENABLED = False
+    settings.TRACE_EXPORT_PATH = None
+    settings.SCHEDULER_ENABLED = not args.no_scheduler
+
+    # Same wrapping order as config.resources: cache -> query batcher (server only) -> scheduler -> client
+    from agent.batching import batch_queries
+    embeddings = batch_queries(schedule_embeddings(HashEmbeddings(settings.VECTOR_SEARCH_DIMENSIONS, latency_ms=args.embed_latency_ms,
+                                                                  quota_per_second=args.embed_quota)))
+    if args.embedding_cache:
+        from database.embedding_cache import wrap_embeddings
+        embeddings = wrap_embeddings(embeddings, model_name="hash")
+    registry.override("embeddings", TracedEmbeddings(embeddings))
+    registry.override("llm", schedule_llm(FakeChatModel(latency_ms=args.llm_latency_ms, tokens_per_second=args.tokens_per_second,
+                                                        response_tokens=args.response_tokens, quota_per_second=args.llm_quota)))
+    registry.override("mongo_client", MockMongoClient())
+
+def bench_ingest(total_chunks: int) -> dict:
+    from config import settings
+    from config.resources import get_embeddings
+    from data_pipeline.streaming import stream_ingest
+    from benchmarks.corpus import SyntheticLoader, corpus_sources
+
+    loader = SyntheticLoader()
+    embeddings = get_embeddings()
+    totals = {"sources": 0, "pages": 0, "chunks": 0, "added": 0}
+    started = time.perf_counter()
+    for source_type, source in corpus_sources(total_chunks):
+        stats = stream_ingest(source_type, source, embeddings=embeddings, loader=loader)
+        totals["sources"] += 1
+        for key in ("pages", "chunks", "added"):
+            totals[key] += stats[key]
+    seconds = time.perf_counter() - started
+    report = dict(totals, seconds=round(seconds, 2), chunks_per_s=round(totals["chunks"] / seconds, 1),
+                  peak_rss_mb=peak_rss_mb())
+    if settings.VECTOR_STORE_BACKEND != "local":
+        from database.mongo import mongo_handler
+        report["storage"] = mongo_handler.storage_stats()
+    return report
+
+def bench_queries(count: int, concurrency: int) -> dict:
+    from agent.graph import answer_query, answer_many
+    from benchmarks.corpus import queries
+
+    questions = queries(count)
+    started = time.perf_counter()
+    if concurrency > 1:
+        results = answer_many(questions, concurrency)
+        end_to_end = []
+    else:
+        results, end_to_end = [], []
+        for question in questions:
+            t0 = time.perf_counter()
+            results.append(answer_query({"query": question, "messages": []}))
+            end_to_end.append((time.perf_counter() - t0) * 1000)
+    seconds = time.perf_counter() - started
+
+    spans: Dict[str, List[float]] = {}
+    errors = 0
+    routes: Dict[str, int] = {}
+    for result in results:
+        errors += 1 if result.get("error") else 0
+        routes[result.get("decision", "error")] = routes.get(result.get("decision", "error"), 0) + 1
+        for record in result.get("trace") or []:
+            spans.setdefault(record["name"], []).append(record["ms"])
+    report = {
+        "queries": count, "concurrency": concurrency, "errors": errors, "routes": routes,
+        "seconds": round(seconds, 2), "queries_per_s": round(count / seconds, 2),
+        "spans": {name: percentiles(values) for name, values in sorted(spans.items())},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if end_to_end:
+        report["end_to_end"] = percentiles(end_to_end)
+    return report
+
+def scheduler_report() -> list:
+    from agent.scheduler import scheduler_stats
+    return scheduler_stats()
+
+def run_size(args, size: str) -> dict:
+    with tempfile.TemporaryDirectory(prefix="nexus-bench-") as workdir:
+        configure(args, workdir)
+        print(f"[INFO] Ingesting ~{SIZES[size]:,} synthetic chunks into the {args.store} store...")
+        ingest = bench_ingest(SIZES[size])
+        print(f"[INFO] {ingest['chunks']:,} chunks in {ingest['seconds']}s ({ingest['chunks_per_s']:,} chunks/s), "
+              f"peak RSS {ingest['peak_rss_mb']} MB")
+        if ingest.get("storage"):
+            print(f"[INFO] Mock collection ({args.vector_format}): {ingest['storage']['avgObjSize']} bytes/chunk")
+        query = None
+        if args.queries:
+            print(f"[INFO] Running {args.queries} queries (concurrency {args.concurrency})...")
+            query = bench_queries(args.queries, args.concurrency)
+            for name, stats in query["spans"].items():
+                print(f"  {name:<32} p50 {stats['p50_ms']:>8} ms  p95 {stats['p95_ms']:>8} ms  p99 {stats['p99_ms']:>8} ms")
+        schedulers = scheduler_report()
+        for stats in schedulers:
+            print(f"[INFO] Scheduler {stats['name']}: {stats['calls']} calls, {stats['coalesced']} coalesced, "
+                  f"{stats['throttled']} throttled, {stats['retries']} retries, {stats['failures']} failed, "
+                  f"limit {stats['concurrency_limit']}")
+        return {"size": size, "ingest": ingest, "query": query, "schedulers": schedulers}
+
+def compare(old_path: str, new_path: str, threshold: float):
+    """
+    Prints metric changes between two result files and exits non-zero on a regression above `threshold`.
+    """
+    with open(old_path) as f:
+        old = {run["size"]: run for run in json.load(f)["runs"]}
+    with open(new_path) as f:
+        new = {run["size"]: run for run in json.load(f)["runs"]}
+    regressions = 0
+
+    def line(label: str, before: float, after: float, higher_is_better: bool):
+        nonlocal regressions
+        if not before:
+            return
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        flag = "REGRESSION" if worse > threshold else ""
+        regressions += 1 if flag else 0
+        print(f"  {label:<44} {before:>10} -> {after:>10} ({change:+.1%}) {flag}")
+
+    for size in sorted(set(old) & set(new), key=lambda s: SIZES[s]):
+        print(f"[{size}]")
+        line("ingest chunks/s", old[size]["ingest"]["chunks_per_s"], new[size]["ingest"]["chunks_per_s"], True)
+        line("ingest peak RSS MB", old[size]["ingest"]["peak_rss_mb"], new[size]["ingest"]["peak_rss_mb"], False)
+        before, after = old[size].get("query") or {}, new[size].get("query") or {}
+        for name in sorted(set(before.get("spans", {})) & set(after.get("spans", {}))):
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                line(f"{name} {key}", before["spans"][name][key], after["spans"][name][key], False)
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nexus AI offline benchmarks (fake Gemini, hash embeddings, local or mock Mongo store)")
+    parser.add_argument("--sizes", default="1k", help="Comma-separated corpus sizes: 1k, 100k, 1m")
+    parser.add_argument("--store", choices=["local", "mock"], default="local", help="Local NumPy index or in-memory mock of the Atlas collection")
+    parser.add_argument("--vector-format", choices=["array", "float32", "int8", "binary"], default="array",
+                        help="VECTOR_STORAGE_FORMAT for the mock store")
+    parser.add_argument("--queries", type=int, default=100, help="Queries to run after ingestion (0 to skip)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Queries in flight (>1 uses answer_many)")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Fake LLM time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Fake LLM generation rate")
+    parser.add_argument("--response-tokens", type=int, default=120, help="Tokens per fake answer")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="Added latency per embedding request")
+    parser.add_argument("--llm-quota", type=float, default=0.0, help="Fake LLM calls/s before it answers 429 (0 = no quota)")
+    parser.add_argument("--embed-quota", type=float, default=0.0, help="Fake embedding requests/s before 429 (0 = no quota)")
+    parser.add_argument("--no-scheduler", action="store_true", help="Call the fakes directly, without the API scheduler")
+    parser.add_argument("--embedding-cache", action="store_true", help="Route embeddings through the SQLite embedding cache")
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(__file__), "results"), help="Directory for result JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change flagged as a regression by --compare")
+    parser.add_argument("--single", help=argparse.SUPPRESS)  # internal: run one size in this process
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare, args.threshold)
+
+    if args.single:
+        with open(args.result_file, "w") as f:
+            json.dump(run_size(args, args.single), f)
+        sys.exit(0)
+
+    sizes = [size.strip().lower() for size in args.sizes.split(",")]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    # Each size runs in a fresh process so peak RSS is not inherited from a larger run
+    runs = []
+    for size in sizes:
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+            result_file = tmp.name
+        try:
+            subprocess.run([sys.executable, "-m", "benchmarks.run", *sys.argv[1:], "--single", size, "--result-file", result_file],
+                           check=True, cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+            with open(result_file) as f:
+                runs.append(json.load(f))
+        finally:
+            os.unlink(result_file)
+
+    result = {"commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "config": vars(args), "runs": runs}
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"{time.strftime('%Y%m%d-%H%M%S')}-{result['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"[SUCCESS] Results written to '{path}'.")
@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+async def load(url: str, questions: list, concurrency: int) -> dict:
+    """
+    POSTs every question to the server with `concurrency` requests in flight.
+    """
+    import aiohttp
+
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        async def one(question: str):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                async with session.post(f"{url}/query", json={"query": question}) as response:
+                    await response.json()
+                    errors += response.status != 200
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(question) for question in questions))
+        seconds = time.perf_counter() - started
+        async with session.get(f"{url}/health") as response:
+            health = await response.json()
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"requests": len(questions), "errors": errors, "seconds": round(seconds, 2),
+            "queries_per_s": round(len(questions) / seconds, 1), "p50_ms": round(float(p50), 1),
+            "p95_ms": round(float(p95), 1), "p99_ms": round(float(p99), 1), "health": health}
+
+async def main(args):
+    from aiohttp import web
+    import server
+    from benchmarks.run import configure, bench_ingest
+    from benchmarks.corpus import queries
+
+    from config import settings
+    server.configure(args.batch_size, args.batch_wait_ms, batching=not args.no_batching)
+    # The fake LLM has no quota; let the scheduler run as many calls as the server has requests
+    settings.LLM_MAX_CONCURRENCY = args.llm_concurrency
+    with tempfile.TemporaryDirectory(prefix="nexus-serve-") as workdir:
+        configure(args, workdir)
+        print(f"[INFO] Ingesting ~{args.chunks:,} synthetic chunks...")
+        bench_ingest(args.chunks)
+
+        query_server = server.QueryServer(args.max_concurrency)
+        runner = web.AppRunner(server.create_app(query_server))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", args.port)
+        await site.start()
+        try:
+            mode = "unbatched" if args.no_batching else f"batch {args.batch_size} / {args.batch_wait_ms} ms"
+            print(f"[INFO] {args.requests} requests, {args.concurrency} in flight ({mode})...")
+            report = await load(f"http://127.0.0.1:{args.port}", queries(args.requests), args.concurrency)
+        finally:
+            await runner.cleanup()
+
+    print(f"  {report['queries_per_s']} queries/s, p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, "
+          f"p99 {report['p99_ms']} ms, {report['errors']} errors")
+    for stats in query_server.stats()[1:]:
+        print(f"  query embeddings: {stats['queries']} in {stats['batches']} batches "
+              f"(mean {stats['mean_batch']}, largest {stats['largest_batch']})")
+    from agent.scheduler import scheduler_stats
+    for stats in scheduler_stats():
+        print(f"  scheduler {stats['name']}: {stats['calls']} calls, {stats['coalesced']} coalesced, "
+              f"{stats['throttled']} throttled, waited {stats['wait_ms']:.0f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the query server against the offline fakes")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200, help="Requests in flight")
+    parser.add_argument("--chunks", type=int, default=1000, help="Synthetic corpus size")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-concurrency", type=int, default=256, help="Server graph runs in flight")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--batch-wait-ms", type=float, default=5.0)
+    parser.add_argument("--no-batching", action="store_true")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-concurrency", type=int, default=256, help="LLM scheduler concurrency limit")
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--response-tokens", type=int, default=120)
+    parser.add_argument("--embed-latency-ms", type=float, default=50.0, help="Added latency per embedding request")
+    parser.add_argument("--embed-quota", type=float, default=0.0, help="Fake embedding requests/s before 429 (0 = no quota)")
+    args = parser.parse_args()
+    # Settings benchmarks.run.configure expects
+    args.store, args.vector_format, args.llm_quota = "local", "array", 0.0
+    args.no_scheduler, args.embedding_cache = False, False
+    asyncio.run(main(args))
@@ -0,0 +1,119 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from config import settings
+
+class ResourceRegistry:
+    """
+    Builds expensive clients on first use and caches them per key, so the
+    LLM, embeddings, Mongo client and vector store are shared by every caller
+    using the same API key / URI. Records how long each build took.
+    """
+    def __init__(self):
+        self._items = {}
+        self._overrides = {}
+        self._lock = threading.RLock()
+        self.timings = {}
+
+    def get(self, name: str, key, factory):
+        if name in self._overrides:
+            return self._overrides[name]
+        with self._lock:
+            if (name, key) not in self._items:
+                started = time.perf_counter()
+                self._items[(name, key)] = factory()
+                self.timings[f"build.{name}"] = round((time.perf_counter() - started) * 1000, 1)
+            return self._items[(name, key)]
+
+    def override(self, name: str, value):
+        """
+        Forces `name` to resolve to `value` for every key (used by benchmarks and offline runs).
+        """
+        self._overrides[name] = value
+
+    def clear(self):
+        with self._lock:
+            for (name, _), item in self._items.items():
+                if name == "mongo_client":
+                    item.close()
+            self._items = {}
+            self._overrides = {}
+
+    @contextmanager
+    def time_first(self, label: str):
+        """
+        Times the wrapped block the first time `label` is seen (e.g. the first request).
+        """
+        if label in self.timings:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.setdefault(label, round((time.perf_counter() - started) * 1000, 1))
+
+    def report(self) -> dict:
+        return dict(self.timings)
+
+registry = ResourceRegistry()
+
+def get_llm():
+    # Rate limits and retries are handled by the shared scheduler (max_retries=1 turns off the SDK's own)
+    def build():
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from agent.scheduler import schedule_llm
+        return schedule_llm(ChatGoogleGenerativeAI(model=settings.LLM_MODEL, google_api_key=settings.GOOGLE_API_KEY,
+                                                   max_retries=1 if settings.SCHEDULER_ENABLED else 6))
+    return registry.get("llm", settings.GOOGLE_API_KEY, build)
+
+def get_embeddings():
+    # Wrapped in the shared embedding cache, so repeated texts skip the API (and the rate limits), and traced.
+    # Under the query server, cache misses of concurrent queries are embedded in micro-batches.
+    def build():
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        from database.embedding_cache import wrap_embeddings
+        from agent.scheduler import schedule_embeddings
+        from agent.batching import batch_queries
+        from agent.tracing import TracedEmbeddings
+        return TracedEmbeddings(wrap_embeddings(batch_queries(schedule_embeddings(GoogleGenerativeAIEmbeddings(
+            model=settings.EMBEDDING_MODEL,
+            google_api_key=settings.GOOGLE_API_KEY
+        )))))
+    return registry.get("embeddings", settings.GOOGLE_API_KEY, build)
+
+def get_mongo_client():
+    def build():
+        from pymongo import MongoClient
+        return MongoClient(
+            settings.MONGO_URI,
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+            serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+        )
+    return registry.get("mongo_client", settings.MONGO_URI, build)
+
+def get_vector_store():
+    def build():
+        from database.vector_store import get_vector_store as build_vector_store
+        return build_vector_store(get_embeddings())
+    key = (settings.VECTOR_STORE_BACKEND, settings.GOOGLE_API_KEY, settings.MONGO_URI)
+    return registry.get("vector_store", key, build)
+
+def get_answer_cache():
+    # Answers are built from one knowledge base, so each (API key, Mongo URI) gets its own cache
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    def build():
+        from agent.answer_cache import SemanticAnswerCache
+        from database.vector_store import on_ingested
+        cache = SemanticAnswerCache()
+        # Ingestion does not say whose knowledge base changed, so every cache drops the partition
+        on_ingested(cache.invalidate)
+        return cache
+    key = (settings.VECTOR_STORE_BACKEND, settings.GOOGLE_API_KEY, settings.MONGO_URI)
+    return registry.get("answer_cache", key, build)
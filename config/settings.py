@@ -11,15 +11,146 @@ LLM_MODEL = "gemini-2.5-flash"
 VECTOR_SEARCH_DIMENSIONS = 768
 VECTOR_SEARCH_METRIC = "cosine"
 INDEX_NAME = "default"
+# How chunk embeddings are stored in Mongo: "array" (BSON doubles, ~9 bytes/dim), or packed BSON binary
+# vectors: "float32" (4 bytes/dim), "int8" (scalar-quantized, 1 byte/dim) or "binary" (1 bit/dim)
+VECTOR_STORAGE_FORMAT = os.getenv("VECTOR_STORAGE_FORMAT", "array")
+VECTOR_INDEX_QUANTIZATION = "none"  # "float32" only: let Atlas quantize the index ("scalar" or "binary")
+# "int8"/"binary": also store a float32 copy and re-rank candidates at full precision. Off by default: the copy
+# makes a quantized chunk larger than a "float32" one; for recall, prefer "float32" with VECTOR_INDEX_QUANTIZATION
+VECTOR_RESCORE = os.getenv("VECTOR_RESCORE", "false").lower() == "true"
+VECTOR_RESCORE_OVERSAMPLING = 4     # quantized candidates fetched per result before rescoring
+
+# Vector Store Backend: "atlas", "local" (in-process NumPy index) or "cached" (local read-through cache over Atlas)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "atlas")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", ".cache/local_index")
+LOCAL_CACHE_TTL_SECONDS = 600       # how long a warmed partition is trusted in "cached" mode
+LOCAL_INDEX_IVF = False             # probe a coarse quantizer instead of scanning every row
+LOCAL_INDEX_IVF_MIN_ROWS = 50_000   # partitions smaller than this are always scanned exactly
+LOCAL_INDEX_IVF_LISTS = 0           # 0 = sqrt(rows)
+LOCAL_INDEX_IVF_PROBES = 8
 
 # Database Configuration
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = "nexus_db"
 COLLECTION_NAME = "knowledge_base"
+MONGO_MAX_POOL_SIZE = 50
+MONGO_MIN_POOL_SIZE = 0
+MONGO_MAX_IDLE_TIME_MS = 60_000
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 5_000
+MONGO_CONNECT_TIMEOUT_MS = 5_000
+MONGO_SOCKET_TIMEOUT_MS = 30_000
 
 # Ingestion Configuration
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+INGEST_LOAD_CONCURRENCY = 8    # sources fetched in parallel in --manifest mode
+EMBED_BATCH_SIZE = 100         # texts per embed_documents request
+EMBED_CONCURRENCY = 4          # embedding requests in flight
+MONGO_WRITE_BATCH_SIZE = 500   # documents per bulk write
+INGEST_QUEUE_SIZE = 32         # items buffered between streaming pipeline stages
+INGEST_MAX_JOBS = 2            # concurrent in-app ingestion jobs
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0"))  # processes for PDF/HTML parsing and splitting (0 = one per core, 1 = in-process)
+PARSE_PAGES_PER_TASK = 8       # pages (or documents) handed to a worker at a time
+PARSE_MIN_PDF_PAGES = int(os.getenv("PARSE_MIN_PDF_PAGES", "32"))  # smaller PDFs, web pages and videos parse in-process (no pool startup)
+
+# Snapshot Configuration (python -m database.mongo --export-snapshot / --import-snapshot)
+SNAPSHOT_IMPORT_WORKERS = int(os.getenv("SNAPSHOT_IMPORT_WORKERS", "4"))  # bulk-write batches in flight
+SNAPSHOT_COMPRESSION = 1       # gzip level of chunks.jsonl.gz (1 = fastest)
+
+# Web Crawl Configuration
+CRAWL_MAX_DEPTH = 3                 # link hops followed from the root URL
+CRAWL_MAX_PAGES = 1000              # pages fetched per crawl
+CRAWL_CONCURRENCY = 16              # requests in flight
+CRAWL_PER_HOST_CONCURRENCY = 4      # requests in flight per host
+CRAWL_TIMEOUT_SECONDS = 30
+CRAWL_USER_AGENT = "NexusAI-Crawler/1.0"
+CRAWL_STATE_PATH = os.getenv("CRAWL_STATE_PATH", ".cache/crawl.sqlite3")  # ETag/Last-Modified/hash per page
+
+# YouTube Configuration
+YOUTUBE_LANGUAGE = os.getenv("YOUTUBE_LANGUAGE", "en")  # transcript language (manual subtitles, then auto-captions)
+YOUTUBE_FETCH_CONCURRENCY = 8  # videos of a playlist/channel fetched in parallel (also the HTTP pool size)
+TRANSCRIPT_CACHE_PATH = os.getenv("TRANSCRIPT_CACHE_PATH", ".cache/transcripts.sqlite3")
+
+# Embedding Cache Configuration
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = 500_000   # rows kept on disk before LRU eviction
+EMBEDDING_CACHE_MEMORY_ENTRIES = 10_000 # hot vectors kept in process memory
+
+# Retrieval Configuration
+RETRIEVAL_K = 5
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"  # fuse BM25 and vector results
+BM25_INDEX_DIR = os.getenv("BM25_INDEX_DIR", ".cache/bm25")
+HYBRID_CANDIDATES = 20        # candidates taken from each retriever before fusion
+HYBRID_VECTOR_WEIGHT = 1.0
+HYBRID_LEXICAL_WEIGHT = 1.0
+RRF_K = 60                    # reciprocal rank fusion constant
+
+# Context Packing Configuration
+CONTEXT_TOKEN_BUDGET = 2000           # default prompt-context budget (estimated tokens)
+CONTEXT_TOKEN_BUDGETS = {"resume": 1500, "video": 2000, "web": 2000}
+CONTEXT_DEDUP_THRESHOLD = 0.8         # shingle Jaccard similarity above which a passage is a near-duplicate
+
+# Router Configuration
+ROUTER_MODE = os.getenv("ROUTER_MODE", "hybrid")  # "hybrid" (local, LLM below threshold), "local" or "llm"
+ROUTER_CONFIDENCE_THRESHOLD = 0.7
+ROUTER_TEMPERATURE = 0.05     # softmax temperature over centroid similarities
+ROUTER_KEYWORD_WEIGHT = 1.5   # logit bonus per matching keyword rule
+
+# Agent Execution Configuration
+AGENT_MAX_CONCURRENCY = 16    # graph runs in flight in answer_many
+
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "false").lower() == "true"  # search all partitions while routing
+SPECULATIVE_POOL_SIZE = 12
+
+# Planner Configuration
+PLANNER_MODE = os.getenv("PLANNER_MODE", "map_reduce")  # "map_reduce" (outline, then steps in parallel) or "single" (one prompt)
+PLANNER_MAX_STEPS = 6
+PLANNER_CONCURRENCY = int(os.getenv("PLANNER_CONCURRENCY", "6"))  # steps expanded in parallel
+PLANNER_STEP_TOKEN_BUDGET = 800  # retrieved context per step (estimated tokens)
+
+# Conversation Memory Configuration (per-session window + rolling summary, checkpointed to SQLite)
+MEMORY_ENABLED = os.getenv("MEMORY_ENABLED", "true").lower() == "true"
+MEMORY_PATH = os.getenv("MEMORY_PATH", ".cache/memory.sqlite3")
+MEMORY_WINDOW_TOKENS = 1500   # recent turns kept verbatim in the prompt (estimated tokens)
+MEMORY_MAX_TURNS = 6          # at most this many user/assistant exchanges in the window
+MEMORY_SUMMARY_TOKENS = 300   # cap on the rolling summary of older turns
+MEMORY_CONDENSE_QUERY = os.getenv("MEMORY_CONDENSE_QUERY", "true").lower() == "true"  # rewrite follow-ups before routing/retrieval
+
+# Gemini Scheduler Configuration (client-side rate limits, retries and request coalescing)
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "1000"))       # 0 = unlimited
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))        # prompt tokens, corrected by usage
+LLM_MAX_CONCURRENCY = 16        # upper bound of the adaptive concurrency limit
+EMBED_REQUESTS_PER_MINUTE = int(os.getenv("EMBED_REQUESTS_PER_MINUTE", "1500"))   # one request per embedding batch
+EMBED_TOKENS_PER_MINUTE = int(os.getenv("EMBED_TOKENS_PER_MINUTE", "0"))
+EMBED_MAX_CONCURRENCY = 8
+SCHEDULER_MAX_RETRIES = 5       # retries of throttled (429) and transient (5xx, timeout) failures
+SCHEDULER_BACKOFF_BASE_MS = 500 # full-jitter exponential backoff: uniform(0, base * 2^attempt)
+SCHEDULER_BACKOFF_MAX_MS = 30_000
+
+# Query Server Configuration (python server.py: HTTP/JSON API without Streamlit)
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8080"))
+SERVER_MAX_CONCURRENCY = int(os.getenv("SERVER_MAX_CONCURRENCY", "256"))  # graph runs in flight; later requests queue
+SERVER_THREADS = 128          # event-loop executor threads for blocking search/embedding/Mongo calls
+QUERY_BATCHING_ENABLED = os.getenv("QUERY_BATCHING_ENABLED", "false").lower() == "true"  # the server turns it on
+QUERY_BATCH_SIZE = int(os.getenv("QUERY_BATCH_SIZE", "64"))          # query embeddings per batched call
+QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", "5"))   # how long the first query waits for company
+QUERY_BATCH_CONCURRENCY = 4   # batches embedded at once while the next one fills
+
+# Tracing Configuration
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"  # per-node/per-call spans in state["trace"]
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")  # append each finished trace here as a JSON line
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"  # start the sampling profiler on import
+PROFILER_INTERVAL_MS = 5
+PROFILER_OUTPUT_PATH = ".cache/profile.folded"
+
+# Answer Cache Configuration
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = 0.92   # minimum cosine similarity between queries to reuse an answer
+ANSWER_CACHE_TTL_SECONDS = 3600
+ANSWER_CACHE_MAX_ENTRIES = 1000  # per (API key, Mongo URI); each knowledge base has its own cache
 
 # API Keys
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
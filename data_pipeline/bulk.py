@@ -0,0 +1,178 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import settings
+from database.vector_store import get_chunk_store, get_lexical_index, notify_ingested
+from data_pipeline.loaders import DocumentLoader
+from data_pipeline.ingestion import get_embeddings
+from data_pipeline.streaming import stream_ingest
+
+SOURCE_TYPES = ("resume", "video", "web")
+
+def read_manifest(path: str) -> List[dict]:
+    """
+    Reads a manifest of sources. `.csv` files need a header row with `type`
+    and `url` columns; anything else is parsed as JSON lines with the same keys.
+    An optional `source` column overrides the stored source name.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    entries = []
+    for line_no, row in enumerate(rows, start=1):
+        source_type = (row.get("type") or "").strip()
+        url = (row.get("url") or "").strip()
+        if source_type not in SOURCE_TYPES or not url:
+            print(f"[WARN] Skipping manifest entry {line_no}: {row}")
+            continue
+        entries.append({"type": source_type, "url": url, "source": (row.get("source") or "").strip() or url})
+    return entries
+
+class StageMeter:
+    """
+    Wall-clock timer and item counter for one pipeline stage.
+    """
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.count = 0
+        self.elapsed = 0.0
+        self._started = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed += time.perf_counter() - self._started
+
+    def report(self) -> str:
+        rate = self.count / self.elapsed if self.elapsed > 0 else 0.0
+        return f"{self.name:<6} {self.count:>8} {self.unit:<10} in {self.elapsed:7.2f}s  ({rate:,.1f} {self.unit}/s)"
+
+class DocumentsLoader(DocumentLoader):
+    """
+    Serves documents that are already in memory (e.g. crawled pages) to stream_ingest.
+    """
+    def __init__(self, documents):
+        self.documents = documents
+
+    def load(self, source: str):
+        return list(self.documents)
+
+def ingest_sources(items: Iterable[tuple], concurrency: int = None, embed_batch_size: int = None,
+                   embed_concurrency: int = None, write_batch_size: int = None) -> dict:
+    """
+    Runs each (entry, loader) pair through stream_ingest, `concurrency`
+    sources at a time (a None loader picks the one for the entry's type).
+    Every source is a bounded pipeline, so memory stays flat however many
+    sources there are. A source that fails is recorded in `failed_sources`
+    and the others carry on; one that loads no documents keeps its chunks.
+    """
+    concurrency = concurrency or settings.INGEST_LOAD_CONCURRENCY
+    embeddings = get_embeddings()
+    stats = {"sources": 0, "failed": 0, "skipped": 0, "pages": 0, "chunks": 0,
+             "added": 0, "unchanged": 0, "removed": 0, "failed_sources": []}
+
+    def run(entry: dict, loader):
+        return stream_ingest(entry["type"], entry["url"], source=entry["source"], embeddings=embeddings,
+                             embed_batch_size=embed_batch_size, embed_concurrency=embed_concurrency,
+                             write_batch_size=write_batch_size, loader=loader, save_lexical=False)
+
+    def record(entry: dict, future):
+        stats["sources"] += 1
+        try:
+            result = future.result()
+        except Exception as e:
+            stats["failed"] += 1
+            stats["failed_sources"].append({"url": entry["url"], "source": entry["source"], "error": str(e)})
+            print(f"[ERROR] Error ingesting '{entry['url']}': {e}")
+            return
+        if not result["pages"]:
+            stats["skipped"] += 1
+        for key in ("pages", "chunks", "added", "unchanged", "removed"):
+            stats[key] += result[key]
+
+    # Entries are submitted as slots free up, so a long manifest is never queued all at once
+    in_flight = {}
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ingest") as pool:
+            for entry, loader in items:
+                while len(in_flight) >= concurrency:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(in_flight.pop(future), future)
+                in_flight[pool.submit(run, entry, loader)] = entry
+            for future in wait(in_flight).done:
+                record(in_flight[future], future)
+    finally:
+        # Saved once for the whole run; chunks stored by an interrupted run are re-indexed on the next one
+        lexical = get_lexical_index()
+        if lexical is not None:
+            lexical.save()
+    return stats
+
+def ingest_documents(loaded, concurrency: int = None, embed_batch_size: int = None,
+                     embed_concurrency: int = None, write_batch_size: int = None) -> dict:
+    """
+    Ingests already-loaded sources given as (entry, documents) pairs; see ingest_sources.
+    """
+    items = ((entry, DocumentsLoader(documents)) for entry, documents in loaded)
+    return ingest_sources(items, concurrency=concurrency, embed_batch_size=embed_batch_size,
+                          embed_concurrency=embed_concurrency, write_batch_size=write_batch_size)
+
+def remove_sources(sources: List[str], source_type: str) -> int:
+    """
+    Deletes every stored chunk of `sources` (e.g. pages that are gone) from the store and the lexical index.
+    Returns the number of chunks removed.
+    """
+    store = get_chunk_store()
+    found = store.get_chunk_ids_by_source(sources)
+    ids = set().union(*found.values())
+    if not ids:
+        return 0
+    removed = store.delete_chunks(ids)
+    lexical = get_lexical_index()
+    if lexical is not None:
+        lexical.delete_chunks(ids)
+        lexical.save()
+    notify_ingested(source_type)
+    return removed
+
+def ingest_manifest(path: str, load_concurrency: int = None, embed_batch_size: int = None,
+                    embed_concurrency: int = None, write_batch_size: int = None) -> dict:
+    """
+    Ingests every source in a manifest, `load_concurrency` streaming pipelines
+    at a time; embeddings go out in concurrent batches and writes are bulk
+    upserts. Sources that fail are reported and left untouched in the store.
+    """
+    entries = read_manifest(path)
+    print(f"[INFO] Manifest '{path}': {len(entries)} source(s).")
+
+    meter = StageMeter("ingest", "chunks")
+    with meter:
+        stats = ingest_sources(((entry, None) for entry in entries), concurrency=load_concurrency,
+                               embed_batch_size=embed_batch_size, embed_concurrency=embed_concurrency,
+                               write_batch_size=write_batch_size)
+    meter.count = stats["chunks"]
+
+    print("[SUCCESS] Manifest ingestion finished.")
+    print(f"[INFO] {meter.report()}")
+    print(f"[INFO] Sources: {stats['sources'] - stats['failed'] - stats['skipped']} ok, {stats['skipped']} empty (kept), "
+          f"{stats['failed']} failed. Chunks: {stats['added']} added, {stats['unchanged']} unchanged, {stats['removed']} removed.")
+    for failure in stats["failed_sources"]:
+        print(f"[ERROR] Failed: {failure['url']}: {failure['error']}")
+    embeddings = get_embeddings()
+    if hasattr(embeddings, "cache"):
+        print(f"[INFO] Embedding cache: {embeddings.cache.stats()}")
+    return stats
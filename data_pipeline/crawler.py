@@ -0,0 +1,356 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib import robotparser
+from urllib.parse import urldefrag, urljoin, urlparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.documents import Document
+
+from config import settings
+from data_pipeline.parallel import get_process_pool, parse_workers
+
+_LOC = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.IGNORECASE)
+_SKIP_EXTENSIONS = (".pdf", ".zip", ".gz", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".mp4", ".mp3",
+                    ".css", ".js", ".json", ".xml", ".ico", ".woff", ".woff2", ".tar", ".exe")
+
+def normalize_url(url: str) -> str:
+    """
+    Drops the fragment and gives an empty path "/", so the same page is fetched once.
+    """
+    url = urldefrag(url)[0]
+    parsed = urlparse(url)
+    if parsed.path == "":
+        url = parsed._replace(path="/").geturl()
+    return url
+
+class CrawlState:
+    """
+    SQLite record of crawled pages: the validators (ETag, Last-Modified) sent
+    back as conditional GET headers, the body hash, and the page's outgoing
+    links, so unchanged pages are neither re-parsed nor re-embedded and the
+    crawl can still follow them.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, root TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+            "content_hash TEXT, links TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_root ON pages (root)")
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_hash, links FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "content_hash": row[2], "links": json.loads(row[3])}
+
+    def put(self, root: str, page: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, root, etag, last_modified, content_hash, links, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (page["url"], root, page.get("etag"), page.get("last_modified"), page.get("content_hash"),
+                 json.dumps(page.get("links", [])), time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, urls: List[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM pages WHERE url = ?", [(url,) for url in urls])
+            self._conn.commit()
+
+    def urls(self, root: str) -> set:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT url FROM pages WHERE root = ?", (root,))}
+
+def parse_page(url: str, html: str):
+    """
+    Returns (document, links) for an HTML page. Text and metadata mirror
+    WebBaseLoader; links are absolute, fragment-free http(s) URLs.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    for anchor in soup.find_all("a", href=True):
+        link = normalize_url(urljoin(url, anchor["href"]))
+        if urlparse(link).scheme in ("http", "https"):
+            links.append(link)
+
+    metadata = {"source": url}
+    if soup.find("title"):
+        metadata["title"] = soup.find("title").get_text()
+    description = soup.find("meta", attrs={"name": "description"})
+    if description:
+        metadata["description"] = description.get("content", "No description found.")
+    if soup.find("html"):
+        metadata["language"] = soup.find("html").get("lang", "No language found.")
+    return Document(page_content=soup.get_text(), metadata=metadata), list(dict.fromkeys(links))
+
+class _Host:
+    """Per-host politeness: a concurrency limit, robots rules and crawl delay."""
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.robots = None
+        self.delay = 0.0
+        self.next_request = 0.0
+        self.pacing = asyncio.Lock()
+        self.ready = asyncio.Lock()
+
+class Crawler:
+    """
+    Asynchronous same-domain crawler. Starts from a root URL plus any sitemap
+    URLs, follows links breadth-first up to `max_depth` and `max_pages`, obeys
+    robots.txt (including Crawl-delay) and caps requests per host.
+
+    Known pages are fetched with If-None-Match / If-Modified-Since; a 304 or an
+    identical body hash marks them "unchanged". Changed pages carry their
+    parsed Document. Nothing is written to the state here: callers save a
+    page once it has been ingested, so a failed run is retried next time.
+    """
+    def __init__(self, state: CrawlState = None, max_depth: int = None, max_pages: int = None,
+                 concurrency: int = None, per_host_concurrency: int = None, use_sitemap: bool = True,
+                 user_agent: str = None, timeout: float = None):
+        self.state = state
+        self.max_depth = settings.CRAWL_MAX_DEPTH if max_depth is None else max_depth
+        self.max_pages = max_pages or settings.CRAWL_MAX_PAGES
+        self.concurrency = concurrency or settings.CRAWL_CONCURRENCY
+        self.per_host_concurrency = per_host_concurrency or settings.CRAWL_PER_HOST_CONCURRENCY
+        self.use_sitemap = use_sitemap
+        self.user_agent = user_agent or settings.CRAWL_USER_AGENT
+        self.timeout = timeout or settings.CRAWL_TIMEOUT_SECONDS
+        self._hosts: Dict[str, _Host] = {}
+
+    def _in_scope(self, root: str, url: str) -> bool:
+        return urlparse(url).netloc == urlparse(root).netloc and not urlparse(url).path.lower().endswith(_SKIP_EXTENSIONS)
+
+    async def _host(self, session, url: str) -> _Host:
+        parsed = urlparse(url)
+        key = f"{parsed.scheme}://{parsed.netloc}"
+        host = self._hosts.setdefault(key, _Host(self.per_host_concurrency))
+        async with host.ready:
+            if host.robots is None:
+                host.robots = robotparser.RobotFileParser(f"{key}/robots.txt")
+                try:
+                    async with session.get(f"{key}/robots.txt") as response:
+                        if response.status >= 500:
+                            # Server error: the rules are unknown, so nothing is fetched this run
+                            print(f"[WARN] robots.txt for {key} returned {response.status}, skipping host")
+                            host.robots.disallow_all = True
+                        elif response.status >= 400:
+                            # No robots.txt (a 4xx): everything is allowed
+                            host.robots.parse([])
+                        else:
+                            host.robots.parse((await response.text(errors="replace")).splitlines())
+                except Exception as e:
+                    print(f"[WARN] Could not read robots.txt for {key}, skipping host: {e}")
+                    host.robots.disallow_all = True
+                host.delay = float(host.robots.crawl_delay(self.user_agent) or 0)
+        return host
+
+    async def _get(self, session, url: str, headers: dict = None):
+        """
+        Polite GET: waits for a per-host slot and the crawl delay. Returns (status, headers, body bytes).
+        """
+        host = await self._host(session, url)
+        async with host.semaphore:
+            if host.delay:
+                async with host.pacing:
+                    wait = host.next_request - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    host.next_request = time.monotonic() + host.delay
+            async with session.get(url, headers=headers or {}) as response:
+                body = await response.read() if response.status == 200 else b""
+                return response.status, response.headers, body
+
+    async def _sitemap_urls(self, session, root: str) -> List[str]:
+        host = await self._host(session, root)
+        origin = "{0.scheme}://{0.netloc}".format(urlparse(root))
+        pending = list(host.robots.site_maps() or []) or [f"{origin}/sitemap.xml"]
+        seen, urls = set(), []
+        while pending and len(seen) < 50:
+            sitemap = pending.pop(0)
+            if sitemap in seen:
+                continue
+            seen.add(sitemap)
+            try:
+                status, _, body = await self._get(session, sitemap)
+            except Exception:
+                continue
+            if status != 200:
+                continue
+            if body[:2] == b"\x1f\x8b":
+                body = gzip.decompress(body)
+            text = body.decode("utf-8", errors="replace")
+            locs = [normalize_url(loc) for loc in _LOC.findall(text)]
+            if "<sitemapindex" in text:
+                pending.extend(locs)
+            else:
+                urls.extend(loc for loc in locs if self._in_scope(root, loc))
+        return list(dict.fromkeys(urls))
+
+    async def _fetch(self, session, url: str, depth: int) -> dict:
+        page = {"url": url, "depth": depth, "links": []}
+        host = await self._host(session, url)
+        if not host.robots.can_fetch(self.user_agent, url):
+            page["status"] = "disallowed"
+            return page
+
+        known = self.state.get(url) if self.state else None
+        headers = {}
+        if known and known.get("etag"):
+            headers["If-None-Match"] = known["etag"]
+        if known and known.get("last_modified"):
+            headers["If-Modified-Since"] = known["last_modified"]
+
+        try:
+            status, response_headers, body = await self._get(session, url, headers)
+        except Exception as e:
+            page.update(status="error", error=str(e), links=known["links"] if known else [])
+            return page
+
+        if status == 304 and known:
+            page.update(known, url=url, status="unchanged")
+            return page
+        if status in (404, 410):
+            page["status"] = "gone"
+            return page
+        if status != 200:
+            # Keep following the last known links so the pages behind this one still count as reached
+            page.update(status="error", error=f"HTTP {status}", links=known["links"] if known else [])
+            return page
+        if "html" not in response_headers.get("Content-Type", "text/html").lower():
+            page["status"] = "skipped"
+            return page
+
+        page["etag"] = response_headers.get("ETag")
+        page["last_modified"] = response_headers.get("Last-Modified")
+        page["content_hash"] = hashlib.sha256(body).hexdigest()
+        if known and known.get("content_hash") == page["content_hash"]:
+            # Server ignored the validators but the bytes are identical
+            page.update(status="unchanged", links=known["links"])
+            return page
+
+        charset = response_headers.get("Content-Type", "").partition("charset=")[2].split(";")[0].strip() or "utf-8"
+        html = body.decode(charset, errors="replace")
+        if parse_workers() > 1:
+            # HTML-to-text is CPU-bound: keep it off the event loop
+            document, links = await asyncio.get_running_loop().run_in_executor(get_process_pool(), parse_page, url, html)
+        else:
+            document, links = parse_page(url, html)
+        page.update(status="changed" if known else "new", document=document, links=links)
+        return page
+
+    async def crawl(self, root: str) -> dict:
+        """
+        Crawls from `root` and returns {"pages": [...], "truncated": bool}.
+        Each page has a status: new, changed, unchanged, gone, disallowed, skipped or error.
+        `truncated` is set when max_pages or max_depth left in-scope links unvisited.
+        """
+        import aiohttp
+        root = normalize_url(root)
+        # Semaphores and locks belong to the running event loop
+        self._hosts = {}
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host_concurrency)
+        pages = []
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector,
+                                         headers={"User-Agent": self.user_agent}) as session:
+            frontier = [root]
+            if self.use_sitemap:
+                frontier += await self._sitemap_urls(session, root)
+            frontier = list(dict.fromkeys(frontier))
+            seen = set()
+            truncated = False
+            for depth in range(self.max_depth + 1):
+                batch = []
+                for url in frontier:
+                    if url in seen:
+                        continue
+                    if len(seen) >= self.max_pages:
+                        truncated = True
+                        break
+                    seen.add(url)
+                    batch.append(url)
+                if not batch:
+                    break
+                results = await asyncio.gather(*(self._fetch(session, url, depth) for url in batch))
+                pages.extend(results)
+                frontier = [link for page in results for link in page.get("links", [])
+                            if link not in seen and self._in_scope(root, link)]
+            else:
+                truncated = truncated or bool(frontier)
+        return {"pages": pages, "truncated": truncated}
+
+def crawl_ingest(root: str, source_type: str = "web", state: CrawlState = None, **crawler_kwargs) -> dict:
+    """
+    Crawls a site and syncs it into the store, one source per page URL. New
+    and changed pages are split, embedded and written; unchanged pages cost
+    one conditional request; pages that return 404/410 have their chunks
+    removed. Pages no longer linked from the site are removed only after a
+    complete crawl whose root fetch succeeded; pages that failed to fetch
+    keep their chunks. Pages that fail to ingest are not recorded, so the
+    next crawl fetches them in full.
+    """
+    from data_pipeline.bulk import ingest_documents, remove_sources
+
+    state = state or CrawlState(settings.CRAWL_STATE_PATH)
+    root = normalize_url(root)
+    started = time.perf_counter()
+    result = asyncio.run(Crawler(state=state, **crawler_kwargs).crawl(root))
+    pages = result["pages"]
+
+    counts = {}
+    for page in pages:
+        counts[page["status"]] = counts.get(page["status"], 0) + 1
+    print(f"[INFO] Crawled {len(pages)} page(s) from '{root}' in {time.perf_counter() - started:.1f}s: {counts}")
+    for page in pages:
+        if page["status"] == "error":
+            print(f"[WARN] {page['url']}: {page['error']}")
+
+    changed = [page for page in pages if page["status"] in ("new", "changed")]
+    gone = [page["url"] for page in pages if page["status"] == "gone"]
+    root_page = next((page for page in pages if page["url"] == root), None)
+    if not result["truncated"] and root_page and root_page["status"] in ("new", "changed", "unchanged"):
+        # Errored pages were reached (their known links were followed); only disallowed ones are dropped
+        reached = {page["url"] for page in pages if page["status"] != "disallowed"}
+        gone += sorted(state.urls(root) - reached)
+
+    stats = {"pages": len(pages), **counts, "added": 0, "unchanged_chunks": 0, "removed": 0, "failed": 0}
+    failed = set()
+    if changed:
+        loaded = [({"type": source_type, "url": page["url"], "source": page["url"]}, [page["document"]]) for page in changed]
+        written = ingest_documents(loaded)
+        failed = {failure["source"] for failure in written["failed_sources"]}
+        stats.update(added=written["added"], unchanged_chunks=written["unchanged"], removed=written["removed"],
+                     failed=written["failed"])
+    if gone:
+        stats["removed"] += remove_sources(gone, source_type)
+
+    # Record validators only after the pages are in the store
+    for page in pages:
+        if page["status"] in ("new", "changed", "unchanged") and page["url"] not in failed:
+            state.put(root, page)
+    state.delete(gone)
+    print(f"[SUCCESS] Crawl synced: {len(changed)} page(s) updated, {len(gone)} removed. "
+          f"Chunks: {stats['added']} added, {stats['removed']} removed.")
+    return stats
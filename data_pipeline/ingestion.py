@@ -1,81 +1,169 @@
 import argparse
+import hashlib
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 try:
     from langchain_text_splitters import RecursiveCharacterTextSplitter
 except ImportError:
     from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_mongodb import MongoDBAtlasVectorSearch
-from pymongo import MongoClient
-import certifi
 
 # Adjust path so we can import config/database modules relative to root
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from config import settings
 from database.mongo import mongo_handler
-from data_pipeline.loaders import get_loader
+from config import resources
+from data_pipeline.streaming import stream_ingest
 
-def ingest_data(source_type: str, url: str):
+def chunk_id(source: str, index: int, content_hash: str, part: str = None) -> str:
     """
-    Ingests data, splits it, tags it, and pushes to MongoDB Vector Search.
+    Deterministic document _id for a chunk, so re-ingesting a source is an upsert.
     """
-    print(f"[INFO] Starting ingestion for type='{source_type}' from '{url}'...")
+    key = f"{source}\x00{index}\x00{content_hash}" if part is None else f"{source}\x00{part}\x00{index}\x00{content_hash}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
 
-    # 1. Load Data
-    try:
-        loader = get_loader(source_type)
-        documents = loader.load(url)
-        print(f"[INFO] Loaded {len(documents)} document(s).")
-    except Exception as e:
-        print(f"[ERROR] Error loading data: {e}")
-        return
+def chunk_part(chunk):
+    """
+    The part of a source a chunk came from (its video, for playlists and channels), or None.
+    """
+    return chunk.metadata.get("video_id")
 
-    # 2. Split Text
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=settings.CHUNK_SIZE,
-        chunk_overlap=settings.CHUNK_OVERLAP
-    )
-    chunks = text_splitter.split_documents(documents)
-    print(f"[INFO] Split into {len(chunks)} chunks.")
+def tag_chunk(chunk, source_type: str, source: str, index: int) -> str:
+    """
+    Adds source, position and content hash metadata to a chunk and returns its id.
+    """
+    content_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+    chunk.metadata["source_type"] = source_type
+    # Ensure we have a valid source field
+    chunk.metadata["source"] = source
+    chunk.metadata["chunk_index"] = index
+    chunk.metadata["content_hash"] = content_hash
+    return chunk_id(source, index, content_hash, chunk_part(chunk))
 
-    # 3. Add Metadata
+def tag_chunks(chunks, source_type: str, source: str, counters: dict = None) -> List[str]:
+    """
+    Tags chunks in document order and returns their ids. Indexes restart for
+    each part of the source, so adding a video to a playlist leaves the ids of
+    the other videos alone. Pass the same `counters` when a source arrives in batches.
+    """
+    counters = {} if counters is None else counters
+    ids = []
     for chunk in chunks:
-        chunk.metadata["source_type"] = source_type
-        # Ensure we have a valid source field
-        chunk.metadata["source"] = url
-
-    # 4. Embed & Store
-    # Initialize Embeddings
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model=settings.EMBEDDING_MODEL,
-        google_api_key=settings.GOOGLE_API_KEY
-    )
+        part = chunk_part(chunk)
+        index = counters.get(part, 0)
+        counters[part] = index + 1
+        ids.append(tag_chunk(chunk, source_type, source, index))
+    return ids
 
-    # Initialize Vector Store
-    # We reuse the mongo_handler connection details
-    vector_store = MongoDBAtlasVectorSearch(
-        collection=mongo_handler.get_collection(),
-        embedding=embeddings,
-        index_name=settings.INDEX_NAME,
-        relevance_score_fn=settings.VECTOR_SEARCH_METRIC
+def get_text_splitter(chunk_size: int = None, chunk_overlap: int = None):
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size or settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap
     )
 
+def get_embeddings():
+    # Shared, cached client from the resource registry, so re-ingesting unchanged text is free
+    return resources.get_embeddings()
+
+def prepare_chunks(documents, source_type: str, source: str, chunks=None):
+    """
+    Splits documents, tags each chunk with its source, and returns (chunks, ids).
+    Pass `chunks` when the documents were already split (e.g. in the process pool).
+    """
+    if chunks is None:
+        chunks = get_text_splitter().split_documents(documents)
+    return chunks, tag_chunks(chunks, source_type, source)
+
+def embed_chunks(embeddings, chunks, batch_size: int = None, concurrency: int = None) -> List[List[float]]:
+    """
+    Embeds chunk texts in fixed-size batches, running up to `concurrency`
+    batches at once. Vectors are returned in chunk order.
+    """
+    batch_size = batch_size or settings.EMBED_BATCH_SIZE
+    concurrency = concurrency or settings.EMBED_CONCURRENCY
+    texts = [chunk.page_content for chunk in chunks]
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if len(batches) <= 1 or concurrency <= 1:
+        return [vector for batch in batches for vector in embeddings.embed_documents(batch)]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = pool.map(embeddings.embed_documents, batches)
+        return [vector for batch in results for vector in batch]
+
+def to_mongo_documents(chunks, ids, vectors) -> List[dict]:
+    """
+    Builds documents in the layout MongoDBAtlasVectorSearch reads back:
+    the text and embedding alongside flattened metadata.
+    """
+    return [
+        {"_id": cid, "text": chunk.page_content, "embedding": vector, **chunk.metadata}
+        for chunk, cid, vector in zip(chunks, ids, vectors)
+    ]
+
+def ingest_data(source_type: str, url: str, source: str = None):
+    """
+    Ingests data, splits it, tags it, and pushes to MongoDB Vector Search.
+
+    Runs as a streaming pipeline (see data_pipeline.streaming), so large files
+    are processed in constant memory. Re-ingesting a source only embeds and
+    writes chunks that are new or changed, and removes chunks that no longer
+    exist. `source` overrides the identity stored on the chunks (e.g. the
+    original filename of an uploaded temp file).
+    Returns counts of added, unchanged and removed chunks.
+    """
+    print(f"[INFO] Starting ingestion for type='{source_type}' from '{url}'...")
+    embeddings = get_embeddings()
+
     try:
-        vector_store.add_documents(chunks)
-        print("[SUCCESS] Data successfully ingested into MongoDB!")
+        stats = stream_ingest(source_type, url, source=source, embeddings=embeddings)
     except Exception as e:
-        print(f"[ERROR] Error storing chunks: {e}")
+        print(f"[ERROR] Ingestion failed: {e}")
+        return {"added": 0, "unchanged": 0, "removed": 0}
+
+    print(f"[INFO] Loaded {stats['pages']} document(s), split into {stats['chunks']} chunks.")
+    print("[SUCCESS] Data successfully ingested into MongoDB!")
+    print(f"[INFO] Chunks: {stats['added']} added, {stats['unchanged']} unchanged, {stats['removed']} removed.")
+    if hasattr(embeddings, "cache"):
+        print(f"[INFO] Embedding cache: {embeddings.cache.stats()}")
+    return stats
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Nexus AI Data Ingestion CLI")
-    parser.add_argument("--type", required=True, choices=["resume", "video", "web"], help="Type of data source")
-    parser.add_argument("--url", required=True, help="URL or File Path")
+    parser.add_argument("--type", choices=["resume", "video", "web"], help="Type of data source")
+    parser.add_argument("--url", help="URL or File Path")
+    parser.add_argument("--source", help="Stable source name stored on chunks (defaults to --url)")
+    parser.add_argument("--manifest", help="JSONL or CSV file listing sources (columns: type, url, source)")
+    parser.add_argument("--crawl", action="store_true", help="With --type web: crawl the site from --url and sync changed pages")
+    parser.add_argument("--max-depth", type=int, default=settings.CRAWL_MAX_DEPTH, help="Crawl: link hops followed from --url")
+    parser.add_argument("--max-pages", type=int, default=settings.CRAWL_MAX_PAGES, help="Crawl: pages fetched per run")
+    parser.add_argument("--no-sitemap", action="store_true", help="Crawl: only follow links, ignore sitemap.xml")
+    parser.add_argument("--load-concurrency", type=int, default=settings.INGEST_LOAD_CONCURRENCY, help="Sources fetched in parallel")
+    parser.add_argument("--embed-batch-size", type=int, default=settings.EMBED_BATCH_SIZE, help="Texts per embedding request")
+    parser.add_argument("--embed-concurrency", type=int, default=settings.EMBED_CONCURRENCY, help="Embedding requests in flight")
+    parser.add_argument("--write-batch-size", type=int, default=settings.MONGO_WRITE_BATCH_SIZE, help="Documents per bulk write")
 
     args = parser.parse_args()
-    
+    if not args.manifest and not (args.type and args.url):
+        parser.error("either --manifest or both --type and --url are required")
+    if args.crawl and args.type != "web":
+        parser.error("--crawl requires --type web")
+
     # Ensure Mongo Index is ready (prints schema if not)
-    mongo_handler.init_search_index()
+    if settings.VECTOR_STORE_BACKEND != "local":
+        mongo_handler.init_search_index()
 
-    ingest_data(args.type, args.url)
+    if args.manifest:
+        from data_pipeline.bulk import ingest_manifest
+        ingest_manifest(
+            args.manifest,
+            load_concurrency=args.load_concurrency,
+            embed_batch_size=args.embed_batch_size,
+            embed_concurrency=args.embed_concurrency,
+            write_batch_size=args.write_batch_size
+        )
+    elif args.crawl:
+        from data_pipeline.crawler import crawl_ingest
+        crawl_ingest(args.url, max_depth=args.max_depth, max_pages=args.max_pages, use_sitemap=not args.no_sitemap)
+    else:
+        ingest_data(args.type, args.url, source=args.source)
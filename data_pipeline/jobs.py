@@ -0,0 +1,145 @@
+import itertools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import settings
+from data_pipeline.ingestion import get_embeddings
+from data_pipeline.streaming import stream_ingest, IngestCancelled
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class IngestJob:
+    """
+    One ingestion request and its live progress, as shown in the UI.
+    """
+    def __init__(self, job_id: int, source_type: str, url: str, source: str = None, cleanup_path: str = None):
+        self.id = job_id
+        self.source_type = source_type
+        self.url = url
+        self.source = source or url
+        self.cleanup_path = cleanup_path
+        self.status = QUEUED
+        self.progress = {}
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (COMPLETED, FAILED, CANCELLED)
+
+    @property
+    def elapsed(self) -> float:
+        if not self.started_at:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+class IngestJobManager:
+    """
+    Runs ingestion jobs on a thread pool inside the current process, reusing
+    one embeddings client and the shared Mongo handler across jobs.
+    """
+    def __init__(self, max_workers: int = None, embeddings=None):
+        self.max_workers = max_workers or settings.INGEST_MAX_JOBS
+        self.embeddings = embeddings or get_embeddings()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest")
+        self._jobs: Dict[int, IngestJob] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        Registers `callback(job)` to be called when a job completes successfully.
+        """
+        self._listeners.append(callback)
+
+    def submit(self, source_type: str, url: str, source: str = None, cleanup_path: str = None) -> IngestJob:
+        """
+        Queues an ingestion job. `cleanup_path` is deleted once the job finishes
+        (used for uploaded temp files).
+        """
+        with self._lock:
+            job = IngestJob(next(self._ids), source_type, url, source=source, cleanup_path=cleanup_path)
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job)
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        job.cancel_event.set()
+        return True
+
+    def get(self, job_id: int) -> IngestJob:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[IngestJob]:
+        """Returns all jobs, newest first."""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.id, reverse=True)
+
+    def clear_finished(self):
+        with self._lock:
+            self._jobs = {job_id: job for job_id, job in self._jobs.items() if not job.done}
+
+    def _run(self, job: IngestJob):
+        if job.cancel_event.is_set():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            self._cleanup(job)
+            return
+
+        job.status = RUNNING
+        job.started_at = time.time()
+
+        def on_progress(progress):
+            job.progress = progress
+
+        try:
+            job.progress = stream_ingest(
+                job.source_type, job.url, source=job.source, embeddings=self.embeddings,
+                on_progress=on_progress, cancel_event=job.cancel_event
+            )
+            job.status = COMPLETED
+        except IngestCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            self._cleanup(job)
+
+        if job.status == COMPLETED:
+            for callback in self._listeners:
+                try:
+                    callback(job)
+                except Exception as e:
+                    print(f"[WARN] Ingest job listener failed: {e}")
+
+    @staticmethod
+    def _cleanup(job: IngestJob):
+        if job.cleanup_path and os.path.exists(job.cleanup_path):
+            try:
+                os.unlink(job.cleanup_path)
+            except OSError:
+                pass # Ignore cleanup errors
+
+    def shutdown(self):
+        for job in self._jobs.values():
+            job.cancel_event.set()
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,179 @@
+import multiprocessing
+import os
+import sys
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.documents import Document
+
+from config import settings
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def parse_workers() -> int:
+    """
+    Worker processes used for parsing and splitting (PARSE_WORKERS, 0 = one per core).
+    """
+    return settings.PARSE_WORKERS or os.cpu_count() or 1
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Process pool shared by every ingestion in this process, started on first use.
+    Workers are spawned rather than forked: the app process runs many threads.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=parse_workers(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+# Worker functions: run in the pool, so they only take and return picklable values
+
+def _split(documents: List[Document], chunk_size: int, chunk_overlap: int) -> List[List[Document]]:
+    from data_pipeline.ingestion import get_text_splitter
+    splitter = get_text_splitter(chunk_size, chunk_overlap)
+    return [splitter.split_documents([document]) for document in documents]
+
+# Per worker process: readers of recently parsed PDFs, so the page-range tasks
+# of one file do not each re-read it and rebuild its cross-reference table
+_readers = OrderedDict()
+_READER_CACHE_SIZE = 2
+
+def _pdf_reader(path: str):
+    """
+    Returns (PdfReader, page labels) for `path`, reused while the file is unchanged.
+    """
+    import pypdf
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _readers:
+        reader = pypdf.PdfReader(path)
+        # page_labels rebuilds the whole list on every access
+        _readers[key] = (reader, reader.page_labels)
+        while len(_readers) > _READER_CACHE_SIZE:
+            _readers.popitem(last=False)
+    _readers.move_to_end(key)
+    return _readers[key]
+
+def _pdf_pages(path: str, start: int, stop: int) -> List[Document]:
+    reader, labels = _pdf_reader(path)
+    pages = []
+    for number in range(start, stop):
+        text = reader.pages[number].extract_text(extraction_mode="plain").strip()
+        pages.append(Document(page_content=text, metadata={
+            "source": path, "total_pages": len(reader.pages), "page": number, "page_label": labels[number],
+        }))
+    return pages
+
+def _parse_and_split_pdf(path: str, start: int, stop: int, chunk_size: int, chunk_overlap: int) -> List[List[Document]]:
+    return _split(_pdf_pages(path, start, stop), chunk_size, chunk_overlap)
+
+def _ordered(tasks: Iterator, cancel: threading.Event = None) -> Iterator:
+    """
+    Submits (func, *args) tasks with at most two per worker in flight and
+    yields their results in submission order. Pending tasks are cancelled if
+    the consumer stops early.
+    """
+    pool = get_process_pool()
+    workers = parse_workers()
+    in_flight = deque()
+    try:
+        for func, *args in tasks:
+            in_flight.append(pool.submit(func, *args))
+            while len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+                if cancel is not None and cancel.is_set():
+                    return
+        while in_flight:
+            yield in_flight.popleft().result()
+            if cancel is not None and cancel.is_set():
+                return
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+def pdf_page_count(path: str) -> int:
+    import pypdf
+    return len(pypdf.PdfReader(path).pages)
+
+def use_process_pool(source_type: str, url: str, loader=None) -> bool:
+    """
+    True when a source is worth the process pool: a local PDF of at least
+    PARSE_MIN_PDF_PAGES pages. Anything smaller parses faster in-process than
+    it takes to spawn the workers and import the parsers in each of them.
+    """
+    from data_pipeline.loaders import PDFFileLoader, get_loader
+    if parse_workers() <= 1 or not isinstance(loader or get_loader(source_type), PDFFileLoader) or not os.path.isfile(url):
+        return False
+    return pdf_page_count(url) >= settings.PARSE_MIN_PDF_PAGES
+
+def parse_and_split(source_type: str, url: str, loader=None, pages_per_task: int = None,
+                    cancel: threading.Event = None) -> Iterator[List[Document]]:
+    """
+    Yields the chunks of each page, in document order, with the CPU work done
+    in the process pool. Local PDFs are parsed there too, in page ranges;
+    other sources are loaded here (mostly I/O) and only split in the pool.
+    """
+    from data_pipeline.loaders import PDFFileLoader, get_loader
+    pages_per_task = pages_per_task or settings.PARSE_PAGES_PER_TASK
+    loader = loader or get_loader(source_type)
+    sizes = (settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+
+    if isinstance(loader, PDFFileLoader) and os.path.isfile(url):
+        total = pdf_page_count(url)
+        tasks = ((_parse_and_split_pdf, url, start, min(start + pages_per_task, total), *sizes)
+                 for start in range(0, total, pages_per_task))
+    else:
+        def batches():
+            batch = []
+            for page in loader.lazy_load(url):
+                batch.append(page)
+                if len(batch) >= pages_per_task:
+                    yield (_split, batch, *sizes)
+                    batch = []
+            if batch:
+                yield (_split, batch, *sizes)
+        tasks = batches()
+
+    for per_page in _ordered(tasks, cancel):
+        yield from per_page
+
+def load_pdf(path: str, pages_per_task: int = None) -> List[Document]:
+    """
+    Extracts every page of a local PDF across the process pool, in page order.
+    """
+    pages_per_task = pages_per_task or settings.PARSE_PAGES_PER_TASK
+    total = pdf_page_count(path)
+    tasks = ((_pdf_pages, path, start, min(start + pages_per_task, total)) for start in range(0, total, pages_per_task))
+    return [page for pages in _ordered(tasks) for page in pages]
+
+def split_each(documents: List[Document], docs_per_task: int = None) -> List[List[Document]]:
+    """
+    Splits every document across the process pool and returns its chunks, one list per document, in order.
+    """
+    if parse_workers() <= 1 or len(documents) <= 1:
+        from data_pipeline.ingestion import get_text_splitter
+        splitter = get_text_splitter()
+        return [splitter.split_documents([document]) for document in documents]
+    docs_per_task = docs_per_task or settings.PARSE_PAGES_PER_TASK
+    sizes = (settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+    tasks = ((_split, documents[i:i + docs_per_task], *sizes) for i in range(0, len(documents), docs_per_task))
+    return [chunks for per_doc in _ordered(tasks) for chunks in per_doc]
+
+def split_documents(documents: List[Document], docs_per_task: int = None) -> List[Document]:
+    """
+    Parallel RecursiveCharacterTextSplitter.split_documents: same chunks, same order.
+    """
+    return [chunk for chunks in split_each(documents, docs_per_task) for chunk in chunks]
@@ -0,0 +1,209 @@
+import os
+import queue
+import sys
+import threading
+from typing import Iterator
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import settings
+from database.vector_store import get_chunk_store, get_lexical_index, notify_ingested
+from data_pipeline.loaders import get_loader
+from data_pipeline.parallel import parse_and_split, use_process_pool
+
+_DONE = object()
+
+class IngestCancelled(Exception):
+    """Raised by stream_ingest when its cancel event is set mid-run."""
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """
+    Blocking put that gives up once the pipeline is stopping. Returns False if it gave up.
+    """
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _drain(q: queue.Queue, stop: threading.Event) -> Iterator:
+    """
+    Yields items from `q` until the upstream stage signals completion or the pipeline stops.
+    """
+    while not stop.is_set():
+        try:
+            item = q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        yield item
+
+def stream_ingest(source_type: str, url: str, source: str = None, embeddings=None,
+                  queue_size: int = None, embed_batch_size: int = None, write_batch_size: int = None,
+                  embed_concurrency: int = None, on_progress=None, cancel_event: threading.Event = None, loader=None,
+                  save_lexical: bool = True) -> dict:
+    """
+    Ingests one source as a pipeline of threads joined by bounded queues:
+    loader yields pages -> splitter yields chunks -> embedder works on
+    micro-batches -> writer flushes bulk upserts. Memory stays flat regardless
+    of input size and chunks become queryable while the file is still parsing.
+    Large local PDFs are parsed and split in the process pool (see
+    use_process_pool), leaving this process to embed and write.
+
+    Chunks already stored with the same id are skipped; chunks of this source
+    that were not seen are deleted once the whole source has been read. A
+    load that yields no documents at all leaves the stored chunks alone.
+
+    `on_progress` is called with a snapshot of the counters as chunks are
+    embedded and written. Setting `cancel_event` stops every stage and raises
+    IngestCancelled; chunks written so far are kept and nothing is pruned.
+    `loader` replaces the DocumentLoader picked for `source_type` (e.g. synthetic benchmark corpora).
+    `save_lexical=False` leaves saving the BM25 index to the caller, which
+    bulk runs do once at the end instead of rewriting it after every source.
+    """
+    # Imported here to avoid a cycle: ingestion.ingest_data delegates to this module
+    from data_pipeline.ingestion import get_text_splitter, get_embeddings, tag_chunks, embed_chunks, to_mongo_documents
+
+    source = source or url
+    queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+    embed_batch_size = embed_batch_size or settings.EMBED_BATCH_SIZE
+    write_batch_size = write_batch_size or settings.MONGO_WRITE_BATCH_SIZE
+    embed_concurrency = embed_concurrency or settings.EMBED_CONCURRENCY
+    embeddings = embeddings or get_embeddings()
+
+    store = get_chunk_store()
+    lexical = get_lexical_index()
+    stats = {"pages": 0, "chunks": 0, "embedded": 0, "added": 0, "unchanged": 0, "removed": 0}
+    existing_ids = store.get_chunk_ids(source)
+    seen_ids = set()
+
+    # Cancelling the run is just stopping the pipeline from outside
+    stop = cancel_event or threading.Event()
+    errors = []
+
+    def report():
+        if on_progress:
+            on_progress(dict(stats))
+
+    pages_q = queue.Queue(maxsize=queue_size)
+    chunks_q = queue.Queue(maxsize=queue_size)
+    docs_q = queue.Queue(maxsize=queue_size)
+
+    # Large PDFs are parsed and split in the process pool and arrive here as chunk lists
+    parallel = use_process_pool(source_type, url, loader)
+
+    def load_stage():
+        if parallel:
+            pages = parse_and_split(source_type, url, loader=loader, cancel=stop)
+        else:
+            pages = (loader or get_loader(source_type)).lazy_load(url)
+        for page in pages:
+            stats["pages"] += 1
+            if not _put(pages_q, page, stop):
+                return
+
+    def split_stage():
+        splitter = get_text_splitter()
+        counters = {}
+        for page in _drain(pages_q, stop):
+            chunks = page if parallel else splitter.split_documents([page])
+            ids = tag_chunks(chunks, source_type, source, counters)
+            stats["chunks"] += len(chunks)
+            # Unchanged chunks are indexed too, so sources stored before the lexical index existed get covered
+            if lexical is not None:
+                lexical.add_chunks({"_id": cid, "text": chunk.page_content, "source_type": source_type}
+                                   for chunk, cid in zip(chunks, ids) if cid in existing_ids)
+            for chunk, cid in zip(chunks, ids):
+                seen_ids.add(cid)
+                if cid in existing_ids:
+                    stats["unchanged"] += 1
+                elif not _put(chunks_q, (chunk, cid), stop):
+                    return
+
+    def embed_stage():
+        # Flush enough texts to keep every concurrent embedding request full
+        flush_size = embed_batch_size * embed_concurrency
+        pending = []
+
+        def flush():
+            chunks = [chunk for chunk, _ in pending]
+            ids = [cid for _, cid in pending]
+            vectors = embed_chunks(embeddings, chunks, batch_size=embed_batch_size, concurrency=embed_concurrency)
+            pending.clear()
+            stats["embedded"] += len(vectors)
+            report()
+            return _put(docs_q, to_mongo_documents(chunks, ids, vectors), stop)
+
+        for item in _drain(chunks_q, stop):
+            pending.append(item)
+            if len(pending) >= flush_size and not flush():
+                return
+        if pending and not stop.is_set():
+            flush()
+
+    def run_stage(stage, downstream: queue.Queue):
+        try:
+            stage()
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(downstream, _DONE, stop)
+
+    threads = [
+        threading.Thread(target=run_stage, args=(load_stage, pages_q), daemon=True),
+        threading.Thread(target=run_stage, args=(split_stage, chunks_q), daemon=True),
+        threading.Thread(target=run_stage, args=(embed_stage, docs_q), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    def write(batch):
+        stats["added"] += store.upsert_chunks(batch, batch_size=write_batch_size)
+        # New chunks become keyword-searchable only once they are stored, so a failed
+        # or cancelled run never leaves the lexical index pointing at missing ids
+        if lexical is not None:
+            lexical.add_chunks(batch)
+
+    # Writer runs on the calling thread
+    try:
+        batch = []
+        for docs in _drain(docs_q, stop):
+            batch.extend(docs)
+            # Flush when the batch is full or nothing else is ready, so data lands early
+            if len(batch) >= write_batch_size or docs_q.empty():
+                write(batch)
+                batch = []
+                report()
+        if batch and not stop.is_set():
+            write(batch)
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    if cancel_event is not None and cancel_event.is_set():
+        raise IngestCancelled(f"Ingestion of '{source}' was cancelled")
+    if not stats["pages"]:
+        # More likely a broken or throttled loader than a source that became empty
+        print(f"[WARN] '{url}' loaded no documents; keeping the {len(existing_ids)} stored chunk(s) of '{source}'.")
+        report()
+        return stats
+
+    # Only prune once the full source was read, otherwise a partial run would delete live chunks
+    stale_ids = existing_ids - seen_ids
+    if stale_ids:
+        stats["removed"] = store.delete_chunks(stale_ids)
+        if lexical is not None:
+            lexical.delete_chunks(stale_ids)
+    if lexical is not None and save_lexical:
+        lexical.save()
+    notify_ingested(source_type)
+    report()
+    return stats
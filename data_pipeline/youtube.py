@@ -0,0 +1,311 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from langchain_core.documents import Document
+
+from config import settings
+
+_VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_VTT_TIME = re.compile(r"(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})\s+-->\s+(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})")
+_TAG = re.compile(r"<[^>]+>")
+_CHANNEL_ROOT = re.compile(r"^/(@[^/]+|(channel|c|user)/[^/]+)/?$", re.IGNORECASE)
+
+class NoSubtitlesError(Exception):
+    """The video has no subtitles (manual or auto-generated) in the requested language."""
+
+def video_id(url: str) -> Optional[str]:
+    """
+    Extracts the 11-character video id from watch, youtu.be, shorts, embed and live URLs.
+    """
+    if _VIDEO_ID.match(url):
+        return url
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    if host.endswith("youtu.be"):
+        candidate = parsed.path.strip("/").split("/")[0]
+    elif "youtube" in host:
+        candidate = parse_qs(parsed.query).get("v", [""])[0]
+        parts = parsed.path.strip("/").split("/")
+        if not candidate and len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+            candidate = parts[1]
+    else:
+        return None
+    return candidate if _VIDEO_ID.match(candidate or "") else None
+
+def watch_url(vid: str, start: float = None) -> str:
+    url = f"https://www.youtube.com/watch?v={vid}"
+    return f"{url}&t={int(start)}s" if start is not None else url
+
+def is_collection_url(url: str) -> bool:
+    """
+    True for playlist and channel URLs, which expand to many videos.
+    """
+    parsed = urlparse(url)
+    path = parsed.path.lower()
+    if "list" in parse_qs(parsed.query) and not parse_qs(parsed.query).get("v"):
+        return True
+    return path.startswith(("/playlist", "/@", "/channel/", "/c/", "/user/"))
+
+class TranscriptCache:
+    """
+    SQLite store of parsed transcripts keyed by (video id, language). Segments
+    are kept as compressed JSON with their start times, so re-ingesting a
+    video never downloads its transcript again.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            "video_id TEXT NOT NULL, lang TEXT NOT NULL, info TEXT NOT NULL, segments BLOB NOT NULL, "
+            "fetched_at REAL NOT NULL, PRIMARY KEY (video_id, lang))"
+        )
+        self._conn.commit()
+
+    def get(self, vid: str, lang: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT info, segments FROM transcripts WHERE video_id = ? AND lang = ?", (vid, lang)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return dict(json.loads(row[0]), segments=json.loads(zlib.decompress(row[1])))
+
+    def put(self, vid: str, lang: str, transcript: dict):
+        info = {key: value for key, value in transcript.items() if key != "segments"}
+        blob = zlib.compress(json.dumps(transcript["segments"], separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts (video_id, lang, info, segments, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (vid, lang, json.dumps(info), blob, time.time())
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+        return {"transcripts": count, "hits": self.hits, "misses": self.misses}
+
+_cache = None
+_session = None
+_init_lock = threading.Lock()
+
+def get_transcript_cache() -> TranscriptCache:
+    global _cache
+    with _init_lock:
+        if _cache is None:
+            _cache = TranscriptCache(settings.TRANSCRIPT_CACHE_PATH)
+        return _cache
+
+def get_session():
+    """
+    Process-wide requests session with a connection pool sized for concurrent fetches and retries on 429/5xx.
+    """
+    global _session
+    with _init_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.YOUTUBE_FETCH_CONCURRENCY, max_retries=retry)
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def channel_videos_url(url: str) -> str:
+    """
+    A bare channel URL lists its tabs; the uploads live under /videos. Tab and other URLs are returned as is.
+    """
+    parsed = urlparse(url)
+    if not _CHANNEL_ROOT.match(parsed.path):
+        return url
+    return parsed._replace(path=parsed.path.rstrip("/") + "/videos").geturl()
+
+def expand_url(url: str) -> List[str]:
+    """
+    Returns the watch URLs behind a playlist or channel URL (a single video URL is returned as is).
+    """
+    if not is_collection_url(url):
+        return [url]
+    import yt_dlp
+    url = channel_videos_url(url)
+    ydl_opts = {"extract_flat": "in_playlist", "skip_download": True, "quiet": True, "no_warnings": True}
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    urls = []
+    for entry in info.get("entries") or []:
+        vid = entry.get("id") if entry else None
+        if vid and _VIDEO_ID.match(vid):
+            urls.append(watch_url(vid))
+    print(f"[INFO] Expanded '{url}' to {len(urls)} video(s).")
+    return list(dict.fromkeys(urls))
+
+def parse_json3(data: dict) -> List[dict]:
+    segments = []
+    for event in data.get("events", []):
+        text = "".join(seg.get("utf8", "") for seg in event.get("segs", []) or []).replace("\n", " ").strip()
+        if text:
+            segments.append({"start": event.get("tStartMs", 0) / 1000,
+                             "duration": event.get("dDurationMs", 0) / 1000, "text": text})
+    return segments
+
+def parse_vtt(text: str) -> List[dict]:
+    segments = []
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        match = _VTT_TIME.search(line)
+        if not match:
+            continue
+        h1, m1, s1, ms1, h2, m2, s2, ms2 = (int(g or 0) for g in match.groups())
+        start = h1 * 3600 + m1 * 60 + s1 + ms1 / 1000
+        end = h2 * 3600 + m2 * 60 + s2 + ms2 / 1000
+        body = []
+        for follow in lines[i + 1:]:
+            if not follow.strip():
+                break
+            body.append(_TAG.sub("", follow).strip())
+        text_line = " ".join(part for part in body if part)
+        # Auto-captions repeat the previous line as the next cue rolls in
+        if text_line and (not segments or segments[-1]["text"] != text_line):
+            segments.append({"start": start, "duration": end - start, "text": text_line})
+    return segments
+
+def _pick_track(info: dict, lang: str):
+    for tracks in (info.get("subtitles") or {}, info.get("automatic_captions") or {}):
+        formats = tracks.get(lang)
+        if formats:
+            # Prefer JSON3, which carries per-event timings
+            return next((f for f in formats if f.get("ext") == "json3"), formats[0])
+    return None
+
+def fetch_transcript(url: str, lang: str = None) -> dict:
+    """
+    Returns {"video_id", "title", "author", "segments": [{start, duration, text}]}
+    from the cache, or via yt-dlp metadata and one pooled HTTP request.
+    """
+    lang = lang or settings.YOUTUBE_LANGUAGE
+    vid = video_id(url)
+    cache = get_transcript_cache()
+    if vid:
+        cached = cache.get(vid, lang)
+        if cached is not None:
+            return cached
+
+    # yt-dlp (The Heavy Artillery): the most robust way around YouTube's anti-bot measures
+    import yt_dlp
+    ydl_opts = {
+        'skip_download': True,      # We only want metadata/subs
+        'writesubtitles': True,     # Download subtitles
+        'writeautomaticsub': True,  # Download auto-generated subs if needed
+        'subtitleslangs': [lang],
+        'quiet': True,
+        'no_warnings': True
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    vid = info.get("id") or vid
+
+    track = _pick_track(info, lang)
+    if not track:
+        raise NoSubtitlesError(f"No '{lang}' subtitles found (manual or auto-generated).")
+    response = get_session().get(track["url"], timeout=30)
+    response.raise_for_status()
+    try:
+        segments = parse_json3(response.json())
+    except ValueError:
+        # Fallback if VTT text
+        segments = parse_vtt(response.text)
+
+    transcript = {"video_id": vid, "title": info.get("title", "Unknown Title"),
+                  "author": info.get("uploader", "Unknown"), "segments": segments}
+    cache.put(vid, lang, transcript)
+    return transcript
+
+def transcript_documents(transcript: dict, chunk_size: int = None, overlap: int = None) -> List[Document]:
+    """
+    Groups consecutive segments into windows of at most `chunk_size`
+    characters (the splitter leaves them whole), carrying up to `overlap`
+    characters of trailing segments into the next window. Each window keeps
+    the start time of its first segment and a link to that moment.
+    """
+    chunk_size = chunk_size or settings.CHUNK_SIZE
+    overlap = overlap if overlap is not None else settings.CHUNK_OVERLAP
+    vid = transcript["video_id"]
+    base = {"title": transcript.get("title"), "author": transcript.get("author"), "video_id": vid}
+
+    documents, window, size = [], [], 0
+    def flush():
+        start = window[0]["start"]
+        last = window[-1]
+        documents.append(Document(
+            page_content=" ".join(seg["text"] for seg in window),
+            metadata=dict(base, start=round(start, 2), end=round(last["start"] + last["duration"], 2),
+                          timestamp_url=watch_url(vid, start)),
+        ))
+
+    for segment in transcript["segments"]:
+        length = len(segment["text"]) + 1
+        if window and size + length > chunk_size:
+            flush()
+            carried, carried_size = [], 0
+            for previous in reversed(window):
+                if carried_size + len(previous["text"]) + 1 > overlap:
+                    break
+                carried.insert(0, previous)
+                carried_size += len(previous["text"]) + 1
+            window, size = carried, carried_size
+        window.append(segment)
+        size += length
+    if window:
+        flush()
+    return documents
+
+def load_documents(url: str) -> Iterator[Document]:
+    """
+    Yields timestamped transcript windows for a video, playlist or channel URL.
+    Videos are fetched concurrently and yielded in playlist order. A video
+    without subtitles is reported and skipped. Any other failure (throttling,
+    network) is raised once the remaining videos have been yielded, so the
+    load counts as incomplete and the failed videos' stored chunks are not pruned.
+    """
+    urls = expand_url(url)
+    if len(urls) == 1:
+        yield from transcript_documents(fetch_transcript(urls[0]))
+        return
+
+    failed = []
+    def fetch(video_url: str):
+        try:
+            return fetch_transcript(video_url)
+        except NoSubtitlesError as e:
+            print(f"[WARN] Skipping '{video_url}': {e}")
+        except Exception as e:
+            print(f"[ERROR] Could not fetch '{video_url}': {e}")
+            failed.append((video_url, e))
+        return None
+
+    with ThreadPoolExecutor(max_workers=settings.YOUTUBE_FETCH_CONCURRENCY, thread_name_prefix="youtube") as pool:
+        for transcript in pool.map(fetch, urls):
+            if transcript is not None:
+                yield from transcript_documents(transcript)
+    print(f"[INFO] Transcript cache: {get_transcript_cache().stats()}")
+    if failed:
+        raise Exception(f"{len(failed)} of {len(urls)} videos could not be fetched "
+                        f"(first: '{failed[0][0]}': {failed[0][1]}); re-run to retry them.") from failed[0][1]
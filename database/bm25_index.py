@@ -0,0 +1,224 @@
+import argparse
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import sys
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import settings
+
+# Keeps tokens like "c++", "node.js", "e11000" and "snake_case" intact
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9_+#.\-]*[a-z0-9+#]|[a-z0-9]")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how i in is it its of on or that the their
+them they this to was were what when where which who why will with you your
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+class _LexicalPartition:
+    """
+    Inverted index for one source_type: term -> {row: term frequency}, plus
+    per-row document length. Deleted rows are tombstoned and dropped from
+    the postings on compaction.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.ids: List[str] = []
+        self.lengths: List[int] = []
+        self.live: List[bool] = []
+        self.row_of: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.total_length = 0
+        self.dirty = False
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        self.ids = data["ids"]
+        self.lengths = data["lengths"]
+        self.live = [True] * len(self.ids)
+        self.row_of = {cid: row for row, cid in enumerate(self.ids)}
+        # Stored as flat [row, tf, row, tf, ...] lists to keep the file small
+        self.postings = {term: dict(zip(flat[::2], flat[1::2])) for term, flat in data["postings"].items()}
+        self.total_length = sum(self.lengths)
+
+    def save(self):
+        if not self.dirty:
+            return
+        if len(self.row_of) < len(self.ids):
+            self.compact()
+        data = {
+            "ids": self.ids,
+            "lengths": self.lengths,
+            "postings": {term: [value for pair in rows.items() for value in pair]
+                         for term, rows in self.postings.items()},
+        }
+        tmp_path = self.path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            # json.dumps uses the C encoder; json.dump to a stream falls back to pure Python
+            f.write(json.dumps(data, separators=(",", ":")))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def add(self, cid: str, text: str):
+        if cid in self.row_of:
+            return
+        tokens = tokenize(text)
+        row = len(self.ids)
+        self.ids.append(cid)
+        self.lengths.append(len(tokens))
+        self.live.append(True)
+        self.row_of[cid] = row
+        self.total_length += len(tokens)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[row] = tf
+        self.dirty = True
+
+    def delete(self, cid: str) -> bool:
+        row = self.row_of.pop(cid, None)
+        if row is None:
+            return False
+        self.live[row] = False
+        self.total_length -= self.lengths[row]
+        self.dirty = True
+        return True
+
+    def compact(self):
+        keep = [row for row, alive in enumerate(self.live) if alive]
+        new_row = {old: new for new, old in enumerate(keep)}
+        postings = {}
+        for term, rows in self.postings.items():
+            kept = {new_row[row]: tf for row, tf in rows.items() if row in new_row}
+            if kept:
+                postings[term] = kept
+        self.postings = postings
+        self.ids = [self.ids[row] for row in keep]
+        self.lengths = [self.lengths[row] for row in keep]
+        self.live = [True] * len(keep)
+        self.row_of = {cid: row for row, cid in enumerate(self.ids)}
+
+    def search(self, query: str, k: int, k1: float, b: float) -> List[Tuple[str, float]]:
+        n_docs = len(self.row_of)
+        if n_docs == 0:
+            return []
+        avg_length = self.total_length / n_docs or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            rows = self.postings.get(term)
+            if not rows:
+                continue
+            df = len(rows)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for row, tf in rows.items():
+                if not self.live[row]:
+                    continue
+                norm = tf + k1 * (1 - b + b * self.lengths[row] / avg_length)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (k1 + 1) / norm
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.ids[row], score) for row, score in best]
+
+class BM25Index:
+    """
+    Okapi BM25 index partitioned by source_type. Each partition is a gzipped
+    JSON file under `directory`, loaded lazily on first use and updated
+    incrementally by ingestion.
+    """
+    def __init__(self, directory: str = None, k1: float = 1.5, b: float = 0.75):
+        self.directory = directory or settings.BM25_INDEX_DIR
+        self.k1 = k1
+        self.b = b
+        self._partitions: Dict[str, _LexicalPartition] = {}
+        self._lock = threading.RLock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def partition(self, source_type: str) -> _LexicalPartition:
+        with self._lock:
+            if source_type not in self._partitions:
+                path = os.path.join(self.directory, f"{source_type}.json.gz")
+                self._partitions[source_type] = _LexicalPartition(path)
+            return self._partitions[source_type]
+
+    def _partition_names(self) -> List[str]:
+        names = set(self._partitions)
+        names.update(name[:-len(".json.gz")] for name in os.listdir(self.directory) if name.endswith(".json.gz"))
+        return sorted(names)
+
+    def add_chunks(self, documents: Iterable[dict]):
+        """
+        Indexes chunk documents ({"_id", "text", "source_type", ...}); known ids are skipped.
+        """
+        with self._lock:
+            for doc in documents:
+                self.partition(doc.get("source_type", "default")).add(str(doc["_id"]), doc.get("text", ""))
+
+    def delete_chunks(self, ids) -> int:
+        ids = [str(cid) for cid in ids]
+        deleted = 0
+        with self._lock:
+            for name in self._partition_names():
+                part = self.partition(name)
+                deleted += sum(1 for cid in ids if part.delete(cid))
+        return deleted
+
+    def search(self, query: str, source_type: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Returns up to k (chunk id, BM25 score) pairs from one partition.
+        """
+        with self._lock:
+            return self.partition(source_type).search(query, k, self.k1, self.b)
+
+    def save(self):
+        with self._lock:
+            for part in self._partitions.values():
+                part.save()
+
+    def clear(self):
+        with self._lock:
+            for name in self._partition_names():
+                path = self.partition(name).path
+                if os.path.exists(path):
+                    os.unlink(path)
+            self._partitions = {}
+
+def rebuild_from_collection(index: BM25Index, collection) -> int:
+    """
+    Re-indexes every chunk stored in a Mongo collection.
+    """
+    index.clear()
+    count = 0
+    batch = []
+    for doc in collection.find({}, {"text": 1, "source_type": 1}):
+        batch.append(doc)
+        if len(batch) >= 1_000:
+            index.add_chunks(batch)
+            count += len(batch)
+            batch = []
+    index.add_chunks(batch)
+    count += len(batch)
+    index.save()
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nexus AI BM25 index maintenance")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the lexical index from the Mongo collection")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        from database.mongo import mongo_handler
+        total = rebuild_from_collection(BM25Index(), mongo_handler.get_collection())
+        print(f"[SUCCESS] Indexed {total} chunks into '{settings.BM25_INDEX_DIR}'.")
+    else:
+        parser.print_help()
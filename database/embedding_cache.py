@@ -0,0 +1,224 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form used for cache keys: NFC unicode and collapsed whitespace.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def make_key(model: str, kind: str, text: str) -> str:
+    """
+    Content address of an embedding. `kind` separates query and document
+    vectors, which Gemini embeds with different task types.
+    """
+    payload = f"{model}\x00{kind}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+class EmbeddingCache:
+    """
+    Two-tier embedding store: an in-memory LRU in front of a SQLite table of
+    packed float32 vectors. Both tiers hold float32 (4 bytes/dim); lists are
+    only built on the way out. The on-disk tier is capped at `max_entries` and
+    evicts least recently used rows.
+    """
+    def __init__(self, path: str, max_entries: int, memory_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        # Running row count, so eviction does not scan the table on every write
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def _unpack(blob: bytes) -> array:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector
+
+    def _remember(self, key: str, vector: array):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Returns the cached vectors for whichever of `keys` are present.
+        """
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            missing = []
+            for key in dict.fromkeys(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key].tolist()
+                else:
+                    missing.append(key)
+
+            if missing:
+                now = time.time()
+                # SQLite caps bound parameters, so look up in slices
+                for i in range(0, len(missing), 500):
+                    batch = missing[i:i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = self._unpack(blob)
+                        found[key] = vector.tolist()
+                        self._remember(key, vector)
+                    if rows:
+                        self._conn.executemany(
+                            "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                            [(now, key) for key, _ in rows]
+                        )
+                        self.disk_hits += len(rows)
+                self._conn.commit()
+
+            hit_count = sum(1 for key in keys if key in found)
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        now = time.time()
+        packed = {key: array("f", vector) for key, vector in items.items()}
+        with self._lock:
+            for key, vector in packed.items():
+                self._remember(key, vector)
+            rows = [(key, vector.tobytes(), now) for key, vector in packed.items()]
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            ).rowcount
+            if inserted < len(rows):
+                # Some keys were already stored (e.g. by another process): refresh them
+                self._conn.executemany(
+                    "UPDATE embeddings SET vector = ?, last_used = ? WHERE key = ?",
+                    [(blob, used, key) for key, blob, used in rows]
+                )
+            self._count += inserted
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        overflow = self._count - self.max_entries
+        if overflow <= 0:
+            return
+        deleted = self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (overflow,)
+        ).rowcount
+        self._count -= deleted
+        self.evictions += deleted
+        if deleted < overflow:
+            # Another process removed rows; resynchronize
+            self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._count
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+            "disk_entries": size,
+        }
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from an EmbeddingCache and
+    only forwards unseen texts to the underlying model, in a single call.
+    """
+    def __init__(self, underlying: Embeddings, cache: EmbeddingCache, model_name: str):
+        self.underlying = underlying
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [make_key(self.model_name, "document", text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        # Embed each distinct miss once, even if it repeats within the batch
+        pending: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in pending:
+                pending[key] = text
+
+        if pending:
+            vectors = self.underlying.embed_documents(list(pending.values()))
+            fresh = dict(zip(pending.keys(), vectors))
+            self.cache.put_many(fresh)
+            found.update(fresh)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = make_key(self.model_name, "query", text)
+        found = self.cache.get_many([key])
+        if key in found:
+            return found[key]
+        vector = self.underlying.embed_query(text)
+        self.cache.put_many({key: vector})
+        return vector
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Process-wide cache instance, shared by ingestion and retrieval.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(
+                settings.EMBEDDING_CACHE_PATH,
+                max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+                memory_entries=settings.EMBEDDING_CACHE_MEMORY_ENTRIES
+            )
+        return _cache
+
+def wrap_embeddings(embeddings: Embeddings, model_name: str = None) -> Embeddings:
+    """
+    Wraps `embeddings` with the shared cache unless caching is disabled.
+    """
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return embeddings
+    return CachedEmbeddings(embeddings, get_embedding_cache(), model_name or settings.EMBEDDING_MODEL)
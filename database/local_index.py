@@ -0,0 +1,528 @@
+import json
+import math
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from config import settings
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class _Partition:
+    """
+    Append-only storage for one source_type: unit-normalized float32 rows in
+    `vectors.f32` (memory-mapped for search), row text/metadata in `rows.jsonl`
+    and deleted row numbers in `tombstones.txt`.
+    """
+    def __init__(self, directory: str, dim: int):
+        self.dim = dim
+        self._set_directory(directory)
+        self.rows: List[dict] = []
+        self.row_of: Dict[str, int] = {}
+        self.live = np.zeros(0, dtype=bool)
+        self.meta = {}
+        self.ivf = None
+        self._matrix = None
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _set_directory(self, directory: str):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.rows_path = os.path.join(directory, "rows.jsonl")
+        self.tombstones_path = os.path.join(directory, "tombstones.txt")
+        self.meta_path = os.path.join(directory, "meta.json")
+
+    def move(self, directory: str):
+        """
+        Renames the partition's directory. An open memory map stays valid.
+        """
+        os.rename(self.directory, directory)
+        self._set_directory(directory)
+
+    def _load(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, encoding="utf-8") as f:
+                self.meta = json.load(f)
+        if os.path.exists(self.rows_path):
+            with open(self.rows_path, encoding="utf-8") as f:
+                self.rows = [json.loads(line) for line in f if line.strip()]
+
+        # A crash between the two appends can leave one file longer; trust the shorter one
+        stored = os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+        count = min(stored, len(self.rows))
+        if count < len(self.rows):
+            self.rows = self.rows[:count]
+            self._rewrite_rows()
+        if count < stored:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(count * 4 * self.dim)
+
+        self.live = np.ones(count, dtype=bool)
+        if os.path.exists(self.tombstones_path):
+            with open(self.tombstones_path, encoding="utf-8") as f:
+                dead = [int(line) for line in f if line.strip()]
+            dead = [row for row in dead if row < count]
+            self.live[dead] = False
+        self.row_of = {row["_id"]: i for i, row in enumerate(self.rows) if self.live[i]}
+
+    def _rewrite_rows(self):
+        with open(self.rows_path, "w", encoding="utf-8") as f:
+            for row in self.rows:
+                f.write(json.dumps(row) + "\n")
+
+    def save_meta(self):
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+
+    @property
+    def size(self) -> int:
+        return len(self.row_of)
+
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None or self._matrix.shape[0] != len(self.rows):
+            if not self.rows:
+                return np.zeros((0, self.dim), dtype=np.float32)
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(self.rows), self.dim))
+        return self._matrix
+
+    def add(self, documents: List[dict]) -> int:
+        documents = [doc for doc in documents if str(doc["_id"]) not in self.row_of]
+        if not documents:
+            return 0
+        vectors = _normalize(np.asarray([doc["embedding"] for doc in documents], dtype=np.float32))
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dim embeddings, got {vectors.shape[1]}")
+
+        start = len(self.rows)
+        new_rows = []
+        for doc in documents:
+            metadata = {key: value for key, value in doc.items() if key not in ("_id", "text", "embedding")}
+            new_rows.append({"_id": str(doc["_id"]), "text": doc.get("text", ""), "metadata": metadata})
+
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.astype(np.float32).tobytes())
+        with open(self.rows_path, "a", encoding="utf-8") as f:
+            for row in new_rows:
+                f.write(json.dumps(row, default=str) + "\n")
+
+        self.rows.extend(new_rows)
+        self.live = np.concatenate([self.live, np.ones(len(new_rows), dtype=bool)])
+        for i, row in enumerate(new_rows, start=start):
+            self.row_of[row["_id"]] = i
+        self._matrix = None
+        return len(new_rows)
+
+    def delete(self, ids: Iterable[str]) -> int:
+        dead = [self.row_of.pop(str(cid)) for cid in ids if str(cid) in self.row_of]
+        if not dead:
+            return 0
+        self.live[dead] = False
+        with open(self.tombstones_path, "a", encoding="utf-8") as f:
+            f.write("".join(f"{row}\n" for row in dead))
+        if len(self.rows) - self.size > max(1_000, len(self.rows) // 4):
+            self.compact()
+        return len(dead)
+
+    def clear(self):
+        for path in (self.vectors_path, self.rows_path, self.tombstones_path):
+            if os.path.exists(path):
+                os.unlink(path)
+        self.rows, self.row_of = [], {}
+        self.live = np.zeros(0, dtype=bool)
+        self._matrix = None
+        self.ivf = None
+
+    def compact(self):
+        """
+        Rewrites the partition without deleted rows.
+        """
+        keep = np.flatnonzero(self.live)
+        matrix = self.matrix()
+        tmp_path = self.vectors_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for i in range(0, len(keep), 65_536):
+                f.write(np.asarray(matrix[keep[i:i + 65_536]], dtype=np.float32).tobytes())
+        self._matrix = None
+        os.replace(tmp_path, self.vectors_path)
+        self.rows = [self.rows[i] for i in keep]
+        self._rewrite_rows()
+        if os.path.exists(self.tombstones_path):
+            os.unlink(self.tombstones_path)
+        self.live = np.ones(len(self.rows), dtype=bool)
+        self.row_of = {row["_id"]: i for i, row in enumerate(self.rows)}
+        self.ivf = None
+
+class _CoarseQuantizer:
+    """
+    IVF index: k-means centroids over a partition plus one inverted list of
+    row numbers per centroid. Searching probes only the nearest lists.
+    """
+    def __init__(self, matrix: np.ndarray, live: np.ndarray, n_lists: int, iterations: int = 10):
+        rng = np.random.default_rng(0)
+        rows = np.flatnonzero(live)
+        sample_rows = rng.choice(rows, size=min(len(rows), n_lists * 64), replace=False)
+        sample = np.asarray(matrix[np.sort(sample_rows)], dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+        self.centroids = centroids
+        self.lists: List[np.ndarray] = [np.zeros(0, dtype=np.int64) for _ in range(n_lists)]
+        self.trained_rows = 0
+        self.indexed_rows = 0
+        self.extend(matrix)
+        self.trained_rows = self.indexed_rows
+
+    def extend(self, matrix: np.ndarray):
+        """
+        Assigns rows added since the last call to their nearest centroid.
+        """
+        total = matrix.shape[0]
+        for start in range(self.indexed_rows, total, 65_536):
+            end = min(start + 65_536, total)
+            assign = np.argmax(np.asarray(matrix[start:end]) @ self.centroids.T, axis=1)
+            for c in np.unique(assign):
+                self.lists[c] = np.concatenate([self.lists[c], np.flatnonzero(assign == c) + start])
+        self.indexed_rows = total
+
+    def candidates(self, query: np.ndarray, n_probe: int) -> np.ndarray:
+        probe = np.argsort(-(self.centroids @ query))[:n_probe]
+        return np.sort(np.concatenate([self.lists[c] for c in probe]))
+
+class LocalVectorIndex:
+    """
+    In-process vector index partitioned by source_type. Vectors live in a
+    contiguous memory-mapped float32 matrix per partition and are searched
+    with a vectorized cosine top-k; large partitions can use an IVF coarse
+    quantizer instead of a full scan.
+
+    It also implements the chunk-store methods of MongoDBHandler
+    (get_chunk_ids, upsert_chunks, delete_chunks, ...) so ingestion can write
+    to it directly.
+    """
+    def __init__(self, directory: str = None, dim: int = None):
+        self.directory = directory or settings.LOCAL_INDEX_DIR
+        self.dim = dim or settings.VECTOR_SEARCH_DIMENSIONS
+        self._partitions: Dict[str, _Partition] = {}
+        self._lock = threading.RLock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def partition_names(self) -> List[str]:
+        names = set(self._partitions)
+        names.update(name for name in os.listdir(self.directory)
+                     if os.path.isdir(os.path.join(self.directory, name)))
+        return sorted(names)
+
+    def partition(self, source_type: str) -> _Partition:
+        with self._lock:
+            if source_type not in self._partitions:
+                self._partitions[source_type] = _Partition(os.path.join(self.directory, source_type), self.dim)
+            return self._partitions[source_type]
+
+    # --- Search ---
+
+    def search(self, query_vector: List[float], k: int, source_type: str = None,
+               where: dict = None) -> List[Tuple[Document, float]]:
+        """
+        Returns the top-k (Document, cosine score) pairs. `source_type` selects
+        the partition (all partitions if None); `where` adds exact-match
+        metadata filters.
+        """
+        query = _normalize(np.asarray(query_vector, dtype=np.float32))
+        names = [source_type] if source_type else self.partition_names()
+        hits = []
+        for name in names:
+            with self._lock:
+                hits.extend(self._search_partition(self.partition(name), query, k, where))
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return hits[:k]
+
+    def _search_partition(self, part: _Partition, query: np.ndarray, k: int, where: dict):
+        if part.size == 0:
+            return []
+        matrix = part.matrix()
+        quantizer = self._quantizer(part)
+        if quantizer is not None:
+            rows = quantizer.candidates(query, settings.LOCAL_INDEX_IVF_PROBES)
+            rows = rows[part.live[rows]]
+        else:
+            rows = np.flatnonzero(part.live)
+        if where:
+            rows = np.array([row for row in rows if all(part.rows[row]["metadata"].get(key) == value
+                                                        for key, value in where.items())], dtype=np.int64)
+        if len(rows) == 0:
+            return []
+
+        if len(rows) == matrix.shape[0]:
+            scores = np.asarray(matrix @ query)
+        else:
+            scores = np.asarray(matrix[rows]) @ query
+        top = min(k, len(rows))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+
+        results = []
+        for i in best:
+            row = part.rows[rows[i]]
+            metadata = dict(row["metadata"], _id=row["_id"])
+            results.append((Document(page_content=row["text"], metadata=metadata), float(scores[i])))
+        return results
+
+    def _quantizer(self, part: _Partition) -> Optional[_CoarseQuantizer]:
+        if not settings.LOCAL_INDEX_IVF or part.size < settings.LOCAL_INDEX_IVF_MIN_ROWS:
+            return None
+        matrix = part.matrix()
+        # Retrain once the partition has doubled since the centroids were fitted
+        if part.ivf is None or matrix.shape[0] > 2 * part.ivf.trained_rows:
+            n_lists = settings.LOCAL_INDEX_IVF_LISTS or int(math.sqrt(part.size))
+            part.ivf = _CoarseQuantizer(matrix, part.live, n_lists=max(1, min(n_lists, part.size)))
+        elif matrix.shape[0] > part.ivf.indexed_rows:
+            part.ivf.extend(matrix)
+        return part.ivf
+
+    # --- Chunk store (same surface as MongoDBHandler) ---
+
+    def get_chunk_ids(self, source: str) -> set:
+        return self.get_chunk_ids_by_source([source])[source]
+
+    def get_chunk_ids_by_source(self, sources) -> dict:
+        found = {source: set() for source in sources}
+        with self._lock:
+            for name in self.partition_names():
+                part = self.partition(name)
+                for cid, row in part.row_of.items():
+                    source = part.rows[row]["metadata"].get("source")
+                    if source in found:
+                        found[source].add(cid)
+        return found
+
+    def upsert_chunks(self, documents, batch_size: int = None) -> int:
+        """
+        Adds chunk documents ({"_id", "text", "embedding", **metadata}) to the
+        partition named by their `source_type`. Ids already present are skipped,
+        since ids are derived from content.
+        """
+        by_partition: Dict[str, List[dict]] = {}
+        for doc in documents:
+            by_partition.setdefault(doc.get("source_type", "default"), []).append(doc)
+        with self._lock:
+            for name, docs in by_partition.items():
+                self.partition(name).add(docs)
+        return len(documents)
+
+    def get_chunks(self, ids) -> list:
+        wanted = set(str(cid) for cid in ids)
+        found = []
+        with self._lock:
+            for name in self.partition_names():
+                part = self.partition(name)
+                for cid in wanted & part.row_of.keys():
+                    row = part.rows[part.row_of[cid]]
+                    found.append({"_id": cid, "text": row["text"], **row["metadata"]})
+        return found
+
+    def iter_chunks(self, batch_size: int = None):
+        """
+        Yields every live chunk in batches of documents ({"_id", "text",
+        "embedding", **metadata}), partition by partition. Embeddings are the
+        stored unit-normalized float32 rows.
+        """
+        batch_size = batch_size or settings.MONGO_WRITE_BATCH_SIZE
+        for name in self.partition_names():
+            with self._lock:
+                part = self.partition(name)
+                rows, live, matrix = list(part.rows), np.flatnonzero(part.live), part.matrix()
+            for i in range(0, len(live), batch_size):
+                selected = live[i:i + batch_size]
+                vectors = np.asarray(matrix[selected], dtype=np.float32)
+                yield [{"_id": rows[row]["_id"], "text": rows[row]["text"], **rows[row]["metadata"], "embedding": vector}
+                       for row, vector in zip(selected, vectors)]
+
+    def delete_chunks(self, ids) -> int:
+        ids = set(str(cid) for cid in ids)
+        deleted = 0
+        with self._lock:
+            for name in self.partition_names():
+                deleted += self.partition(name).delete(ids)
+        return deleted
+
+    def clear_partition(self, source_type: str):
+        with self._lock:
+            self.partition(source_type).clear()
+
+    def stage_partition(self, source_type: str) -> _Partition:
+        """
+        Returns an empty partition in a scratch directory next to the index.
+        Fill it without the index lock, then install it with swap_partition.
+        """
+        staging = os.path.join(self.directory.rstrip(os.sep) + ".staging", f"{source_type}-{uuid.uuid4().hex}")
+        return _Partition(staging, self.dim)
+
+    def swap_partition(self, source_type: str, staged: _Partition):
+        """
+        Replaces a partition with a staged one. Searches hold the index lock,
+        so none of them sees a half-installed partition.
+        """
+        target = os.path.join(self.directory, source_type)
+        trash = staged.directory + ".old"
+        with self._lock:
+            if os.path.exists(target):
+                os.rename(target, trash)
+            staged.move(target)
+            self._partitions[source_type] = staged
+        shutil.rmtree(trash, ignore_errors=True)
+
+class LocalVectorStore(VectorStore):
+    """
+    LangChain VectorStore over a LocalVectorIndex. Accepts the same
+    `pre_filter={"source_type": ...}` argument as MongoDBAtlasVectorSearch.
+    """
+    def __init__(self, index: LocalVectorIndex, embedding: Embeddings):
+        self.index = index
+        self._embedding = embedding
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_texts(self, texts, metadatas: List[dict] = None, ids: List[str] = None, **kwargs) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        vectors = self._embedding.embed_documents(texts)
+        documents = [{"_id": cid, "text": text, "embedding": vector, **metadata}
+                     for cid, text, vector, metadata in zip(ids, texts, vectors, metadatas)]
+        self.index.upsert_chunks(documents)
+        return ids
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               pre_filter: dict = None, **kwargs) -> List[Tuple[Document, float]]:
+        where = dict(pre_filter or {})
+        source_type = where.pop("source_type", None)
+        return self.index.search(embedding, k, source_type=source_type, where=where or None)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, pre_filter: dict = None, **kwargs):
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k, pre_filter)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, pre_filter: dict = None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, pre_filter)]
+
+    def similarity_search(self, query: str, k: int = 4, pre_filter: dict = None, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, pre_filter)]
+
+    @classmethod
+    def from_texts(cls, texts, embedding: Embeddings, metadatas: List[dict] = None, **kwargs):
+        store = cls(LocalVectorIndex(kwargs.get("directory")), embedding)
+        store.add_texts(texts, metadatas)
+        return store
+
+class ReadThroughVectorStore(LocalVectorStore):
+    """
+    Serves searches from a local index, warming each source_type partition
+    from the Mongo collection on first use and again after
+    LOCAL_CACHE_TTL_SECONDS. Refreshes load a fresh copy in the background
+    and swap it in, while searches keep using the stale one. Falls back to
+    Atlas Vector Search if a partition cannot be warmed or the query has no
+    source_type filter.
+    """
+    def __init__(self, index: LocalVectorIndex, embedding: Embeddings, remote: VectorStore, collection):
+        super().__init__(index, embedding)
+        self.remote = remote
+        self.collection = collection
+        self._warm_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _warm_lock(self, source_type: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._warm_locks.setdefault(source_type, threading.Lock())
+
+    def invalidate(self, source_type: str):
+        """Marks a partition stale so the next query re-reads it from Mongo."""
+        part = self.index.partition(source_type)
+        part.meta["warmed_at"] = 0
+        part.save_meta()
+
+    def _is_fresh(self, source_type: str) -> bool:
+        warmed_at = self.index.partition(source_type).meta.get("warmed_at", 0)
+        return time.time() - warmed_at < settings.LOCAL_CACHE_TTL_SECONDS
+
+    def warm(self, source_type: str, wait: bool = None):
+        """
+        Brings a partition up to date with Mongo once it is older than the TTL.
+        If a copy is already cached, the reload runs in a background thread
+        unless `wait` is set. Only the first load of a partition blocks, and
+        only callers of that partition.
+        """
+        if self._is_fresh(source_type):
+            return
+        lock = self._warm_lock(source_type)
+        cached = "warmed_at" in self.index.partition(source_type).meta
+        if wait is None:
+            wait = not cached
+        if not wait:
+            if lock.acquire(blocking=False):
+                threading.Thread(target=self._refresh, args=(source_type, lock), daemon=True,
+                                 name=f"warm-{source_type}").start()
+            return
+        with lock:
+            if not self._is_fresh(source_type):
+                self._reload(source_type)
+
+    def _refresh(self, source_type: str, lock: threading.Lock):
+        try:
+            if not self._is_fresh(source_type):
+                self._reload(source_type)
+        except Exception as e:
+            print(f"[WARN] Could not refresh local cache for '{source_type}': {e}")
+        finally:
+            lock.release()
+
+    def _reload(self, source_type: str):
+        """
+        Loads the partition's current Mongo contents into a staged copy and swaps it in.
+        """
+        from database.mongo import FULL_PRECISION_FIELD, decode_vector
+        staged = self.index.stage_partition(source_type)
+        try:
+            batch = []
+            for doc in self.collection.find({"source_type": source_type}):
+                # Prefer the float32 copy kept for rescoring over a quantized embedding
+                doc["embedding"] = decode_vector(doc.pop(FULL_PRECISION_FIELD, None) or doc["embedding"])
+                batch.append(doc)
+                if len(batch) >= 1_000:
+                    staged.add(batch)
+                    batch = []
+            if batch:
+                staged.add(batch)
+            staged.meta["warmed_at"] = time.time()
+            staged.save_meta()
+        except BaseException:
+            shutil.rmtree(staged.directory, ignore_errors=True)
+            raise
+        self.index.swap_partition(source_type, staged)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, pre_filter: dict = None, **kwargs):
+        source_type = (pre_filter or {}).get("source_type")
+        if source_type:
+            try:
+                self.warm(source_type)
+                return super().similarity_search_with_score(query, k, pre_filter)
+            except Exception as e:
+                print(f"[WARN] Local cache unavailable for '{source_type}', using Atlas: {e}")
+        return self.remote.similarity_search_with_score(query, k=k, pre_filter=pre_filter)
@@ -1,15 +1,164 @@
+import argparse
+import gzip
+import hashlib
+import json
 import os
-from pymongo import MongoClient
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+import numpy as np
+from bson.binary import Binary, BinaryVectorDtype
+from langchain_core.documents import Document
+from langchain_mongodb import MongoDBAtlasVectorSearch
+from pymongo import ReplaceOne, UpdateOne
 from pymongo.collection import Collection
 from pymongo.errors import OperationFailure
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
 from config import settings
-import json
+
+VECTOR_FORMATS = ("array", "float32", "int8", "binary")
+# Float32 copy of quantized embeddings, used for rescoring (not indexed)
+FULL_PRECISION_FIELD = "embedding_full"
+
+def encode_vector(vector, fmt: str = None):
+    """
+    Converts an embedding to its stored form: a list of doubles ("array") or
+    a packed BSON binary vector. int8 scales each vector by its largest
+    component, which leaves cosine similarity unchanged; binary keeps signs only.
+    """
+    fmt = fmt or settings.VECTOR_STORAGE_FORMAT
+    if fmt == "array":
+        return [float(x) for x in vector]
+    values = np.asarray(vector, dtype=np.float32)
+    if fmt == "float32":
+        return Binary.from_vector(values.tolist(), BinaryVectorDtype.FLOAT32)
+    if fmt == "int8":
+        scale = float(np.abs(values).max()) or 1.0
+        return Binary.from_vector(np.round(values * (127 / scale)).astype(np.int8).tolist(), BinaryVectorDtype.INT8)
+    if fmt == "binary":
+        bits = np.packbits(values > 0)
+        return Binary.from_vector(bits.tolist(), BinaryVectorDtype.PACKED_BIT, padding=(-len(values)) % 8)
+    raise ValueError(f"Unknown VECTOR_STORAGE_FORMAT: {fmt}")
+
+def decode_vector(value) -> np.ndarray:
+    """
+    Reads a stored embedding back as float32. Quantized vectors come back in
+    their own scale (int8 steps, or +/-1 per bit), which is fine for cosine.
+    """
+    if not isinstance(value, Binary):
+        return np.asarray(value, dtype=np.float32)
+    vector = value.as_vector()
+    if vector.dtype == BinaryVectorDtype.PACKED_BIT:
+        bits = np.unpackbits(np.asarray(vector.data, dtype=np.uint8))
+        bits = bits[:len(bits) - vector.padding] if vector.padding else bits
+        return bits.astype(np.float32) * 2 - 1
+    return np.asarray(vector.data, dtype=np.float32)
+
+def vector_format(value) -> str:
+    if not isinstance(value, Binary):
+        return "array"
+    return {BinaryVectorDtype.FLOAT32: "float32", BinaryVectorDtype.INT8: "int8",
+            BinaryVectorDtype.PACKED_BIT: "binary"}[value.as_vector().dtype]
+
+def is_quantized(fmt: str = None) -> bool:
+    return (fmt or settings.VECTOR_STORAGE_FORMAT) in ("int8", "binary")
+
+def vector_index_definition(fmt: str = None) -> dict:
+    """
+    Atlas Vector Search index ("vectorSearch" type) for packed binary vectors.
+    Bit vectors can only be compared with euclidean (Hamming) distance.
+    """
+    fmt = fmt or settings.VECTOR_STORAGE_FORMAT
+    field = {
+        "type": "vector",
+        "path": "embedding",
+        "numDimensions": settings.VECTOR_SEARCH_DIMENSIONS,
+        "similarity": "euclidean" if fmt == "binary" else settings.VECTOR_SEARCH_METRIC,
+    }
+    if fmt == "float32" and settings.VECTOR_INDEX_QUANTIZATION != "none":
+        field["quantization"] = settings.VECTOR_INDEX_QUANTIZATION
+    return {"fields": [field, {"type": "filter", "path": "source_type"}]}
+
+def vector_search(collection, query_vector, k: int, pre_filter: dict = None, fmt: str = None) -> List[dict]:
+    """
+    Runs $vectorSearch with the query encoded like the stored vectors. For
+    quantized formats with VECTOR_RESCORE, fetches k * oversampling candidates
+    and re-ranks them by exact cosine against the float32 copy.
+    Returns chunk documents (without vectors) carrying a `score`.
+    """
+    fmt = fmt or settings.VECTOR_STORAGE_FORMAT
+    rescore = is_quantized(fmt) and settings.VECTOR_RESCORE
+    limit = k * settings.VECTOR_RESCORE_OVERSAMPLING if rescore else k
+    stage = {
+        "index": settings.INDEX_NAME,
+        "path": "embedding",
+        "queryVector": encode_vector(query_vector, fmt),
+        "numCandidates": limit * 10,
+        "limit": limit,
+    }
+    if pre_filter:
+        stage["filter"] = pre_filter
+    projection = {"embedding": 0} if rescore else {"embedding": 0, FULL_PRECISION_FIELD: 0}
+    docs = list(collection.aggregate([
+        {"$vectorSearch": stage},
+        {"$set": {"score": {"$meta": "vectorSearchScore"}}},
+        {"$project": projection},
+    ]))
+    if not rescore:
+        return docs
+
+    query = np.asarray(query_vector, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+    for doc in docs:
+        full = doc.pop(FULL_PRECISION_FIELD, None)
+        if full is not None:
+            vector = decode_vector(full)
+            # Same [0, 1] scale Atlas uses for cosine scores
+            doc["score"] = float((vector @ query / (np.linalg.norm(vector) or 1.0) + 1) / 2)
+    docs.sort(key=lambda doc: doc["score"], reverse=True)
+    return docs[:k]
+
+class BinaryVectorSearch(MongoDBAtlasVectorSearch):
+    """
+    MongoDBAtlasVectorSearch for collections whose embeddings are packed BSON
+    binary vectors: queries are encoded to the stored format and quantized
+    results are rescored at full precision.
+    """
+    def _similarity_search_with_score(self, query_vector, k: int = 4, pre_filter: dict = None,
+                                      post_filter_pipeline=None, oversampling_factor: int = 10,
+                                      include_embeddings: bool = False, **kwargs) -> List[Tuple[Document, float]]:
+        results = []
+        for doc in vector_search(self._collection, query_vector, k, pre_filter):
+            text = doc.pop("text", "")
+            score = doc.pop("score")
+            doc["_id"] = str(doc["_id"])
+            results.append((Document(page_content=text, metadata=doc, id=doc["_id"]), score))
+        return results
 
 class MongoDBHandler:
-    def __init__(self):
-        self.client = MongoClient(settings.MONGO_URI)
-        self.db = self.client[settings.DB_NAME]
-        self.collection: Collection = self.db[settings.COLLECTION_NAME]
+    """
+    Chunk-store operations on the knowledge base collection. The client comes
+    from the shared resource registry, so it is only opened on first use and
+    follows the current settings.MONGO_URI.
+    """
+    @property
+    def client(self):
+        from config.resources import get_mongo_client
+        return get_mongo_client()
+
+    @property
+    def db(self):
+        return self.client[settings.DB_NAME]
+
+    @property
+    def collection(self) -> Collection:
+        return self.db[settings.COLLECTION_NAME]
 
     def init_search_index(self):
         """
@@ -17,6 +166,12 @@ class MongoDBHandler:
         If not, prints the JSON Schema for manual creation.
         """
         print(f"Checking for index '{settings.INDEX_NAME}' in collection '{settings.COLLECTION_NAME}'...")
+
+        # Regular index used to diff a source against its stored chunks
+        try:
+            self.collection.create_index("source")
+        except Exception as e:
+            print(f"[!] Could not create 'source' index: {e}")
         
         try:
             indexes = list(self.collection.list_search_indexes())
@@ -36,6 +191,15 @@ class MongoDBHandler:
             self._print_index_schema()
 
     def _print_index_schema(self):
+        if settings.VECTOR_STORAGE_FORMAT != "array":
+            print("\n[X] Vector Search Index not found or could not be verified.")
+            print("Please create it manually in MongoDB Atlas as an 'Atlas Vector Search' index.")
+            print(f"1. Name the index: {settings.INDEX_NAME}")
+            print("2. Paste this into the JSON Editor:")
+            print(json.dumps(vector_index_definition(), indent=4))
+            print(f"\nNote: embeddings are stored as '{settings.VECTOR_STORAGE_FORMAT}' BSON binary vectors.")
+            return
+
         schema = {
             "mappings": {
                 "dynamic": True,
@@ -62,5 +226,348 @@ class MongoDBHandler:
     def get_collection(self):
         return self.collection
 
-# Initialize global handler if needed, or allow instantiation
+    def upsert_chunks(self, documents, batch_size: int = None) -> int:
+        """
+        Writes chunk documents with unordered bulk upserts in fixed-size batches.
+        Documents must carry their deterministic `_id`.
+        """
+        batch_size = batch_size or settings.MONGO_WRITE_BATCH_SIZE
+        written = 0
+        for i in range(0, len(documents), batch_size):
+            batch = documents[i:i + batch_size]
+            ops = [ReplaceOne({"_id": doc["_id"]}, self.encode_document(doc), upsert=True) for doc in batch]
+            self.collection.bulk_write(ops, ordered=False)
+            written += len(batch)
+        return written
+
+    def encode_document(self, doc: dict, fmt: str = None) -> dict:
+        """
+        Returns a copy of a chunk document with its embedding in the configured storage format.
+        """
+        fmt = fmt or settings.VECTOR_STORAGE_FORMAT
+        if "embedding" not in doc or fmt == "array":
+            return doc
+        encoded = dict(doc, embedding=encode_vector(doc["embedding"], fmt))
+        if is_quantized(fmt) and settings.VECTOR_RESCORE:
+            encoded[FULL_PRECISION_FIELD] = encode_vector(doc["embedding"], "float32")
+        return encoded
+
+    def migrate_vectors(self, fmt: str, batch_size: int = None) -> dict:
+        """
+        Rewrites every stored embedding in `fmt`, in bulk batches. Documents
+        already in the target format are skipped, so the command can be re-run
+        after an interruption. Rescoring copies are added or dropped to match.
+        """
+        batch_size = batch_size or settings.MONGO_WRITE_BATCH_SIZE
+        keep_full = is_quantized(fmt) and settings.VECTOR_RESCORE
+        stats = {"converted": 0, "skipped": 0, "lossy": 0}
+        ops = []
+        cursor = self.collection.find({"embedding": {"$exists": True}},
+                                      {"embedding": 1, FULL_PRECISION_FIELD: 1}, batch_size=batch_size)
+        for doc in cursor:
+            has_full = FULL_PRECISION_FIELD in doc
+            if vector_format(doc["embedding"]) == fmt and has_full == keep_full:
+                stats["skipped"] += 1
+                continue
+            source = doc.get(FULL_PRECISION_FIELD, doc["embedding"])
+            if is_quantized(vector_format(source)):
+                stats["lossy"] += 1 # no full-precision copy left to convert from
+            vector = decode_vector(source)
+            update = {"$set": {"embedding": encode_vector(vector, fmt)}}
+            if keep_full:
+                update["$set"][FULL_PRECISION_FIELD] = encode_vector(vector, "float32")
+            elif has_full:
+                update["$unset"] = {FULL_PRECISION_FIELD: ""}
+            ops.append(UpdateOne({"_id": doc["_id"]}, update))
+            if len(ops) >= batch_size:
+                self.collection.bulk_write(ops, ordered=False)
+                stats["converted"] += len(ops)
+                ops = []
+        if ops:
+            self.collection.bulk_write(ops, ordered=False)
+            stats["converted"] += len(ops)
+        return stats
+
+    def iter_chunks(self, batch_size: int = None):
+        """
+        Yields every chunk in batches of documents with `embedding` decoded to
+        float32, read from the full-precision copy when there is one.
+        """
+        batch_size = batch_size or settings.MONGO_WRITE_BATCH_SIZE
+        lossy = 0
+        batch = []
+        for doc in self.collection.find({"embedding": {"$exists": True}}, batch_size=batch_size):
+            source = doc.pop(FULL_PRECISION_FIELD, None) or doc["embedding"]
+            if is_quantized(vector_format(source)):
+                lossy += 1
+            doc["embedding"] = decode_vector(source)
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        if lossy:
+            print(f"[WARN] {lossy} chunks had no float32 copy; their embeddings were read from quantized vectors.")
+
+    def storage_stats(self) -> dict:
+        """
+        Collection and index sizes in bytes, as reported by collStats, plus
+        bytes per chunk: logical (`size`) and on disk (`storageSize` plus indexes).
+        """
+        stats = self.db.command("collStats", settings.COLLECTION_NAME)
+        result = {key: stats.get(key) for key in ("count", "size", "avgObjSize", "storageSize", "totalIndexSize")}
+        count = result["count"] or 0
+        result["bytes_per_chunk"] = round((result["size"] or 0) / count) if count else 0
+        result["disk_bytes_per_chunk"] = round(((result["storageSize"] or 0) + (result["totalIndexSize"] or 0)) / count) if count else 0
+        return result
+
+    def get_chunk_ids(self, source: str) -> set:
+        """
+        Returns the _ids of every chunk currently stored for `source`.
+        """
+        cursor = self.collection.find({"source": source}, {"_id": 1})
+        return {doc["_id"] for doc in cursor}
+
+    def get_chunk_ids_by_source(self, sources) -> dict:
+        """
+        Bulk variant of get_chunk_ids: maps each source to its stored chunk _ids.
+        """
+        sources = list(sources)
+        found = {source: set() for source in sources}
+        for i in range(0, len(sources), 1_000):
+            cursor = self.collection.find({"source": {"$in": sources[i:i + 1_000]}}, {"_id": 1, "source": 1})
+            for doc in cursor:
+                found[doc["source"]].add(doc["_id"])
+        return found
+
+    def get_chunks(self, ids) -> list:
+        """
+        Fetches chunk documents by _id, without their embeddings.
+        """
+        return list(self.collection.find({"_id": {"$in": list(ids)}}, {"embedding": 0, FULL_PRECISION_FIELD: 0}))
+
+    def delete_chunks(self, ids) -> int:
+        """
+        Bulk-deletes chunks by _id. Returns the number of documents removed.
+        """
+        ids = list(ids)
+        deleted = 0
+        # Keep each $in list well under the 16MB command limit
+        for i in range(0, len(ids), 10_000):
+            result = self.collection.delete_many({"_id": {"$in": ids[i:i + 10_000]}})
+            deleted += result.deleted_count
+        return deleted
+
+# Global handler; no connection is made until it is first used
 mongo_handler = MongoDBHandler()
+
+# Corpus snapshot: chunk text/metadata as gzipped JSON lines, embeddings as one
+# contiguous little-endian float32 matrix (row i = line i) that can be memory-mapped
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MANIFEST = "manifest.json"
+SNAPSHOT_CHUNKS = "chunks.jsonl.gz"
+SNAPSHOT_VECTORS = "embeddings.f32"
+
+def _file_digest(path: str) -> dict:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(8 * 1024 * 1024):
+            digest.update(block)
+    return {"bytes": os.path.getsize(path), "sha256": digest.hexdigest()}
+
+def _store_for(name: str = None):
+    if name is None:
+        from database.vector_store import get_chunk_store
+        return get_chunk_store()
+    if name == "local":
+        from database.vector_store import get_local_index
+        return get_local_index()
+    return mongo_handler
+
+def export_snapshot(directory: str, store=None, batch_size: int = None) -> dict:
+    """
+    Writes every chunk of `store` (Mongo or the local index; default: the
+    configured chunk store) to a snapshot directory. The manifest is written
+    last, so a directory without one is an incomplete export.
+    """
+    store = store or _store_for()
+    os.makedirs(directory, exist_ok=True)
+    chunks_path = os.path.join(directory, SNAPSHOT_CHUNKS)
+    vectors_path = os.path.join(directory, SNAPSHOT_VECTORS)
+    started = time.perf_counter()
+    count, source_types = 0, {}
+    with gzip.open(chunks_path, "wt", encoding="utf-8", compresslevel=settings.SNAPSHOT_COMPRESSION) as chunks, \
+            open(vectors_path, "wb") as vectors:
+        for batch in store.iter_chunks(batch_size):
+            matrix = np.stack([doc.pop("embedding") for doc in batch]).astype("<f4")
+            if matrix.shape[1] != settings.VECTOR_SEARCH_DIMENSIONS:
+                raise ValueError(f"Expected {settings.VECTOR_SEARCH_DIMENSIONS}-dim embeddings, got {matrix.shape[1]}")
+            vectors.write(matrix.tobytes())
+            chunks.write("".join(json.dumps(doc, default=str) + "\n" for doc in batch))
+            for doc in batch:
+                source_type = doc.get("source_type", "default")
+                source_types[source_type] = source_types.get(source_type, 0) + 1
+            count += len(batch)
+
+    is_mongo = isinstance(store, MongoDBHandler)
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "dimensions": settings.VECTOR_SEARCH_DIMENSIONS,
+        "dtype": "<f4",
+        "count": count,
+        "source": "mongo" if is_mongo else "local",
+        "storage_format": settings.VECTOR_STORAGE_FORMAT if is_mongo else "float32",
+        "normalized": not is_mongo,  # the local index stores unit-length rows
+        "source_types": source_types,
+        "files": {name: _file_digest(os.path.join(directory, name)) for name in (SNAPSHOT_CHUNKS, SNAPSHOT_VECTORS)},
+    }
+    tmp_path = os.path.join(directory, SNAPSHOT_MANIFEST + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, SNAPSHOT_MANIFEST))
+    return dict(manifest, seconds=round(time.perf_counter() - started, 2))
+
+def read_snapshot(directory: str, verify: bool = True) -> Tuple[dict, np.ndarray]:
+    """
+    Loads and checks a snapshot manifest and memory-maps its embeddings.
+    Raises ValueError if a checksum, the embedding model or the dimensions
+    do not match this deployment.
+    """
+    manifest_path = os.path.join(directory, SNAPSHOT_MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"No {SNAPSHOT_MANIFEST} in '{directory}' (incomplete or not a snapshot)")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {manifest.get('version')}")
+    if manifest["embedding_model"] != settings.EMBEDDING_MODEL:
+        raise ValueError(f"Snapshot embeddings are from '{manifest['embedding_model']}', "
+                         f"but EMBEDDING_MODEL is '{settings.EMBEDDING_MODEL}'")
+    if manifest["dimensions"] != settings.VECTOR_SEARCH_DIMENSIONS:
+        raise ValueError(f"Snapshot has {manifest['dimensions']}-dim embeddings, "
+                         f"but VECTOR_SEARCH_DIMENSIONS is {settings.VECTOR_SEARCH_DIMENSIONS}")
+    for name, expected in manifest["files"].items():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path) or os.path.getsize(path) != expected["bytes"]:
+            raise ValueError(f"'{name}' is missing or truncated")
+        if verify and _file_digest(path)["sha256"] != expected["sha256"]:
+            raise ValueError(f"Checksum mismatch for '{name}'")
+
+    shape = (manifest["count"], manifest["dimensions"])
+    if not manifest["count"]:
+        return manifest, np.zeros(shape, dtype=np.float32)
+    return manifest, np.memmap(os.path.join(directory, SNAPSHOT_VECTORS), dtype=manifest["dtype"], mode="r", shape=shape)
+
+def import_snapshot(directory: str, store=None, batch_size: int = None, workers: int = None,
+                    verify: bool = True) -> dict:
+    """
+    Bulk-loads a snapshot into `store` (default: the configured chunk store)
+    with `workers` batches in flight, and indexes the chunks for BM25. No
+    embeddings are computed. Chunks whose _id is already stored are
+    overwritten (Mongo) or skipped (local index), so an interrupted import
+    can be re-run.
+    """
+    from database.vector_store import get_lexical_index, notify_ingested
+
+    manifest, vectors = read_snapshot(directory, verify)
+    store = store or _store_for()
+    lexical = get_lexical_index()
+    batch_size = batch_size or settings.MONGO_WRITE_BATCH_SIZE
+    workers = workers or settings.SNAPSHOT_IMPORT_WORKERS
+    started = time.perf_counter()
+
+    def load(batch: list) -> int:
+        store.upsert_chunks(batch, batch_size)
+        if lexical is not None:
+            lexical.add_chunks(batch)
+        return len(batch)
+
+    imported, row = 0, 0
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot") as pool, \
+            gzip.open(os.path.join(directory, SNAPSHOT_CHUNKS), "rt", encoding="utf-8") as chunks:
+        batch = []
+        for line in chunks:
+            batch.append(json.loads(line))
+            if len(batch) < batch_size:
+                continue
+            # Bound memory: at most two batches per worker are queued or being written
+            while len(pending) >= 2 * workers:
+                imported += pending.popleft().result()
+            for doc, vector in zip(batch, vectors[row:row + len(batch)].tolist()):
+                doc["embedding"] = vector
+            pending.append(pool.submit(load, batch))
+            row += len(batch)
+            if row // 100_000 != (row - len(batch)) // 100_000:
+                print(f"[INFO] {row:,}/{manifest['count']:,} chunks queued...")
+            batch = []
+        if batch:
+            for doc, vector in zip(batch, vectors[row:row + len(batch)].tolist()):
+                doc["embedding"] = vector
+            pending.append(pool.submit(load, batch))
+            row += len(batch)
+        while pending:
+            imported += pending.popleft().result()
+
+    if row != manifest["count"]:
+        print(f"[WARN] Snapshot lists {manifest['count']} chunks but {row} were read.")
+    if lexical is not None:
+        lexical.save()
+    for source_type in manifest["source_types"]:
+        notify_ingested(source_type)
+    seconds = time.perf_counter() - started
+    return {"imported": imported, "seconds": round(seconds, 2),
+            "chunks_per_s": round(imported / seconds, 1) if seconds else 0.0}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nexus AI MongoDB maintenance")
+    parser.add_argument("--migrate-vectors", choices=VECTOR_FORMATS, help="Convert stored embeddings to this format")
+    parser.add_argument("--batch-size", type=int, default=settings.MONGO_WRITE_BATCH_SIZE, help="Documents per bulk write")
+    parser.add_argument("--stats", action="store_true", help="Print collection and index sizes")
+    parser.add_argument("--export-snapshot", metavar="DIR", help="Write every chunk and embedding to a snapshot directory")
+    parser.add_argument("--import-snapshot", metavar="DIR", help="Bulk-load a snapshot directory (no embedding calls)")
+    parser.add_argument("--store", choices=("mongo", "local"),
+                        help="Snapshot source/target (default: local if VECTOR_STORE_BACKEND=local, else mongo)")
+    parser.add_argument("--workers", type=int, default=settings.SNAPSHOT_IMPORT_WORKERS, help="Import batches in flight")
+    parser.add_argument("--no-verify", action="store_true", help="Skip snapshot checksum verification on import")
+    args = parser.parse_args()
+
+    if args.export_snapshot or args.import_snapshot:
+        store = _store_for(args.store)
+        if isinstance(store, MongoDBHandler) and not settings.MONGO_URI:
+            print("[ERROR] MONGO_URI must be set (in the environment or .env), or use --store local.")
+            sys.exit(1)
+        try:
+            if args.export_snapshot:
+                print(f"[INFO] Exporting chunks to '{args.export_snapshot}'...")
+                result = export_snapshot(args.export_snapshot, store, args.batch_size)
+                print(f"[SUCCESS] Exported {result['count']} chunks ({result['source_types']}) in {result['seconds']}s.")
+            else:
+                print(f"[INFO] Importing snapshot '{args.import_snapshot}'...")
+                result = import_snapshot(args.import_snapshot, store, args.batch_size, args.workers,
+                                         verify=not args.no_verify)
+                print(f"[SUCCESS] Imported {result['imported']} chunks in {result['seconds']}s "
+                      f"({result['chunks_per_s']} chunks/s).")
+                if isinstance(store, MongoDBHandler):
+                    store.init_search_index()
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+
+    if args.stats or args.migrate_vectors:
+        print(f"[INFO] Storage: {mongo_handler.storage_stats()}")
+    if args.migrate_vectors:
+        print(f"[INFO] Converting embeddings in '{settings.COLLECTION_NAME}' to '{args.migrate_vectors}'...")
+        result = mongo_handler.migrate_vectors(args.migrate_vectors, args.batch_size)
+        print(f"[SUCCESS] {result['converted']} converted, {result['skipped']} already in format.")
+        if result["lossy"]:
+            print(f"[!] {result['lossy']} documents had no float32 copy and were converted from quantized vectors.")
+        print(f"[INFO] Storage: {mongo_handler.storage_stats()}")
+        print(f"[INFO] Set VECTOR_STORAGE_FORMAT={args.migrate_vectors} and recreate the '{settings.INDEX_NAME}' index:")
+        settings.VECTOR_STORAGE_FORMAT = args.migrate_vectors
+        mongo_handler._print_index_schema()
+    if not (args.stats or args.migrate_vectors or args.export_snapshot or args.import_snapshot):
+        parser.print_help()
@@ -0,0 +1,85 @@
+import threading
+
+from config import settings
+
+_lock = threading.Lock()
+_local_index = None
+_lexical_index = None
+_listeners = []
+
+def get_local_index():
+    """
+    Process-wide LocalVectorIndex under settings.LOCAL_INDEX_DIR.
+    """
+    global _local_index
+    with _lock:
+        if _local_index is None:
+            from database.local_index import LocalVectorIndex
+            _local_index = LocalVectorIndex(settings.LOCAL_INDEX_DIR)
+        return _local_index
+
+def get_lexical_index():
+    """
+    Process-wide BM25Index, or None when hybrid search is disabled.
+    """
+    global _lexical_index
+    if not settings.HYBRID_SEARCH:
+        return None
+    with _lock:
+        if _lexical_index is None:
+            from database.bm25_index import BM25Index
+            _lexical_index = BM25Index(settings.BM25_INDEX_DIR)
+        return _lexical_index
+
+def get_vector_store(embeddings):
+    """
+    Builds the retrieval vector store selected by settings.VECTOR_STORE_BACKEND:
+      - "atlas":  MongoDB Atlas Vector Search (default)
+      - "local":  in-process NumPy index only, no Atlas round trips
+      - "cached": local index as a read-through cache in front of Atlas
+    """
+    backend = settings.VECTOR_STORE_BACKEND
+    if backend == "local":
+        from database.local_index import LocalVectorStore
+        return LocalVectorStore(get_local_index(), embeddings)
+
+    from langchain_mongodb import MongoDBAtlasVectorSearch
+    from database.mongo import mongo_handler, BinaryVectorSearch
+    # Packed BSON binary vectors need queries in the same format (and rescoring when quantized)
+    store_class = MongoDBAtlasVectorSearch if settings.VECTOR_STORAGE_FORMAT == "array" else BinaryVectorSearch
+    atlas = store_class(
+        collection=mongo_handler.get_collection(),
+        embedding=embeddings,
+        index_name=settings.INDEX_NAME,
+        relevance_score_fn=settings.VECTOR_SEARCH_METRIC
+    )
+    if backend == "atlas":
+        return atlas
+    if backend == "cached":
+        from database.local_index import ReadThroughVectorStore
+        store = ReadThroughVectorStore(get_local_index(), embeddings, atlas, mongo_handler.get_collection())
+        on_ingested(store.invalidate)
+        return store
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {backend}")
+
+def get_chunk_store():
+    """
+    Where ingestion writes chunks: the local index in "local" mode, Mongo otherwise.
+    """
+    if settings.VECTOR_STORE_BACKEND == "local":
+        return get_local_index()
+    from database.mongo import mongo_handler
+    return mongo_handler
+
+def on_ingested(callback):
+    """
+    Registers `callback(source_type)` to run after a source_type partition changes.
+    """
+    _listeners.append(callback)
+
+def notify_ingested(source_type: str):
+    for callback in list(_listeners):
+        try:
+            callback(source_type)
+        except Exception as e:
+            print(f"[WARN] Ingest listener failed: {e}")
@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+# Add root to path
+sys.path.append(os.path.dirname(__file__))
+
+from config import settings
+
+RESULT_FIELDS = ("query", "original_query", "generation", "decision", "route_path", "route_confidence", "sources",
+                 "cache_hit", "context_stats", "session_id")
+
+class QueryServer:
+    """
+    Headless front end for the agent graph. Each request runs aanswer_query
+    on one event loop, with at most `max_concurrency` graph runs in flight.
+    Query embeddings of concurrent requests are micro-batched by the
+    QueryBatcher in the embeddings chain.
+    """
+    def __init__(self, max_concurrency: int = None):
+        self.max_concurrency = max_concurrency or settings.SERVER_MAX_CONCURRENCY
+        self.started_at = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.total_ms = 0.0
+        self._semaphore = None
+
+    async def answer(self, request: dict) -> dict:
+        """
+        Answers one {"query", "session_id"?, "trace"?} request. Failures are
+        returned as {"query", "error"} rather than raised.
+        """
+        from agent.graph import aanswer_query
+        query = request.get("query")
+        if not isinstance(query, str) or not query.strip():
+            return {"query": query, "error": "'query' must be a non-empty string"}
+        state = {"query": query, "messages": []}
+        if request.get("session_id"):
+            state["session_id"] = str(request["session_id"])
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.waiting += 1
+        async with self._semaphore:
+            self.waiting -= 1
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                result = await aanswer_query(state)
+            except Exception as e:
+                self.errors += 1
+                print(f"[ERROR] Query failed: {e}")
+                return {"query": query, "error": str(e)}
+            finally:
+                self.in_flight -= 1
+                self.requests += 1
+                self.total_ms += (time.perf_counter() - started) * 1000
+
+        response = {key: result.get(key) for key in RESULT_FIELDS if result.get(key) is not None}
+        if request.get("trace"):
+            response["trace"] = result.get("trace")
+        return response
+
+    async def handle_query(self, request: web.Request) -> web.Response:
+        """
+        POST /query with {"query": ...} or {"queries": [...]} (answered concurrently, in order).
+        """
+        try:
+            payload = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.json_response({"error": "body must be JSON"}, status=400)
+        if not isinstance(payload, dict):
+            return web.json_response({"error": "body must be a JSON object"}, status=400)
+
+        if "queries" in payload:
+            items = [item if isinstance(item, dict) else {"query": item} for item in payload["queries"] or []]
+            results = await asyncio.gather(*(self.answer(dict(item, trace=payload.get("trace"))) for item in items))
+            return web.json_response({"results": results}, dumps=_dumps)
+
+        result = await self.answer(payload)
+        status = 200
+        if "error" in result:
+            status = 400 if result["error"].startswith("'query'") else 500
+        return web.json_response(result, status=status, dumps=_dumps)
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok", "uptime_s": round(time.time() - self.started_at, 1),
+                                  "in_flight": self.in_flight, "waiting": self.waiting})
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        from agent.tracing import metrics
+        return web.Response(text=metrics.to_prometheus(), content_type="text/plain", charset="utf-8")
+
+    def stats(self) -> list:
+        from agent.batching import batcher_stats
+        server = {"name": "server", "requests": self.requests, "errors": self.errors, "in_flight": self.in_flight,
+                  "waiting": self.waiting, "mean_ms": round(self.total_ms / self.requests, 1) if self.requests else 0.0}
+        return [server] + [dict(stats, name="query_batcher") for stats in batcher_stats()]
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for metric, value, kind, help_text in (
+            ("nexus_server_requests_total", self.requests, "counter", "Queries answered."),
+            ("nexus_server_errors_total", self.errors, "counter", "Queries that failed."),
+            ("nexus_server_in_flight", self.in_flight, "gauge", "Graph runs in progress."),
+            ("nexus_server_waiting", self.waiting, "gauge", "Queries waiting for a graph slot."),
+            ("nexus_server_latency_ms_total", round(self.total_ms, 3), "counter", "Total time spent answering queries."),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}", f"{metric} {value}"]
+        from agent.batching import batcher_stats
+        batchers = batcher_stats()
+        for metric, key, kind, help_text in (
+            ("nexus_query_batches_total", "batches", "counter", "Batched query-embedding calls."),
+            ("nexus_query_batched_total", "queries", "counter", "Query embeddings served by batches."),
+            ("nexus_query_batch_largest", "largest_batch", "gauge", "Largest batch so far."),
+        ):
+            if batchers:
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+                lines += [f'{metric}{{batcher="{i}"}} {stats[key]}' for i, stats in enumerate(batchers)]
+        return "\n".join(lines) + "\n"
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=str)
+
+def configure(batch_size: int = None, batch_wait_ms: float = None, batching: bool = True):
+    """
+    Turns on query micro-batching. Must run before the embeddings client is first built.
+    """
+    settings.QUERY_BATCHING_ENABLED = batching
+    if batch_size:
+        settings.QUERY_BATCH_SIZE = batch_size
+    if batch_wait_ms is not None:
+        settings.QUERY_BATCH_WAIT_MS = batch_wait_ms
+
+def create_app(server: QueryServer = None) -> web.Application:
+    from agent.tracing import metrics
+    server = server or QueryServer()
+    metrics.add_collector(server.to_prometheus, server.stats)
+
+    async def on_startup(app):
+        # Vector search, BM25 and Mongo calls block; give the loop enough threads to keep them concurrent
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=settings.SERVER_THREADS, thread_name_prefix="server"))
+        # Pay the graph import before the first request
+        started = time.perf_counter()
+        import agent.graph
+        print(f"[INFO] Agent graph ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    app = web.Application(client_max_size=1024 ** 2)
+    app["server"] = server
+    app.router.add_post("/query", server.handle_query)
+    app.router.add_get("/health", server.handle_health)
+    app.router.add_get("/metrics", server.handle_metrics)
+    app.on_startup.append(on_startup)
+    return app
+
+async def serve_stdin(server: QueryServer):
+    """
+    Reads one JSON request (or plain query) per line from stdin and writes one
+    JSON result per line to stdout as each finishes, tagged with "id"
+    (the request's own id, or its line number).
+    """
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.SERVER_THREADS, thread_name_prefix="server"))
+    reader = asyncio.StreamReader()
+    await asyncio.get_running_loop().connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    async def run(number: int, line: str):
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            request = line
+        if not isinstance(request, dict):
+            request = {"query": request}
+        result = await server.answer(request)
+        print(_dumps(dict(result, id=request.get("id", number))), flush=True)
+
+    tasks = []
+    number = 0
+    while line := (await reader.readline()).decode("utf-8"):
+        if line.strip():
+            tasks.append(asyncio.create_task(run(number, line.strip())))
+            number += 1
+    await asyncio.gather(*tasks)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nexus AI query server (HTTP/JSON, or JSON lines on stdin)")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--max-concurrency", type=int, default=settings.SERVER_MAX_CONCURRENCY, help="Graph runs in flight")
+    parser.add_argument("--batch-size", type=int, default=settings.QUERY_BATCH_SIZE, help="Query embeddings per batched call")
+    parser.add_argument("--batch-wait-ms", type=float, default=settings.QUERY_BATCH_WAIT_MS,
+                        help="How long a query embedding waits for others to batch with")
+    parser.add_argument("--no-batching", action="store_true", help="Embed each query on its own")
+    parser.add_argument("--stdin", action="store_true", help="Answer JSON lines from stdin instead of serving HTTP")
+    args = parser.parse_args()
+
+    if not settings.GOOGLE_API_KEY or (settings.VECTOR_STORE_BACKEND != "local" and not settings.MONGO_URI):
+        print("[ERROR] GOOGLE_API_KEY and MONGO_URI must be set (in the environment or .env).")
+        sys.exit(1)
+
+    configure(args.batch_size, args.batch_wait_ms, batching=not args.no_batching)
+    query_server = QueryServer(args.max_concurrency)
+    if args.stdin:
+        import agent.graph
+        asyncio.run(serve_stdin(query_server))
+    else:
+        print(f"[INFO] Serving on http://{args.host}:{args.port} (POST /query, GET /health, GET /metrics)")
+        web.run_app(create_app(query_server), host=args.host, port=args.port, print=None)
@@ -0,0 +1,32 @@
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import settings
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """
+    Local chunk store and hash embeddings under tmp_path (no Gemini, no Atlas).
+    Settings, registry overrides and the cached indexes are restored afterwards.
+    """
+    from benchmarks.run import configure
+    from config.resources import registry
+    import database.vector_store as vector_store
+    # configure() assigns settings directly; record every value so monkeypatch puts it back
+    for name in dir(settings):
+        if name.isupper():
+            monkeypatch.setattr(settings, name, getattr(settings, name))
+    monkeypatch.setattr(vector_store, "_local_index", None)
+    monkeypatch.setattr(vector_store, "_lexical_index", None)
+    args = types.SimpleNamespace(store="local", vector_format="array", embedding_cache=False, no_scheduler=True,
+                                 embed_latency_ms=0.0, embed_quota=0.0, llm_latency_ms=0.0, tokens_per_second=1e6,
+                                 response_tokens=10, llm_quota=0.0)
+    configure(args, str(tmp_path))
+    monkeypatch.setattr(settings, "PARSE_WORKERS", 1)
+    yield vector_store.get_chunk_store()
+    registry.clear()
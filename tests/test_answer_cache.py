@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import settings
+
+def use_tenant(monkeypatch, name: str):
+    monkeypatch.setattr(settings, "GOOGLE_API_KEY", f"key-{name}")
+    monkeypatch.setattr(settings, "MONGO_URI", f"mongodb://{name}")
+
+def test_answers_are_not_shared_between_keys(store, monkeypatch):
+    from agent.graph import answer_query
+    monkeypatch.setattr(settings, "ANSWER_CACHE_ENABLED", True)
+    query = "Which databases does the candidate's resume list?"
+
+    use_tenant(monkeypatch, "a")
+    first = answer_query({"query": query})
+    assert first["generation"] and not first.get("cache_hit")
+    assert answer_query({"query": query}).get("cache_hit")
+
+    # Same question under another API key and Mongo URI: answered from that knowledge base, not the cache
+    use_tenant(monkeypatch, "b")
+    assert not answer_query({"query": query}).get("cache_hit")
+
+    use_tenant(monkeypatch, "a")
+    assert answer_query({"query": query}).get("cache_hit")
@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+
+from langchain_core.documents import Document
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_pipeline import streaming
+from data_pipeline.bulk import ingest_manifest
+
+class FakeWebLoader:
+    """Serves `pages[url]` as documents; a url mapped to an exception raises it."""
+    def __init__(self, pages):
+        self.pages = pages
+
+    def lazy_load(self, url):
+        pages = self.pages[url]
+        if isinstance(pages, Exception):
+            raise pages
+        for text in pages:
+            yield Document(page_content=text, metadata={})
+
+def write_manifest(tmp_path, urls):
+    path = tmp_path / "sources.jsonl"
+    path.write_text("".join(json.dumps({"type": "web", "url": url}) + "\n" for url in urls))
+    return str(path)
+
+def test_manifest_isolates_failures_and_keeps_empty_sources(store, tmp_path, monkeypatch):
+    urls = [f"https://example.com/{i}" for i in range(6)]
+    pages = {url: [f"Article {url} explains retrieval in detail."] for url in urls}
+    monkeypatch.setattr(streaming, "get_loader", lambda source_type: FakeWebLoader(pages))
+    manifest = write_manifest(tmp_path, urls)
+
+    stats = ingest_manifest(manifest, load_concurrency=2)
+    assert stats["sources"] == 6 and stats["failed"] == 0
+    before = {url: store.get_chunk_ids(url) for url in urls}
+    assert all(before.values())
+
+    pages[urls[1]] = Exception("HTTP Error 503")
+    pages[urls[2]] = []
+    pages[urls[3]] = ["Article 3 was rewritten."]
+    stats = ingest_manifest(manifest, load_concurrency=2)
+
+    assert stats["failed"] == 1
+    assert stats["failed_sources"][0]["url"] == urls[1]
+    assert stats["skipped"] == 1
+    assert stats["added"] == 1 and stats["removed"] == 1
+    # The failed and the empty source keep their chunks; the others are untouched or updated
+    assert store.get_chunk_ids(urls[1]) == before[urls[1]]
+    assert store.get_chunk_ids(urls[2]) == before[urls[2]]
+    assert store.get_chunk_ids(urls[3]) and store.get_chunk_ids(urls[3]) != before[urls[3]]
+    assert store.get_chunk_ids(urls[5]) == before[urls[5]]
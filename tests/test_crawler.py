@@ -0,0 +1,183 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_pipeline.crawler import CrawlState, crawl_ingest
+
+class Site:
+    """
+    Pages served by the fixture: path -> {"status", "body", "etag", "honor_etag"}.
+    Paths that are not listed return 404.
+    """
+    def __init__(self):
+        self.pages = {}
+        self.requests = []
+        self.robots_status = 200
+
+    def page(self, path: str, text: str, links=(), status: int = 200, etag: str = None, honor_etag: bool = True):
+        anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+        body = f"<html lang='en'><head><title>{path}</title></head><body><p>{text}</p>{anchors}</body></html>"
+        self.pages[path] = {"status": status, "body": body.encode(), "etag": etag, "honor_etag": honor_etag}
+
+def _handler(site: Site):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            site.requests.append(self.path)
+            if self.path == "/robots.txt":
+                self._send(site.robots_status, b"User-agent: *\nDisallow: /private\n", "text/plain")
+                return
+            page = site.pages.get(self.path)
+            if page is None:
+                self._send(404, b"")
+                return
+            if page["status"] != 200:
+                self._send(page["status"], b"")
+                return
+            if page["etag"] and page["honor_etag"] and self.headers.get("If-None-Match") == page["etag"]:
+                self._send(304, b"", etag=page["etag"])
+                return
+            self._send(200, page["body"], etag=page["etag"])
+
+        def _send(self, status: int, body: bytes, content_type: str = "text/html; charset=utf-8", etag: str = None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+@pytest.fixture
+def site():
+    site = Site()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(site))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    site.root = f"http://127.0.0.1:{server.server_address[1]}/"
+    yield site
+    server.shutdown()
+    server.server_close()
+
+def crawl(site: Site, state: CrawlState) -> dict:
+    return crawl_ingest(site.root, state=state, use_sitemap=False, max_depth=3, max_pages=100)
+
+def build_site(site: Site):
+    site.page("/", "Index of the documentation.", links=["/a", "/b", "/private"])
+    site.page("/a", "Page a explains retrieval.", etag='"a1"')
+    site.page("/b", "Page b explains embeddings.", links=["/c"])
+    site.page("/c", "Page c explains chunking.")
+    site.page("/private", "Should never be fetched.")
+
+def test_first_crawl_indexes_reachable_pages_and_obeys_robots(site, store, tmp_path):
+    build_site(site)
+    state = CrawlState(str(tmp_path / "crawl.sqlite3"))
+    stats = crawl(site, state)
+
+    assert stats["new"] == 4
+    assert stats["disallowed"] == 1
+    assert "/private" not in site.requests
+    for path in ("/", "/a", "/b", "/c"):
+        assert store.get_chunk_ids(site.root.rstrip("/") + path)
+    assert not store.get_chunk_ids(site.root + "private")
+
+def test_recrawl_skips_304_and_identical_pages(site, store, tmp_path):
+    build_site(site)
+    site.pages["/b"]["honor_etag"] = False
+    state = CrawlState(str(tmp_path / "crawl.sqlite3"))
+    crawl(site, state)
+
+    site.page("/c", "Page c now explains overlap too.")
+    stats = crawl(site, state)
+
+    # /a answers 304; /, /b return identical bytes; /c changed
+    assert stats["unchanged"] == 3
+    assert stats["changed"] == 1
+    assert stats["added"] >= 1
+    assert stats["removed"] >= 1
+    assert stats["unchanged_chunks"] == 0
+
+def test_404_and_410_remove_pages(site, store, tmp_path):
+    build_site(site)
+    state = CrawlState(str(tmp_path / "crawl.sqlite3"))
+    crawl(site, state)
+
+    del site.pages["/a"]
+    site.pages["/c"]["status"] = 410
+    stats = crawl(site, state)
+
+    assert stats["gone"] == 2
+    assert not store.get_chunk_ids(site.root + "a")
+    assert not store.get_chunk_ids(site.root + "c")
+    assert store.get_chunk_ids(site.root + "b")
+    assert site.root + "a" not in state.urls(site.root)
+
+def test_unlinked_pages_removed_after_complete_crawl(site, store, tmp_path):
+    build_site(site)
+    state = CrawlState(str(tmp_path / "crawl.sqlite3"))
+    crawl(site, state)
+
+    site.page("/b", "Page b explains embeddings.")  # no longer links to /c
+    crawl(site, state)
+
+    assert not store.get_chunk_ids(site.root + "c")
+    assert site.root + "c" not in state.urls(site.root)
+
+def test_server_errors_keep_pages(site, store, tmp_path):
+    build_site(site)
+    state = CrawlState(str(tmp_path / "crawl.sqlite3"))
+    crawl(site, state)
+    known = state.urls(site.root)
+
+    # A transient 5xx on a page in the middle keeps it and the pages behind it
+    site.pages["/b"]["status"] = 503
+    stats = crawl(site, state)
+    assert stats["error"] == 1
+    assert stats["removed"] == 0
+    assert state.urls(site.root) == known
+    assert store.get_chunk_ids(site.root + "c")
+
+    # A 5xx on the root prunes nothing
+    site.pages["/b"]["status"] = 200
+    site.pages["/"]["status"] = 503
+    stats = crawl(site, state)
+    assert stats["removed"] == 0
+    assert state.urls(site.root) == known
+    for path in ("", "a", "b", "c"):
+        assert store.get_chunk_ids(site.root + path)
+
+def test_depth_limit_does_not_prune(site, store, tmp_path):
+    build_site(site)
+    state = CrawlState(str(tmp_path / "crawl.sqlite3"))
+    crawl(site, state)
+
+    stats = crawl_ingest(site.root, state=state, use_sitemap=False, max_depth=1, max_pages=100)
+    assert stats["removed"] == 0
+    assert store.get_chunk_ids(site.root + "c")
+
+def test_robots_server_error_disallows_host(site, store, tmp_path):
+    build_site(site)
+    state = CrawlState(str(tmp_path / "crawl.sqlite3"))
+    crawl(site, state)
+    known = state.urls(site.root)
+
+    site.robots_status = 503
+    site.requests.clear()
+    stats = crawl(site, state)
+    assert site.requests == ["/robots.txt"]
+    assert stats["removed"] == 0
+    assert state.urls(site.root) == known
+    assert store.get_chunk_ids(site.root + "a")
+
+    # A missing robots.txt allows everything
+    site.robots_status = 404
+    stats = crawl(site, state)
+    assert "/private" in site.requests
@@ -0,0 +1,62 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fakes import HashEmbeddings, MockMongoClient
+from config import settings
+from database.local_index import LocalVectorIndex, ReadThroughVectorStore
+
+class SlowCollection:
+    """Mock collection whose find() blocks until `release` is set, like a long Mongo read."""
+    def __init__(self, collection):
+        self.collection = collection
+        self.release = threading.Event()
+        self.release.set()
+
+    def find(self, *args, **kwargs):
+        self.release.wait()
+        return self.collection.find(*args, **kwargs)
+
+def make_store(tmp_path, embeddings):
+    collection = MockMongoClient()["db"]["chunks"]
+    docs = []
+    for source_type in ("web", "video"):
+        for i in range(20):
+            text = f"{source_type} chunk {i} about vector search"
+            docs.append({"_id": f"{source_type}-{i}", "text": text, "source": source_type, "source_type": source_type,
+                         "embedding": embeddings.embed_query(text)})
+    collection.docs = {doc["_id"]: doc for doc in docs}
+    slow = SlowCollection(collection)
+    index = LocalVectorIndex(str(tmp_path / "index"), dim=64)
+    return ReadThroughVectorStore(index, embeddings, remote=None, collection=slow), slow
+
+def test_refresh_serves_stale_copy_without_blocking(tmp_path, monkeypatch):
+    embeddings = HashEmbeddings(64)
+    store, slow = make_store(tmp_path, embeddings)
+    for source_type in ("web", "video"):
+        assert store.similarity_search_with_score("vector search", k=3, pre_filter={"source_type": source_type})
+
+    # Expire both partitions and make the next Mongo read hang
+    monkeypatch.setattr(settings, "LOCAL_CACHE_TTL_SECONDS", 0)
+    slow.release.clear()
+    slow.collection.docs["web-new"] = dict(slow.collection.docs["web-0"], _id="web-new", text="web chunk new")
+
+    started = time.perf_counter()
+    web = store.similarity_search_with_score("vector search", k=3, pre_filter={"source_type": "web"})
+    video = store.similarity_search_with_score("vector search", k=3, pre_filter={"source_type": "video"})
+    assert time.perf_counter() - started < 0.5
+    assert len(web) == 3 and len(video) == 3
+    assert "web-new" not in store.index.partition("web").row_of
+
+    # Once Mongo answers, the refreshed copy is swapped in
+    monkeypatch.setattr(settings, "LOCAL_CACHE_TTL_SECONDS", 600)
+    slow.release.set()
+    deadline = time.time() + 5
+    while "web-new" not in store.index.partition("web").row_of and time.time() < deadline:
+        time.sleep(0.01)
+    assert "web-new" in store.index.partition("web").row_of
+    assert store.index.partition("web").size == 21
+    assert sorted(store.index.partition_names()) == ["video", "web"]
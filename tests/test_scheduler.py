@@ -0,0 +1,116 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.scheduler import ScheduledEmbeddings, Scheduler
+
+class SlowEmbeddings:
+    """Async embeddings that take 50 ms per call and count the calls."""
+    def __init__(self):
+        self.calls = 0
+
+    async def aembed_query(self, text):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return [float(len(text))]
+
+    async def aembed_documents(self, texts):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return [[float(len(text))] for text in texts]
+
+def test_cancelled_calls_release_their_slot():
+    scheduler = Scheduler("test", max_concurrency=2, max_retries=0)
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def fast():
+        return "ok"
+
+    async def main():
+        for _ in range(3):
+            task = asyncio.create_task(scheduler.arun(slow))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        assert scheduler.limiter.in_flight == 0
+        return await asyncio.wait_for(scheduler.arun(fast), timeout=1)
+
+    assert asyncio.run(main()) == "ok"
+
+def test_cancelled_owner_does_not_cancel_coalesced_waiters():
+    scheduler = Scheduler("test", max_concurrency=4, max_retries=0)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        owner = asyncio.create_task(scheduler.arun(call, key="same"))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(scheduler.arun(call, key="same"))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        await asyncio.gather(owner, return_exceptions=True)
+        return await asyncio.wait_for(waiter, timeout=1)
+
+    assert asyncio.run(main()) == "result"
+    # The waiter took over the call once the owner was cancelled
+    assert len(calls) == 2
+    assert scheduler.limiter.in_flight == 0
+
+def test_cancelled_waiter_does_not_cancel_owner():
+    scheduler = Scheduler("test", max_concurrency=4, max_retries=0)
+
+    async def call():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        owner = asyncio.create_task(scheduler.arun(call, key="same"))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(scheduler.arun(call, key="same"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return await asyncio.wait_for(owner, timeout=1)
+
+    assert asyncio.run(main()) == "result"
+
+def test_cancelled_embedding_owner_does_not_fail_waiters():
+    underlying = SlowEmbeddings()
+    embeddings = ScheduledEmbeddings(underlying, Scheduler("test", max_concurrency=4, max_retries=0))
+
+    async def main():
+        owner = asyncio.create_task(embeddings.aembed_query("x"))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(embeddings.aembed_query("x"))
+        batch = asyncio.create_task(embeddings.aembed_documents(["x", "yy"]))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        await asyncio.gather(owner, return_exceptions=True)
+        return await asyncio.wait_for(asyncio.gather(waiter, batch), timeout=1)
+
+    assert asyncio.run(main()) == [[1.0], [[1.0], [2.0]]]
+    # The query waiter took over after the owner was cancelled
+    assert underlying.calls == 3
+    assert embeddings.scheduler.limiter.in_flight == 0
+
+def test_cancelled_embedding_waiter_does_not_cancel_owner():
+    embeddings = ScheduledEmbeddings(SlowEmbeddings(), Scheduler("test", max_concurrency=4, max_retries=0))
+
+    async def main():
+        owner = asyncio.create_task(embeddings.aembed_query("x"))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(embeddings.aembed_query("x"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return await asyncio.wait_for(owner, timeout=1)
+
+    assert asyncio.run(main()) == [1.0]
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+from langchain_core.documents import Document
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.vector_store import get_lexical_index
+from data_pipeline.streaming import stream_ingest
+
+class PagesLoader:
+    """Loader yielding fixed pages of text, one Document per page."""
+    def __init__(self, pages):
+        self.pages = pages
+
+    def lazy_load(self, url):
+        for i, text in enumerate(self.pages):
+            yield Document(page_content=text, metadata={"page": i})
+
+def lexical_ids(source_type: str) -> set:
+    return set(get_lexical_index().partition(source_type).row_of)
+
+def test_failed_write_leaves_lexical_index_unchanged(store, monkeypatch):
+    loader = PagesLoader([f"Page {i} mentions ERR_CONNECTION_RESET in the proxy logs." for i in range(5)])
+    stream_ingest("web", "docs", loader=loader, write_batch_size=2)
+    stored = set(store.get_chunk_ids("docs"))
+    assert lexical_ids("web") == stored
+
+    def fail(batch, batch_size=None):
+        raise RuntimeError("write failed")
+    monkeypatch.setattr(store, "upsert_chunks", fail)
+    loader.pages = loader.pages + ["A new page about ERR_NAME_NOT_RESOLVED."]
+    with pytest.raises(RuntimeError):
+        stream_ingest("web", "docs", loader=loader)
+
+    # Only stored chunks are in the lexical index
+    assert lexical_ids("web") == stored
+    assert not get_lexical_index().search("ERR_NAME_NOT_RESOLVED", "web", 5)
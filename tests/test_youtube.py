@@ -0,0 +1,79 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_pipeline import youtube
+from data_pipeline.streaming import stream_ingest
+
+PLAYLIST = "https://www.youtube.com/playlist?list=PLtest"
+VIDEOS = [f"https://www.youtube.com/watch?v=video{i:06d}" for i in range(3)]
+
+def transcript(url: str) -> dict:
+    vid = youtube.video_id(url)
+    segments = [{"text": f"Lecture {vid} part {i} covers vector search.", "start": i * 5.0, "duration": 5.0}
+                for i in range(20)]
+    return {"video_id": vid, "title": vid, "author": "Course", "segments": segments}
+
+@pytest.fixture
+def playlist(monkeypatch):
+    errors = {}
+    def fetch(url: str, lang: str = None) -> dict:
+        if url in errors:
+            raise errors[url]
+        return transcript(url)
+    monkeypatch.setattr(youtube, "expand_url", lambda url: list(VIDEOS))
+    monkeypatch.setattr(youtube, "fetch_transcript", fetch)
+    return errors
+
+def video_chunks(store) -> dict:
+    chunks = store.get_chunks(store.get_chunk_ids(PLAYLIST))
+    return {vid: sum(1 for chunk in chunks if chunk.get("video_id") == vid) for vid in map(youtube.video_id, VIDEOS)}
+
+def test_transient_error_keeps_chunks(store, playlist):
+    stream_ingest("video", PLAYLIST)
+    before = video_chunks(store)
+    assert all(before.values())
+
+    playlist[VIDEOS[1]] = Exception("HTTP Error 429: Too Many Requests")
+    with pytest.raises(Exception, match="1 of 3 videos"):
+        stream_ingest("video", PLAYLIST)
+    assert video_chunks(store) == before
+
+def test_missing_subtitles_are_skipped(store, playlist):
+    stream_ingest("video", PLAYLIST)
+
+    playlist[VIDEOS[1]] = youtube.NoSubtitlesError("No 'en' subtitles found (manual or auto-generated).")
+    stats = stream_ingest("video", PLAYLIST)
+    assert stats["removed"] > 0
+    assert video_chunks(store)[youtube.video_id(VIDEOS[1])] == 0
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.youtube.com/@chan", "https://www.youtube.com/@chan/videos"),
+    ("https://www.youtube.com/@chan/", "https://www.youtube.com/@chan/videos"),
+    ("https://www.youtube.com/channel/UC123", "https://www.youtube.com/channel/UC123/videos"),
+    ("https://www.youtube.com/c/Name", "https://www.youtube.com/c/Name/videos"),
+    ("https://www.youtube.com/user/name?hl=en", "https://www.youtube.com/user/name/videos?hl=en"),
+    ("https://www.youtube.com/@chan/videos", "https://www.youtube.com/@chan/videos"),
+    ("https://www.youtube.com/@chan/streams", "https://www.youtube.com/@chan/streams"),
+    ("https://www.youtube.com/channel/UC123/videos", "https://www.youtube.com/channel/UC123/videos"),
+    ("https://www.youtube.com/c/Name/shorts", "https://www.youtube.com/c/Name/shorts"),
+    ("https://www.youtube.com/playlist?list=PLtest", "https://www.youtube.com/playlist?list=PLtest"),
+])
+def test_channel_videos_url(url, expected):
+    assert youtube.channel_videos_url(url) == expected
+
+def test_adding_a_video_keeps_other_chunk_ids(store, playlist, monkeypatch):
+    stream_ingest("video", PLAYLIST)
+    before = set(store.get_chunk_ids(PLAYLIST))
+
+    new_video = youtube.watch_url("videonew001")
+    monkeypatch.setattr(youtube, "expand_url", lambda url: [new_video] + VIDEOS)
+    stats = stream_ingest("video", PLAYLIST)
+
+    assert stats["removed"] == 0
+    assert stats["unchanged"] == len(before)
+    assert stats["added"] == stats["chunks"] - len(before)
+    assert before < set(store.get_chunk_ids(PLAYLIST))